@@ -0,0 +1,141 @@
+"""
+Benchmark DOCX assembly (no AI, no diagram rendering).
+
+    GROQ_API_KEY=x python backend/beta/benchmark_docx.py --iterations 20
+
+Times generate_srs_document with the cached skeleton against building the
+front matter from scratch, and the bulk table builder against growing a
+table with add_row(), for a few feature counts.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.beta.utils.fallback_srs import build_minimal_sections
+from backend.beta.utils.srs_document_generator import SRSDocumentGenerator, generate_srs_document
+
+
+def _inputs(feature_count: int) -> dict:
+    return {
+        "project_identity": {
+            "project_name": "Benchmark Project",
+            "author": ["Bench Author"],
+            "organization": "Bench Org",
+            "problem_statement": "Teams track orders across spreadsheets and email.",
+            "target_users": ["Admin", "Operator", "Customer"],
+        },
+        "system_context": {"application_type": "Web App", "domain": "Retail"},
+        "functional_scope": {
+            "core_features": [f"Feature {i + 1}" for i in range(feature_count)],
+            "primary_user_flow": "Login -> Create order -> Track order",
+        },
+        "non_functional_requirements": {"expected_user_scale": "1k-10k", "performance_expectation": "Fast"},
+        "security_and_compliance": {"authentication_required": True},
+        "technical_preferences": {"preferred_backend": "Python", "database_preference": "Postgres"},
+    }
+
+
+def _compare(before, after, iterations: int):
+    """Median ms of each variant; runs are interleaved so drift hits both equally."""
+    before()
+    after()  # warm-up (also builds the skeleton once)
+    samples = ([], [])
+    for _ in range(iterations):
+        for fn, bucket in ((before, samples[0]), (after, samples[1])):
+            started = time.perf_counter()
+            fn()
+            bucket.append(time.perf_counter() - started)
+    return tuple(statistics.median(bucket) * 1000 for bucket in samples)
+
+
+def _generate(sections: dict, output_path: str, use_skeleton: bool, mode: str):
+    generate_srs_document(
+        project_name="Benchmark Project",
+        introduction_section=sections["introduction_section"],
+        overall_description_section=sections["overall_description_section"],
+        system_features_section=sections["system_features_section"],
+        external_interfaces_section=sections["external_interfaces_section"],
+        nfr_section=sections["nfr_section"],
+        glossary_section=sections["glossary_section"],
+        assumptions_section=sections["assumptions_section"],
+        image_paths={},
+        output_path=output_path,
+        authors=["Bench Author"],
+        organization="Bench Org",
+        sections=sections,
+        mode=mode,
+        use_skeleton=use_skeleton,
+    )
+
+
+def _front_matter(use_skeleton: bool):
+    generator = SRSDocumentGenerator("Benchmark Project", ["Bench Author"], "Bench Org", from_skeleton=use_skeleton)
+    if not generator.front_matter_ready:
+        generator._add_title_page()
+        generator._add_table_of_contents()
+        generator._add_header_footer()
+        generator._set_update_fields_on_open()
+
+
+def _table_rows(count: int):
+    return [(f"Feature {i + 1}", "Medium", "High", "Add retries and monitoring.") for i in range(count)]
+
+
+def _table_row_by_row(count: int):
+    generator = SRSDocumentGenerator("Benchmark Project", from_skeleton=True)
+    table = generator.doc.add_table(rows=1, cols=4)
+    table.style = "Table Grid"
+    for cell, text in zip(table.rows[0].cells, ("Risk", "Probability", "Impact", "Mitigation")):
+        cell.text = text
+    for values in _table_rows(count):
+        for cell, text in zip(table.add_row().cells, values):
+            cell.text = text
+
+
+def _table_bulk(count: int):
+    generator = SRSDocumentGenerator("Benchmark Project", from_skeleton=True)
+    generator._add_table(_table_rows(count), header=["Risk", "Probability", "Impact", "Mitigation"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SRS DOCX assembly.")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--features", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--mode", default="enhanced", help="quick skips the appendices")
+    args = parser.parse_args()
+
+    print(f"📄 Front matter only (median of {args.iterations})")
+    legacy, skeleton = _compare(lambda: _front_matter(False), lambda: _front_matter(True), args.iterations)
+    print(f"   built: {legacy:8.1f} ms   skeleton: {skeleton:8.1f} ms")
+
+    print(f"📄 One 4-column table (median of {args.iterations})")
+    for count in args.features:
+        row_by_row, bulk = _compare(lambda: _table_row_by_row(count), lambda: _table_bulk(count), args.iterations)
+        print(f"   {count:4d} rows: add_row {row_by_row:8.1f} ms   bulk {bulk:8.1f} ms")
+
+    print(f"📄 Full document, mode={args.mode} (median of {args.iterations})")
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "bench.docx")
+        for count in args.features:
+            sections = build_minimal_sections(_inputs(count))
+            legacy, skeleton = _compare(
+                lambda: _generate(sections, output_path, False, args.mode),
+                lambda: _generate(sections, output_path, True, args.mode),
+                args.iterations,
+            )
+            size_kb = os.path.getsize(output_path) / 1024
+            print(
+                f"   {count:4d} features: built {legacy:8.1f} ms   skeleton {skeleton:8.1f} ms"
+                f"   ({size_kb:.0f} KB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Regression check for the Mermaid pre-render validator.
+
+    GROQ_API_KEY=x python backend/beta/check_mermaid_validation.py
+    GROQ_API_KEY=x python backend/beta/check_mermaid_validation.py --static
+
+Every case is a Mermaid source with the status check_mermaid() must give it.
+Valid syntax the grammar does not cover must come back unchecked, never
+invalid. --static also checks that no .mmd file under backend/beta/static is
+rejected.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.beta.utils.mermaid_validator import _analyze, check_mermaid
+
+STATIC_DIR = Path(__file__).parent / "static"
+
+CASES = [
+    ("flowchart", "flowchart LR\n  A[Start] --> B{Ok?}\n  B -->|Yes| C[Done]", "valid"),
+    ("flowchart-elk", "flowchart-elk TD\n  A --> B", "valid"),
+    ("invisible link", "flowchart LR\n  A ~~~ B\n  B --> C", "valid"),
+    ("edge id", "flowchart LR\n  A e1@--> B\n  B e2@-- text --> C", "valid"),
+    ("edge id, dotted", "flowchart LR\n  A e1@-.-> B", "valid"),
+    ("unknown link syntax", "flowchart LR\n  A --~ B\n  B --> C", "unchecked"),
+    ("unquoted parentheses", "flowchart TD\n  A[Login (OAuth)] --> B", "repaired"),
+    ("prose before header", "Here is the diagram:\nflowchart LR\n  A --> B", "repaired"),
+    ("garbage flowchart", "flowchart TD\n  ??? ]]] (((\n  !!! [[[\n  ))) ]]", "invalid"),
+    ("erDiagram", "erDiagram\n  USER ||--o{ ORDER : places", "valid"),
+    ("requirementDiagram", "requirementDiagram\n  requirement r1 {\n  id: 1\n  text: t\n  }", "unchecked"),
+    ("xychart-beta", 'xychart-beta\n  x-axis [jan, feb]\n  bar [50, 60]', "unchecked"),
+    ("no header", "A --> B", "unchecked"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check Mermaid validator outcomes.")
+    parser.add_argument("--static", action="store_true", help="also check the .mmd files in backend/beta/static")
+    args = parser.parse_args()
+
+    failures = 0
+    for name, source, expected in CASES:
+        _, status, errors = check_mermaid(source)
+        if status != expected:
+            failures += 1
+            print(f"❌ {name}: {status}, expected {expected} ({'; '.join(errors[:2])})")
+    print(f"📊 {len(CASES) - failures}/{len(CASES)} cases as expected")
+
+    if args.static:
+        paths = sorted(STATIC_DIR.glob("*.mmd"))
+        for path in paths:
+            kind, repaired, errors = _analyze(path.read_text(encoding="utf-8", errors="replace"))
+            if kind is not None and repaired is None:
+                failures += 1
+                print(f"❌ {path.name} rejected: {'; '.join(errors[:2])}")
+        print(f"📊 Checked {len(paths)} static diagram(s)")
+
+    if failures:
+        sys.exit(1)
+    print("✅ Mermaid validation matches every expected outcome")
+
+
+if __name__ == "__main__":
+    main()
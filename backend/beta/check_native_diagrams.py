@@ -0,0 +1,137 @@
+"""
+Visual-regression check for the native Mermaid renderer.
+
+    GROQ_API_KEY=x python backend/beta/check_native_diagrams.py
+    GROQ_API_KEY=x python backend/beta/check_native_diagrams.py --from-static --update
+    GROQ_API_KEY=x python backend/beta/check_native_diagrams.py --out /tmp/diagrams
+
+Each case in backend/beta/diagram_baselines/ is a Mermaid source (<case>.mmd)
+with its accepted SVG (<case>.svg); manifest.json records whether the source
+is in the native subset, the SVG hash and the PNG size. A run re-renders every
+case with the repo's mermaid-config.json theme and the document profile, and
+fails on any difference. --from-static adds the unique .mmd files under
+backend/beta/static as cases; --update accepts the current output after a
+deliberate drawing change (bump native_mermaid.ENGINE too, it keys the render
+cache). --out writes the SVGs and PNGs for eyeballing.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.beta.utils import native_mermaid
+from backend.beta.utils.globals import _native_theme, render_profile_options
+
+BASELINE_DIR = Path(__file__).parent / "diagram_baselines"
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+def _load_manifest() -> dict:
+    path = BASELINE_DIR / "manifest.json"
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def _collect_static(manifest: dict) -> int:
+    known = {(BASELINE_DIR / f"{case}.mmd").read_text(encoding="utf-8") for case in manifest}
+    added = 0
+    for path in sorted(STATIC_DIR.glob("*.mmd")):
+        source = path.read_text(encoding="utf-8")
+        if not source.strip() or source in known:
+            continue
+        kind = source.split(None, 1)[0].replace("-v2", "")
+        case = f"{kind}-{hashlib.sha256(source.encode('utf-8')).hexdigest()[:8]}"
+        (BASELINE_DIR / f"{case}.mmd").write_text(source, encoding="utf-8")
+        manifest[case] = {}
+        known.add(source)
+        added += 1
+    return added
+
+
+def _render(source: str, options: dict, theme: dict):
+    if native_mermaid.parse(source) is None:
+        return None, None, 0.0
+    started = time.perf_counter()
+    svg = native_mermaid.render_svg(source, options, theme)
+    png = native_mermaid.render_png(source, options, theme) if native_mermaid.Image is not None else None
+    return svg, png, (time.perf_counter() - started) * 1000
+
+
+def _png_size(png: bytes):
+    with native_mermaid.Image.open(io.BytesIO(png)) as image:
+        return list(image.size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check native Mermaid renders against the accepted baselines.")
+    parser.add_argument("--from-static", action="store_true", help="add unique static/*.mmd files as cases")
+    parser.add_argument("--update", action="store_true", help="accept the current output as the new baseline")
+    parser.add_argument("--out", type=Path, help="also write each render here for inspection")
+    args = parser.parse_args()
+
+    BASELINE_DIR.mkdir(exist_ok=True)
+    manifest = _load_manifest()
+    if args.from_static:
+        print(f"📥 Added {_collect_static(manifest)} case(s) from {STATIC_DIR}")
+    if args.out:
+        args.out.mkdir(parents=True, exist_ok=True)
+
+    options = render_profile_options("document")
+    theme = _native_theme(options)
+    failures, timings = [], []
+    for case in sorted(manifest):
+        source = (BASELINE_DIR / f"{case}.mmd").read_text(encoding="utf-8")
+        svg, png, elapsed = _render(source, options, theme)
+        result = {"native": svg is not None}
+        if svg is not None:
+            timings.append(elapsed)
+            result["svg_sha256"] = hashlib.sha256(svg.encode("utf-8")).hexdigest()
+            if png is not None:
+                result["png_size"] = _png_size(png)
+            if args.out:
+                (args.out / f"{case}.svg").write_text(svg, encoding="utf-8")
+                if png is not None:
+                    (args.out / f"{case}.png").write_bytes(png)
+
+        expected = manifest[case]
+        if args.update:
+            manifest[case] = result
+            if svg is not None:
+                (BASELINE_DIR / f"{case}.svg").write_text(svg, encoding="utf-8")
+            else:
+                (BASELINE_DIR / f"{case}.svg").unlink(missing_ok=True)
+            continue
+        if "png_size" not in result:
+            expected = {k: v for k, v in expected.items() if k != "png_size"}  # no Pillow here
+        if result != expected:
+            changed = sorted(k for k in set(result) | set(expected) if result.get(k) != expected.get(k))
+            failures.append(case)
+            print(f"❌ {case}: {', '.join(changed)} changed")
+
+    if args.update:
+        (BASELINE_DIR / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"✅ Baselines updated ({len(manifest)} cases)")
+    native = sum(1 for entry in manifest.values() if entry.get("native"))
+    print(f"📊 {native}/{len(manifest)} cases in the native subset")
+    if timings:
+        timings.sort()
+        print(
+            f"⏱️ SVG+PNG per diagram: median {timings[len(timings) // 2]:.1f} ms, "
+            f"max {timings[-1]:.1f} ms"
+        )
+    if failures:
+        print(f"❌ {len(failures)} case(s) differ from the baseline; inspect with --out, accept with --update")
+        sys.exit(1)
+    if not args.update:
+        print("✅ All native renders match the baselines")
+
+
+if __name__ == "__main__":
+    main()
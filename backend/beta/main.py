@@ -1,7 +1,8 @@
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, Query, UploadFile, File, Form
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, Query, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.concurrency import run_in_threadpool
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from starlette.websockets import WebSocketState
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from google.adk.sessions import InMemorySessionService
@@ -99,13 +100,13 @@ def _reactflow_to_mermaid(nodes: list, edges: list) -> str:
 
     return "\n".join(lines)
 
-async def _generate_diagram_image_data(content: str) -> bytes:
+async def _generate_diagram_image_data(content: str, profile: str = "api-preview") -> bytes:
     diagram_payload = {"content": content}
     flow = await WorkflowService.execute_workflow("diagram", diagram_payload)
     mermaid_code = _reactflow_to_mermaid(flow.get("nodes", []), flow.get("edges", []))
     with tempfile.TemporaryDirectory() as tmpdir:
         output_png = Path(tmpdir) / "diagram.png"
-        render_mermaid_png(mermaid_code, output_png)
+        await asyncio.wrap_future(submit_mermaid_render(mermaid_code, output_png, profile, priority="interactive"))
         return output_png.read_bytes()
 
 class NotebookChatRequest(BaseModel):
@@ -120,7 +121,12 @@ from backend.beta.utils.globals import (
     get_session ,
     clean_and_parse_json,
     clean_interface_diagrams,
-    render_mermaid_png)
+    get_render_cache,
+    get_render_pool,
+    native_render_enabled,
+    submit_mermaid_render,
+    vector_sibling,
+    DEFAULT_RENDER_PROFILE)
 from google.adk.agents import SequentialAgent , ParallelAgent
 from pathlib import Path
 import os
@@ -129,10 +135,25 @@ from datetime import datetime
 from backend.beta.utils.srs_document_generator import generate_srs_document
 from backend.beta.utils.model import API_KEY_CONFIGURED, GROQ_API_KEY, GROQ_MODEL, GEMINI_API_KEY
 from backend.beta.utils.fallback_srs import build_minimal_sections
+from backend.beta.utils.docx_images import get_docx_image_assets
+from backend.beta.utils.mermaid_validator import validation_stats
 from backend.beta.utils.srs_diagrams import get_all_srs_diagrams
+from backend.beta.utils.ai_cache import AIResponseCache, make_cache_key as make_ai_cache_key
+from backend.beta.services.job_queue import FINISHED_STATES, get_job_queue, job_queue_enabled
+from backend.beta.services.blob_store import detach, get_blob_store
+from backend.beta.services.artifact_gc import ARTIFACT_CLASSES, DEFAULT_RETENTION_DAYS, ArtifactGC
+from backend.beta.services.progress_store import get_progress_store
+from backend.beta.utils.progress_events import get_progress_broker
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from litellm import completion as litellm_completion
+import asyncio
+import copy
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait as futures_wait
+from backend.beta.utils.llm_client import (
+    acompletion as llm_acompletion,
+    is_unsupported_params_error as llm_unsupported_params,
+    response_text as llm_response_text,
+    submit as llm_submit,
+)
 import threading
 
 today = datetime.today().strftime("%m/%d/%Y")
@@ -146,12 +167,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-SRS_PROGRESS = {}
-SRS_PROGRESS_LOCK = threading.Lock()
+STATIC_DIR = Path("backend/beta/static")
+
+
+class BlobStaticFiles(StaticFiles):
+    """/static, answered from the blob store first and the directory otherwise."""
+
+    async def get_response(self, path: str, scope):
+        store = get_blob_store()
+        if store is not None and scope["method"] in ("GET", "HEAD"):
+            blob = store.resolve(f"/static/{path}")
+            if blob is not None:
+                try:
+                    return self.file_response(blob, os.stat(blob), scope)
+                except OSError:
+                    pass
+        return await super().get_response(path, scope)
+
 
 app.mount(
     "/static",
-    StaticFiles(directory="backend/beta/static"),
+    BlobStaticFiles(directory=str(STATIC_DIR)),
     name="static"
 )
 
@@ -225,10 +261,13 @@ async def download_srs(filename: str):
     """Serve the generated SRS .docx for download. Filename e.g. ProjectName_SRS.docx."""
     if not filename.endswith(".docx") or ".." in filename or "/" in filename or "\\" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
-    base = Path("./backend/beta/generated_srs").resolve()
-    path = (base / filename).resolve()
-    if not path.is_file() or base not in path.parents:
-        raise HTTPException(status_code=404, detail="Document not found")
+    store = get_blob_store()
+    path = store.resolve(f"/download_srs/{filename}") if store else None
+    if path is None:
+        base = Path("./backend/beta/generated_srs").resolve()
+        path = (base / filename).resolve()
+        if not path.is_file() or base not in path.parents:
+            raise HTTPException(status_code=404, detail="Document not found")
     return FileResponse(path, filename=filename, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
 
 
@@ -246,20 +285,27 @@ def _set_progress(project_key: str, stage: str, progress: int, message: str, sta
         "updated_at": int(time.time()),
     }
     payload.update(extra)
-    with SRS_PROGRESS_LOCK:
-        SRS_PROGRESS[project_key] = payload
+    try:
+        get_progress_store().set(project_key, payload)
+    except Exception as e:
+        print(f"⚠️ Could not store progress for {project_key}: {e}")
+    get_progress_broker().publish(project_key, payload)
 
 
 def _get_progress(project_key: str) -> dict:
-    with SRS_PROGRESS_LOCK:
-        return SRS_PROGRESS.get(project_key, {
-            "project_key": project_key,
-            "stage": "idle",
-            "progress": 0,
-            "status": "idle",
-            "message": "No generation started for this project.",
-            "updated_at": int(time.time()),
-        })
+    try:
+        snapshot = get_progress_store().get(project_key)
+    except Exception as e:
+        print(f"⚠️ Could not read progress for {project_key}: {e}")
+        snapshot = None
+    return snapshot or {
+        "project_key": project_key,
+        "stage": "idle",
+        "progress": 0,
+        "status": "idle",
+        "message": "No generation started for this project.",
+        "updated_at": int(time.time()),
+    }
 
 
 def _safe_project_key(project_name: str) -> str:
@@ -360,6 +406,7 @@ def _ensure_minimum_diagrams(image_paths: dict, mode: str = "quick") -> dict:
             try:
                 target.parent.mkdir(parents=True, exist_ok=True)
                 shutil.copy2(template, target)
+                vector_sibling(target).unlink(missing_ok=True)
                 filled_from_template += 1
                 print(f"🧩 Fallback diagram applied for '{key}' from template: {template.name}")
                 continue
@@ -411,62 +458,144 @@ def _select_gemini_models() -> list:
     ]
 
 
+def _fast_litellm_models() -> list:
+    """Groq/LiteLLM candidates in preference order (configured model first)."""
+    # Prefer configured GROQ model first if it is not gemini/*
+    model_candidates = []
+    if GROQ_MODEL and not GROQ_MODEL.startswith("gemini/"):
+        model_candidates.append(GROQ_MODEL)
+    # Fast Groq defaults
+    model_candidates.extend([
+        "groq/llama-3.1-8b-instant",
+        "groq/llama-3.3-70b-versatile",
+    ])
+    # Expand Groq model aliases so both raw and provider-qualified names are tried.
+    expanded = []
+    for m in model_candidates:
+        expanded.append(m)
+        if not m.startswith("groq/"):
+            expanded.append(f"groq/{m}")
+
+    # Deduplicate while keeping order
+    seen = set()
+    return [m for m in expanded if not (m in seen or seen.add(m))]
+
+
+FAST_LLM_STATS = {"requests": 0, "no_winner": 0, "models": {}}
+FAST_LLM_STATS_LOCK = threading.Lock()
+
+
+def _record_fast_llm_attempt(model_name: str, outcome: str, latency: float, hedged: bool = False):
+    """Per-model win/failure counts and winning latency, used to tune LLM_HEDGE_DELAY_SEC."""
+    with FAST_LLM_STATS_LOCK:
+        entry = FAST_LLM_STATS["models"].setdefault(model_name, {
+            "launched": 0, "wins": 0, "hedged_wins": 0, "failures": 0, "cancelled": 0, "win_latency_total_sec": 0.0,
+        })
+        if outcome == "launched":
+            entry["launched"] += 1
+        elif outcome == "win":
+            entry["wins"] += 1
+            entry["hedged_wins"] += int(hedged)
+            entry["win_latency_total_sec"] = round(entry["win_latency_total_sec"] + latency, 3)
+        elif outcome == "failure":
+            entry["failures"] += 1
+        elif outcome == "cancelled":
+            entry["cancelled"] += 1
+
+
+def _fast_llm_stats() -> dict:
+    with FAST_LLM_STATS_LOCK:
+        snapshot = json.loads(json.dumps(FAST_LLM_STATS))
+    for entry in snapshot["models"].values():
+        entry["avg_win_latency_sec"] = round(entry["win_latency_total_sec"] / entry["wins"], 3) if entry["wins"] else None
+    return snapshot
+
+
+async def _fast_litellm_attempt(model_name: str, prompt: str, timeout: float) -> dict:
+    """One hedge leg: strict JSON mode, then plain mode if the provider rejects response_format."""
+    messages = [{"role": "user", "content": prompt}]
+    try:
+        resp = await llm_acompletion(
+            model=model_name,
+            messages=messages,
+            temperature=0,
+            response_format={"type": "json_object"},
+            timeout=timeout,
+        )
+    except Exception as e:
+        # Timeouts, auth, rate-limit and connection errors would fail the plain call too.
+        if not llm_unsupported_params(e):
+            raise
+        resp = await llm_acompletion(model=model_name, messages=messages, temperature=0, timeout=timeout)
+    cleaned = clean_and_parse_json(llm_response_text(resp))
+    if not cleaned:
+        raise ValueError("non-parseable JSON")
+    return cleaned
+
+
 def _try_fast_litellm_json(prompt: str) -> dict:
     """
     Try Groq/LiteLLM first for speed. Returns parsed JSON dict or {}.
+
+    Candidates are hedged: the primary starts immediately and the next one is
+    launched whenever LLM_HEDGE_DELAY_SEC passes without a usable answer (or
+    a leg fails). The first leg that returns valid JSON wins and the rest are
+    cancelled.
     """
     try:
         if not GROQ_API_KEY:
             return {}
-        # Prefer configured GROQ model first if it is not gemini/*
-        model_candidates = []
-        if GROQ_MODEL and not GROQ_MODEL.startswith("gemini/"):
-            model_candidates.append(GROQ_MODEL)
-        # Fast Groq defaults
-        model_candidates.extend([
-            "groq/llama-3.1-8b-instant",
-            "groq/llama-3.3-70b-versatile",
-        ])
-        # Expand Groq model aliases so both raw and provider-qualified names are tried.
-        expanded = []
-        for m in model_candidates:
-            expanded.append(m)
-            if not m.startswith("groq/"):
-                expanded.append(f"groq/{m}")
-
-        # Deduplicate while keeping order
-        seen = set()
-        models = [m for m in expanded if not (m in seen or seen.add(m))]
-
-        for model_name in models:
-            try:
-                print(f"⚡ Trying fast LiteLLM model: {model_name}")
-                # Some models/providers do not support strict response_format json_object.
-                # We retry without it if needed.
-                try:
-                    resp = litellm_completion(
-                        model=model_name,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0,
-                        response_format={"type": "json_object"},
-                        timeout=15,
-                    )
-                except Exception:
-                    resp = litellm_completion(
-                        model=model_name,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0,
-                        timeout=15,
-                    )
-                text = (resp.choices[0].message.content or "").strip()
-                cleaned = clean_and_parse_json(text)
-                if cleaned:
-                    print(f"✅ LiteLLM JSON accepted from: {model_name}")
+        remaining = _fast_litellm_models()
+        hedge_delay = max(0.0, float(os.getenv("LLM_HEDGE_DELAY_SEC", "4")))
+        attempt_timeout = float(os.getenv("FAST_LLM_TIMEOUT_SEC", "15"))
+        started = time.monotonic()
+        in_flight = {}
+        launched = []
+        with FAST_LLM_STATS_LOCK:
+            FAST_LLM_STATS["requests"] += 1
+
+        def launch():
+            model_name = remaining.pop(0)
+            print(f"⚡ Trying fast LiteLLM model: {model_name}")
+            _record_fast_llm_attempt(model_name, "launched", 0.0)
+            leg = llm_submit(_fast_litellm_attempt(model_name, prompt, attempt_timeout))
+            in_flight[leg] = (model_name, bool(launched))
+            launched.append(model_name)
+
+        launch()
+        try:
+            while in_flight:
+                done, _ = futures_wait(
+                    list(in_flight),
+                    timeout=hedge_delay if remaining else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    launch()
+                    continue
+                for leg in done:
+                    model_name, hedged = in_flight.pop(leg)
+                    try:
+                        cleaned = leg.result()
+                    except Exception as e:
+                        _record_fast_llm_attempt(model_name, "failure", 0.0)
+                        print(f"⚠️ LiteLLM model failed ({model_name}): {e}")
+                        continue
+                    latency = time.monotonic() - started
+                    _record_fast_llm_attempt(model_name, "win", latency, hedged=hedged)
+                    print(f"✅ LiteLLM JSON accepted from: {model_name} after {latency:.1f}s"
+                          f"{' (hedged)' if hedged else ''}")
                     return cleaned
-                print(f"⚠️ LiteLLM returned non-parseable JSON from: {model_name}")
-            except Exception as e:
-                print(f"⚠️ LiteLLM model failed ({model_name}): {e}")
-        return {}
+                # Every failed leg hands over to the next candidate right away.
+                for _ in range(min(len(done), len(remaining))):
+                    launch()
+            with FAST_LLM_STATS_LOCK:
+                FAST_LLM_STATS["no_winner"] += 1
+            return {}
+        finally:
+            for leg, (model_name, _) in in_flight.items():
+                leg.cancel()
+                _record_fast_llm_attempt(model_name, "cancelled", 0.0)
     except Exception as e:
         print(f"⚠️ LiteLLM fast path failed: {e}")
         return {}
@@ -589,76 +718,219 @@ def _map_ai_to_sections(inputs: dict, ai: dict) -> dict:
     return sections
 
 
-def _render_all_diagrams(inputs: dict, image_paths: dict, interface_sections: dict):
-    """Render all major and interface Mermaid diagrams to PNG files."""
-    stats = {"core_rendered": 0, "core_failed": 0, "interface_rendered": 0, "interface_failed": 0}
-    interface_keys = [
-        "user_interfaces",
-        "hardware_interfaces",
-        "software_interfaces",
-        "communication_interfaces",
-    ]
-    render_jobs = []
+_INTERFACE_DIAGRAM_KEYS = [
+    "user_interfaces",
+    "hardware_interfaces",
+    "software_interfaces",
+    "communication_interfaces",
+]
+
+
+def _new_render_stats() -> dict:
+    return {"core_rendered": 0, "core_failed": 0, "interface_rendered": 0, "interface_failed": 0, "rendered_keys": []}
 
-    # Core diagrams
+
+def _merge_render_stats(*all_stats) -> dict:
+    merged = _new_render_stats()
+    for stats in all_stats:
+        for key in merged:
+            merged[key] += (stats or {}).get(key, [] if isinstance(merged[key], list) else 0)
+    return merged
+
+
+def _run_render_jobs(
+    render_jobs: list, profile: str = DEFAULT_RENDER_PROFILE, priority: str = "normal", requester: str = ""
+) -> dict:
+    """Render (key, code, output_png, kind) jobs in parallel and count outcomes."""
+    stats = _new_render_stats()
+    if not render_jobs:
+        return stats
+
+    # The shared render pool parallelises across warm renderers and shares them fairly between requests.
+    future_map = {
+        submit_mermaid_render(code, output_png, profile, priority=priority, requester=requester): (key, kind)
+        for key, code, output_png, kind in render_jobs
+    }
+    for future in as_completed(future_map):
+        key, kind = future_map[future]
+        try:
+            future.result()
+            stats["rendered_keys"].append(key)
+            if kind == "core":
+                stats["core_rendered"] += 1
+            else:
+                stats["interface_rendered"] += 1
+        except Exception as e:
+            if kind == "core":
+                stats["core_failed"] += 1
+                print(f"⚠️ Failed to render {key} diagram: {e}")
+            else:
+                stats["interface_failed"] += 1
+                print(f"⚠️ Failed to render {key} interface diagram: {e}")
+    return stats
+
+
+# Render profile per generation mode (MERMAID_RENDER_PROFILES in utils/globals.py).
+_RENDER_PROFILE_BY_MODE = {
+    "quick": os.getenv("MERMAID_QUICK_PROFILE", DEFAULT_RENDER_PROFILE),
+    "full": os.getenv("MERMAID_DOCUMENT_PROFILE", DEFAULT_RENDER_PROFILE),
+    "enhanced": os.getenv("MERMAID_DOCUMENT_PROFILE", DEFAULT_RENDER_PROFILE),
+}
+
+
+def _render_profile_for(mode: str) -> str:
+    return _RENDER_PROFILE_BY_MODE.get(mode, DEFAULT_RENDER_PROFILE)
+
+
+# Render queue priority per generation mode: someone is waiting on quick builds,
+# while the enhanced build runs after its quick file was already returned.
+_RENDER_PRIORITY_BY_MODE = {"quick": "interactive", "full": "normal", "enhanced": "background"}
+
+
+def _render_priority_for(mode: str) -> str:
+    return _RENDER_PRIORITY_BY_MODE.get(mode, "normal")
+
+
+def _render_core_diagrams(
+    inputs: dict,
+    image_paths: dict,
+    keys: list | None = None,
+    skip=(),
+    profile: str = DEFAULT_RENDER_PROFILE,
+    priority: str = "normal",
+    requester: str = "",
+) -> dict:
+    """
+    Render the template-driven core diagrams. They depend only on the request
+    inputs, so callers start this before (and alongside) the AI expansion.
+    Keys in `skip` were already rendered for this project and are left as-is.
+    """
+    render_jobs = []
     for key, mermaid_code in get_all_srs_diagrams(inputs).items():
+        if (keys is not None and key not in keys) or key in skip:
+            continue
         output_png = image_paths.get(key)
         if output_png and isinstance(mermaid_code, str) and mermaid_code.strip():
             render_jobs.append((key, mermaid_code, output_png, "core"))
+    return _run_render_jobs(render_jobs, profile, priority, requester)
+
 
-    # Interface diagrams
-    for key in interface_keys:
+def _render_interface_diagrams(
+    image_paths: dict,
+    interface_sections: dict,
+    profile: str = DEFAULT_RENDER_PROFILE,
+    priority: str = "normal",
+    requester: str = "",
+) -> dict:
+    """Render the four interface diagrams; these need the cleaned AI output."""
+    render_jobs = []
+    for key in _INTERFACE_DIAGRAM_KEYS:
         section = interface_sections.get(key, {})
         code = ((section.get("interface_diagram") or {}).get("code", "") if isinstance(section, dict) else "")
         output_png = image_paths.get(key)
         if output_png and isinstance(code, str) and code.strip():
             render_jobs.append((key, code, output_png, "interface"))
-
-    # Parallel rendering for faster response time.
-    max_workers = max(2, min(6, len(render_jobs)))
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_map = {
-            executor.submit(render_mermaid_png, code, output_png): (key, kind)
-            for key, code, output_png, kind in render_jobs
-        }
-        for future in as_completed(future_map):
-            key, kind = future_map[future]
-            try:
-                future.result()
-                if kind == "core":
-                    stats["core_rendered"] += 1
-                else:
-                    stats["interface_rendered"] += 1
-            except Exception as e:
-                if kind == "core":
-                    stats["core_failed"] += 1
-                    print(f"⚠️ Failed to render {key} diagram: {e}")
-                else:
-                    stats["interface_failed"] += 1
-                    print(f"⚠️ Failed to render {key} interface diagram: {e}")
-    return stats
+    return _run_render_jobs(render_jobs, profile, priority, requester)
 
 
-def _render_quick_diagrams(inputs: dict, image_paths: dict):
+def _render_quick_diagrams(inputs: dict, image_paths: dict, requester: str = ""):
     """Render only 2 core diagrams for quick mode."""
-    stats = {"core_rendered": 0, "core_failed": 0, "interface_rendered": 0, "interface_failed": 0}
-    all_diagrams = get_all_srs_diagrams(inputs)
-    for key in ["system_context", "system_architecture"]:
-        code = all_diagrams.get(key)
-        output_png = image_paths.get(key)
-        if not code or not output_png:
-            continue
+    return _render_core_diagrams(
+        inputs,
+        image_paths,
+        keys=["system_context", "system_architecture"],
+        profile=_render_profile_for("quick"),
+        priority=_render_priority_for("quick"),
+        requester=requester,
+    )
+
+
+_AI_CACHE = None
+_AI_CACHE_LOCK = threading.Lock()
+
+
+def _get_ai_cache() -> AIResponseCache | None:
+    """Process-wide AI expansion cache, or None when AI_CACHE_ENABLED=0."""
+    global _AI_CACHE
+    if os.getenv("AI_CACHE_ENABLED", "1").strip().lower() in ("0", "false", "no"):
+        return None
+    with _AI_CACHE_LOCK:
+        if _AI_CACHE is None:
+            _AI_CACHE = AIResponseCache(
+                Path(os.getenv("AI_CACHE_PATH", "./backend/beta/.cache/ai_responses.sqlite3")),
+                ttl_sec=float(os.getenv("AI_CACHE_TTL_SEC", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000")),
+            )
+        return _AI_CACHE
+
+
+def _ai_model_signature() -> str:
+    """The model configuration an expansion was produced with (part of the cache key)."""
+    return "|".join([GROQ_MODEL if GROQ_API_KEY else "", *_select_gemini_models()])
+
+
+def _build_sections_with_ai(
+    inputs: dict,
+    project_name: str,
+    project_key: str = "",
+    mode: str = "full",
+    use_cache: bool = True,
+) -> dict:
+    """Build merged sections using AI when available; fallback to minimal."""
+    ai_content = _expand_with_ai(inputs, project_name, project_key, mode, use_cache)
+    return _sections_from_ai(inputs, ai_content, project_key)
+
+
+def _sections_from_ai(inputs: dict, ai_content: dict, project_key: str = "") -> dict:
+    sections = _map_ai_to_sections(inputs, ai_content)
+    if not ai_content:
+        print("ℹ️ Using Minimal Fallback")
+        if project_key:
+            _set_progress(project_key, "ai", 35, "Using fallback baseline content.")
+    interface_sections = clean_interface_diagrams(sections.get("external_interfaces_section", {}))
+    sections["external_interfaces_section"] = interface_sections
+    return sections
+
+
+def _expand_with_ai(inputs: dict, project_name: str, project_key: str = "", mode: str = "full", use_cache: bool = True) -> dict:
+    """Return parsed AI JSON for the inputs (cached when possible), or {} on failure."""
+    return _cached_ai_request(
+        inputs,
+        mode,
+        lambda: _request_ai_content(inputs, project_name, project_key, mode),
+        project_name,
+        project_key,
+        use_cache,
+    )
+
+
+def _cached_ai_request(cache_inputs: dict, mode: str, request, project_name: str, project_key: str = "", use_cache: bool = True) -> dict:
+    """Serve `request()` through the AI cache, keyed by cache_inputs, mode and model config."""
+    cache = _get_ai_cache() if use_cache else None
+    cache_key = make_ai_cache_key(cache_inputs, mode, _ai_model_signature()) if cache else None
+    if cache:
         try:
-            render_mermaid_png(code, output_png)
-            stats["core_rendered"] += 1
+            cached = cache.get(cache_key)
         except Exception as e:
-            stats["core_failed"] += 1
-            print(f"⚠️ Failed quick render for {key}: {e}")
-    return stats
+            print(f"⚠️ AI cache lookup failed: {e}")
+            cached = None
+        if cached:
+            print(f"♻️ AI content served from cache for: {project_name} ({mode})")
+            if project_key:
+                _set_progress(project_key, "ai", 40, "AI content loaded from cache.")
+            return cached
+
+    ai_content = request()
+    if ai_content and cache:
+        try:
+            cache.put(cache_key, mode, _ai_model_signature(), ai_content)
+        except Exception as e:
+            print(f"⚠️ AI cache store failed: {e}")
+    return ai_content
 
 
-def _build_sections_with_ai(inputs: dict, project_name: str, project_key: str = "", mode: str = "full") -> dict:
-    """Build merged sections using AI when available; fallback to minimal."""
+def _request_ai_content(inputs: dict, project_name: str, project_key: str = "", mode: str = "full") -> dict:
+    """Call the fast LiteLLM path, then Gemini, within the mode's time budget."""
     ai_content = {}
     budget_sec = float(os.getenv("QUICK_AI_BUDGET_SEC", "18")) if mode == "quick" else float(os.getenv("FULL_AI_BUDGET_SEC", "90"))
     started = time.monotonic()
@@ -668,10 +940,7 @@ def _build_sections_with_ai(inputs: dict, project_name: str, project_key: str =
             print(f"🚀 Starting AI Expansion for: {project_name}")
             if project_key:
                 _set_progress(project_key, "ai", 25, "Generating detailed requirements with AI...")
-            import google.generativeai as genai
-            
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            
+
             detail_instruction = "Ensure the content is concise but professional."
             extra_instructions = (inputs.get("output_control") or {}).get("additional_instructions")
             if extra_instructions:
@@ -771,53 +1040,235 @@ def _build_sections_with_ai(inputs: dict, project_name: str, project_key: str =
             - Return ONLY valid JSON (no markdown, no comments).
             """
 
-            # Fast path first (Groq/LiteLLM), then Gemini fallback
-            ai_content = _try_fast_litellm_json(prompt)
-            if ai_content:
-                if project_key:
-                    _set_progress(project_key, "ai", 40, "AI content generated (fast provider).")
-                sections = _map_ai_to_sections(inputs, ai_content)
-                interface_sections = clean_interface_diagrams(sections.get("external_interfaces_section", {}))
-                sections["external_interfaces_section"] = interface_sections
-                return sections
-
-            for model_name in _select_gemini_models():
-                if (time.monotonic() - started) > budget_sec:
-                    print(f"⏱️ AI budget exceeded ({budget_sec}s). Using fallback content.")
-                    break
-                try:
-                    print(f"⚡ Trying model: {model_name}")
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    cleaned_json = clean_and_parse_json(response.text)
-                    if cleaned_json:
-                        ai_content = cleaned_json
-                        print(f"✅ AI Response accepted from: {model_name}")
-                        if project_key:
-                            _set_progress(project_key, "ai", 40, f"AI content generated ({model_name}).")
-                        break
-                    print(f"⚠️ Parsed empty JSON from model: {model_name}")
-                except Exception as model_err:
-                    print(f"⚠️ Model {model_name} failed: {model_err}")
-            if not ai_content:
-                print("⚠️ All models failed or returned invalid JSON. Falling back.")
-                
+            ai_content = _call_ai_json(prompt, budget_sec, started, project_key)
+
         except Exception as e:
             print(f"⚠️ AI Expansion failed: {e}")
             import traceback
             traceback.print_exc()
 
-    sections = _map_ai_to_sections(inputs, ai_content)
-    if not ai_content:
-        print("ℹ️ Using Minimal Fallback")
+    return ai_content
+
+
+def _call_ai_json(prompt: str, budget_sec: float, started: float, project_key: str = "") -> dict:
+    """Fast path first (Groq/LiteLLM), then Gemini fallback; {} when nothing usable came back."""
+    ai_content = _try_fast_litellm_json(prompt)
+    if ai_content:
         if project_key:
-            _set_progress(project_key, "ai", 35, "Using fallback baseline content.")
-    interface_sections = clean_interface_diagrams(sections.get("external_interfaces_section", {}))
-    sections["external_interfaces_section"] = interface_sections
-    return sections
+            _set_progress(project_key, "ai", 40, "AI content generated (fast provider).")
+        return ai_content
+
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    for model_name in _select_gemini_models():
+        if (time.monotonic() - started) > budget_sec:
+            print(f"⏱️ AI budget exceeded ({budget_sec}s). Using fallback content.")
+            break
+        try:
+            print(f"⚡ Trying model: {model_name}")
+            model = genai.GenerativeModel(model_name)
+            response = model.generate_content(prompt)
+            cleaned_json = clean_and_parse_json(response.text)
+            if cleaned_json:
+                print(f"✅ AI Response accepted from: {model_name}")
+                if project_key:
+                    _set_progress(project_key, "ai", 40, f"AI content generated ({model_name}).")
+                return cleaned_json
+            print(f"⚠️ Parsed empty JSON from model: {model_name}")
+        except Exception as model_err:
+            print(f"⚠️ Model {model_name} failed: {model_err}")
+    print("⚠️ All models failed or returned invalid JSON. Falling back.")
+    return {}
+
+
+def _expand_enhanced_from_quick(
+    inputs: dict,
+    project_name: str,
+    project_key: str,
+    base_ai: dict,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Upgrade quick-mode AI JSON to enhanced by asking only for what quick mode
+    leaves out or keeps short: enterprise-length feature descriptions and
+    product perspective, user classes with responsibilities and skills,
+    structured requirements per feature and risk analysis. The requirement
+    lists and introduction are reused. Returns {} when the additions could
+    not be generated.
+    """
+    features = [
+        {"feature_name": str(item.get("feature_name", "")).strip(), "description": item.get("description", "")}
+        for item in base_ai.get("functional_requirements") or []
+        if isinstance(item, dict) and str(item.get("feature_name", "")).strip()
+    ]
+    if not features:
+        return {}
+    overall = base_ai.get("overall_description") if isinstance(base_ai.get("overall_description"), dict) else {}
+    user_classes = [
+        str(item.get("user_class", "")).strip()
+        for item in overall.get("user_characteristics") or []
+        if isinstance(item, dict) and str(item.get("user_class", "")).strip()
+    ]
+    cache_inputs = {"inputs": inputs, "features": [f["feature_name"] for f in features], "user_classes": user_classes}
+    additions = _cached_ai_request(
+        cache_inputs,
+        "enhanced_delta",
+        lambda: _request_enhancement_delta(inputs, project_name, features, user_classes),
+        project_name,
+        use_cache=use_cache,
+    )
+    if not additions:
+        return {}
+    return _merge_enhancement_delta(base_ai, additions)
+
+
+def _request_enhancement_delta(inputs: dict, project_name: str, features: list, user_classes: list) -> dict:
+    if not API_KEY_CONFIGURED:
+        return {}
+    print(f"🚀 Requesting enhanced additions for: {project_name}")
+    # Same register as the full enhanced prompt in _request_ai_content.
+    detail_instruction = (
+        "PROVIDE EXTENSIVE ENTERPRISE-GRADE DETAIL. "
+        "Write comprehensive, professional paragraphs (100-150 words) for descriptions. "
+        "Use structured data for tables."
+    )
+    extra_instructions = (inputs.get("output_control") or {}).get("additional_instructions")
+    if extra_instructions:
+        detail_instruction = f"{detail_instruction}\nAdditional instructions: {extra_instructions}"
+    prompt = f"""
+    You are an expert Senior Technical Writer completing an IEEE 830 Software Requirements Specification (SRS).
+    The functional requirements below are already written. Only add the missing detail, in JSON format.
+
+    {detail_instruction}
+
+    Project Input Data:
+    {json.dumps(inputs, indent=2)}
+
+    Existing Features:
+    {json.dumps(features, indent=2)}
+
+    Existing User Classes:
+    {json.dumps(user_classes)}
+
+    Required JSON Structure:
+    {{
+        "feature_descriptions": {{
+            "Feature Name": "Detailed 100-150 word description of the feature."
+        }},
+        "product_perspective": "Detailed 200-word perspective...",
+        "user_characteristics": [
+            {{
+                "user_class": "Admin",
+                "characteristics": "System administrator...",
+                "responsibilities": "System config, User management",
+                "skills": "High technical proficiency"
+            }}
+        ],
+        "structured_requirements": {{
+            "Feature Name": {{
+                "inputs": "User ID, Password...",
+                "outputs": "Dashboard, Error Message...",
+                "acceptance_criteria": "User must be redirected within 2s..."
+            }}
+        }},
+        "risk_analysis": [
+            {{
+                "risk": "Data Breach",
+                "probability": "Low",
+                "impact": "High",
+                "mitigation": "Encryption at rest..."
+            }}
+        ]
+    }}
+
+    Constraints:
+    - Provide feature_descriptions and structured_requirements for every existing feature, keyed by its exact feature_name.
+    - Provide user_characteristics for every existing user class (add any that are missing).
+    - Provide 4-6 project-specific risks.
+    - Return ONLY valid JSON (no markdown, no comments).
+    """
+    try:
+        return _call_ai_json(prompt, float(os.getenv("FULL_AI_BUDGET_SEC", "90")), time.monotonic())
+    except Exception as e:
+        print(f"⚠️ Enhanced additions failed: {e}")
+        return {}
+
+
+def _merge_enhancement_delta(base_ai: dict, additions: dict) -> dict:
+    """Return a copy of base_ai with the enhanced descriptions, user classes, structured requirements and risks filled in."""
+    merged = copy.deepcopy(base_ai)
+    descriptions = additions.get("feature_descriptions")
+    descriptions = {
+        str(name).strip().lower(): value.strip()
+        for name, value in (descriptions.items() if isinstance(descriptions, dict) else ())
+        if isinstance(value, str) and value.strip()
+    }
+    structured = additions.get("structured_requirements")
+    if isinstance(structured, list):
+        # Tolerate [{"feature_name": ..., "inputs": ...}] instead of a mapping.
+        structured = {
+            str(item.get("feature_name", "")): item
+            for item in structured
+            if isinstance(item, dict)
+        }
+    by_name = {
+        str(name).strip().lower(): value
+        for name, value in (structured or {}).items()
+        if isinstance(value, dict)
+    }
+    for item in merged.get("functional_requirements") or []:
+        if not isinstance(item, dict):
+            continue
+        name = str(item.get("feature_name", "")).strip().lower()
+        if descriptions.get(name):
+            item["description"] = descriptions[name]
+        extra = by_name.get(name)
+        if extra:
+            item["structured_requirements"] = {
+                k: extra.get(k, "") for k in ("inputs", "outputs", "acceptance_criteria")
+            }
+    risks = additions.get("risk_analysis")
+    if isinstance(risks, list) and risks:
+        merged["risk_analysis"] = risks
+    overall = merged.get("overall_description")
+    if not isinstance(overall, dict):
+        overall = merged["overall_description"] = {}
+    perspective = additions.get("product_perspective")
+    if isinstance(perspective, str) and perspective.strip():
+        overall["product_perspective"] = perspective.strip()
+    user_chars = [
+        item for item in additions.get("user_characteristics") or []
+        if isinstance(item, dict) and str(item.get("user_class", "")).strip()
+    ]
+    if user_chars:
+        overall["user_characteristics"] = user_chars
+    return merged
+
+
+def _static_url(path) -> str | None:
+    try:
+        relative = Path(path).resolve().relative_to(STATIC_DIR.resolve())
+    except ValueError:
+        return None
+    return f"/static/{relative.as_posix()}"
+
+
+def _store_outputs(project_key: str, items: list) -> dict:
+    """Record generated files in the blob store: items are (variant, path, url); returns {variant: digest}."""
+    store = get_blob_store()
+    if store is None:
+        return {}
+    try:
+        return store.put_files(project_key, items)
+    except Exception as e:
+        print(f"⚠️ Could not store outputs for {project_key} in blob store: {e}")
+        return {}
 
 
 def _generate_document(project_name: str, project_key: str, inputs: dict, sections: dict, image_paths: dict, variant: str):
+    # The previous build may be linked to a stored blob; write a new file.
+    detach(_output_path(project_key, variant))
     output_file = generate_srs_document(
         project_name=project_name,
         introduction_section=sections["introduction_section"],
@@ -835,12 +1286,25 @@ def _generate_document(project_name: str, project_key: str, inputs: dict, sectio
         mode=variant
     )
     
+    docx_variant = f"docx:{variant}"
+    items = [(docx_variant, output_file, f"/download_srs/{Path(output_file).name}")]
+    for name, path in image_paths.items():
+        url = _static_url(path) if path and Path(path).is_file() else None
+        if url:
+            items.append((f"diagram:{name}", path, url))
+    stored = _store_outputs(project_key, items)
+
     # Auto-publish as sample report for Landing Page demo
     try:
-        import shutil
-        sample_path = os.path.join("backend", "beta", "static", "sample_report.docx")
-        shutil.copy(output_file, sample_path)
-        print(f"📄 Updated public sample report at: {sample_path}")
+        if docx_variant in stored:
+            # Another manifest entry for the same blob instead of a copy in static/.
+            get_blob_store().assign("_public", "sample_report", stored[docx_variant], "/static/sample_report.docx")
+            print("📄 Updated public sample report at: /static/sample_report.docx")
+        else:
+            sample_path = STATIC_DIR / "sample_report.docx"
+            detach(sample_path)
+            shutil.copy(output_file, sample_path)
+            print(f"📄 Updated public sample report at: {sample_path}")
     except Exception as e:
         print(f"⚠️ Failed to update sample report: {e}")
         
@@ -863,27 +1327,77 @@ def _generate_instant_fallback(project_name: str, project_key: str, inputs: dict
     return _generate_document(project_name, project_key, inputs, sections, instant_image_paths, "instant")
 
 
-def _generate_enhanced_background(inputs: dict, project_name: str, project_key: str):
-    """Background task to create enhanced SRS after quick file is returned."""
+def _generate_enhanced_background(
+    inputs: dict,
+    project_name: str,
+    project_key: str,
+    use_cache: bool = True,
+    quick_artifacts: dict | None = None,
+    reraise: bool = False,
+):
+    """
+    Background task to create enhanced SRS after quick file is returned.
+
+    quick_artifacts carries the quick run's parsed AI JSON, sections and
+    rendered diagram paths; when present only the enhanced-only fields are
+    requested and only the diagrams quick mode did not render are rendered.
+    With reraise=True failures propagate so a queue worker can retry the job.
+    """
     try:
         print(f"🛠️ Background enhanced generation started: {project_name}")
         _set_progress(project_key, "enhanced_ai", 88, "Preparing enhanced version...", status="processing")
         image_paths = _build_image_paths(project_key)
-        sections = _build_sections_with_ai(inputs, project_name, project_key, mode="enhanced")
-        _set_progress(project_key, "enhanced_diagrams", 92, "Rendering enhanced diagrams...", status="processing")
-        diagram_stats = _render_all_diagrams(inputs, image_paths, sections["external_interfaces_section"])
+        quick_artifacts = quick_artifacts or {}
+        profile = _render_profile_for("enhanced")
+        priority = _render_priority_for("enhanced")
+        reused = {
+            key for key, path in (quick_artifacts.get("rendered") or {}).items()
+            if str(image_paths.get(key)) == str(path) and Path(path).is_file()
+        } if quick_artifacts.get("render_profile", DEFAULT_RENDER_PROFILE) == profile else set()
+        if reused:
+            print(f"♻️ Reusing quick-mode diagrams: {', '.join(sorted(reused))}")
+        base_ai = quick_artifacts.get("ai_content") or {}
+        # Core diagrams only need the inputs, so render them while the AI call is in flight.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            core_render = executor.submit(
+                _render_core_diagrams, inputs, image_paths, None, reused, profile, priority, project_key
+            )
+            if base_ai:
+                ai_content = _expand_enhanced_from_quick(inputs, project_name, project_key, base_ai, use_cache)
+                if ai_content:
+                    sections = _sections_from_ai(inputs, ai_content, project_key)
+                else:
+                    print("ℹ️ Enhanced additions unavailable; reusing quick-mode sections")
+                    sections = copy.deepcopy(quick_artifacts.get("sections")) or _sections_from_ai(inputs, base_ai, project_key)
+            else:
+                sections = _build_sections_with_ai(inputs, project_name, project_key, mode="enhanced", use_cache=use_cache)
+            _set_progress(project_key, "enhanced_diagrams", 92, "Rendering enhanced diagrams...", status="processing")
+            interface_stats = _render_interface_diagrams(
+                image_paths, sections["external_interfaces_section"], profile, priority, project_key
+            )
+            diagram_stats = _merge_render_stats(core_render.result(), interface_stats)
         template_stats = _ensure_minimum_diagrams(image_paths, mode="enhanced")
-        if diagram_stats["core_rendered"] == 0:
+        if diagram_stats["core_rendered"] == 0 and not reused:
             _set_progress(project_key, "enhanced_diagrams", 93, "Diagrams unavailable; continuing enhanced build.", status="processing")
         if template_stats["filled_from_template"] > 0:
             _set_progress(project_key, "enhanced_diagrams", 94, "Applied template diagram fallback for quality consistency.", status="processing")
         _set_progress(project_key, "enhanced_doc", 96, "Compiling enhanced DOCX...", status="processing")
         _generate_document(project_name, project_key, inputs, sections, image_paths, "enhanced")
-        _set_progress(project_key, "completed", 100, "Enhanced document ready.", status="completed")
+        _set_progress(
+            project_key,
+            "completed",
+            100,
+            "Enhanced document ready.",
+            status="completed",
+            download_url=f"/download_srs/{Path(_output_path(project_key, 'enhanced')).name}",
+            mode="enhanced",
+        )
         print(f"✅ Background enhanced generation completed: {project_name}")
     except Exception as e:
         _set_progress(project_key, "failed", 100, f"Enhanced generation failed: {e}", status="failed")
         print(f"❌ Background enhanced generation failed for {project_name}: {e}")
+        if reraise:
+            raise
 
 
 @app.get("/srs_status/{project_key}")
@@ -906,28 +1420,196 @@ async def srs_status(project_key: str):
     }
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """Runtime counters for the diagram render pipeline."""
+    cache = get_render_cache()
+    return {
+        "render_cache": cache.stats() if cache else {"enabled": False},
+        "render_pool": get_render_pool().stats(),
+        "mermaid_validation": validation_stats(),
+        "fast_llm": _fast_llm_stats(),
+        "ai_cache": _get_ai_cache().stats() if _get_ai_cache() else {"enabled": False},
+        "jobs": get_job_queue().stats() if job_queue_enabled() else {"enabled": False},
+        "progress_streams": get_progress_broker().stats(),
+        "progress_store": get_progress_store().stats(),
+        "docx_images": get_docx_image_assets().stats(),
+        "projects": ProjectStore.stats(),
+        "blob_store": get_blob_store().stats() if get_blob_store() else {"enabled": False},
+        "artifact_gc": _get_artifact_gc().stats(),
+    }
+
+
+@app.get("/api/artifacts/{project_key}")
+async def project_artifacts(project_key: str):
+    """Blob-store manifest for a project: variant -> digest, URL and size."""
+    store = get_blob_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Blob store is disabled")
+    return {"project_key": project_key, "variants": store.manifest(project_key)}
+
+
+_ARTIFACT_GC = None
+_ARTIFACT_GC_LOCK = threading.Lock()
+
+
+def _get_artifact_gc() -> ArtifactGC:
+    """Process-wide artifact GC; its background pass only runs with ARTIFACT_GC_ENABLED=1."""
+    global _ARTIFACT_GC
+    with _ARTIFACT_GC_LOCK:
+        if _ARTIFACT_GC is None:
+            _ARTIFACT_GC = ArtifactGC(
+                STATIC_DIR,
+                Path("./backend/beta/generated_srs"),
+                diagram_suffixes=[path.stem for path in _build_image_paths("").values()],
+                # Template diagrams back _ensure_minimum_diagrams; _public holds the sample report.
+                protected_keys=[*_TEMPLATE_DIAGRAM_PREFIXES, "_public"],
+                retention_sec={
+                    c: float(os.getenv(f"ARTIFACT_RETENTION_DAYS_{c.upper()}", str(DEFAULT_RETENTION_DAYS[c]))) * 86400
+                    for c in ARTIFACT_CLASSES
+                },
+                max_total_bytes=int(float(os.getenv("ARTIFACT_GC_MAX_TOTAL_MB", "2048")) * 1024 * 1024),
+                max_project_bytes=int(float(os.getenv("ARTIFACT_GC_MAX_PROJECT_MB", "100")) * 1024 * 1024),
+                min_age_sec=float(os.getenv("ARTIFACT_GC_MIN_AGE_SEC", "900")),
+                interval_sec=float(os.getenv("ARTIFACT_GC_INTERVAL_SEC", "3600")),
+            )
+        return _ARTIFACT_GC
+
+
+@app.on_event("startup")
+def _start_artifact_gc():
+    if os.getenv("ARTIFACT_GC_ENABLED", "0").strip().lower() in ("1", "true", "yes"):
+        gc = _get_artifact_gc()
+        gc.start()
+        print(f"🧹 Artifact GC enabled (every {gc.interval_sec:.0f}s)")
+
+
+@app.on_event("shutdown")
+def _stop_artifact_gc():
+    if _ARTIFACT_GC is not None:
+        _ARTIFACT_GC.stop()
+
+
+@app.get("/api/gc/dry-run")
+async def artifact_gc_dry_run(limit: int = Query(default=200, ge=1, le=5000)):
+    """What the artifact GC would delete now, and why (nothing is deleted)."""
+    plan = await run_in_threadpool(_get_artifact_gc().plan)
+    plan["delete"] = plan["delete"][:limit]
+    return plan
+
+
+@app.get("/api/gc/metrics")
+async def artifact_gc_metrics():
+    """Artifact GC settings, totals and the last pass."""
+    return _get_artifact_gc().stats()
+
+
 @app.get("/srs_progress/{project_key}")
 async def srs_progress(project_key: str):
     """Stage-wise progress for SRS generation."""
     return _get_progress(project_key)
 
 
-@app.post("/generate_srs")
-async def generate_srs(
-    srs_data: SRSRequest,
-    background_tasks: BackgroundTasks,
-    mode: str = Query(default="full", regex="^(full|quick|instant)$"),
-):
-    inputs = srs_data.dict()
-    project_name = inputs["project_identity"]["project_name"]
+PROGRESS_HEARTBEAT_SEC = float(os.getenv("PROGRESS_HEARTBEAT_SEC", "15"))
+PROGRESS_COALESCE_SEC = float(os.getenv("PROGRESS_COALESCE_MS", "100")) / 1000
+PROGRESS_SHARED_POLL_SEC = float(os.getenv("PROGRESS_SHARED_POLL_SEC", "1"))
+
+
+async def _progress_updates(project_key: str, is_disconnected):
+    """
+    Yield the current snapshot, then each pushed update; None means "send a
+    heartbeat". With a shared progress store, builds may run in other
+    processes whose updates never reach this process's broker, so the store
+    is re-read between pushes as well.
+    """
+    subscription = get_progress_broker().subscribe(project_key)
+    shared = get_progress_store().shared
+    wait_sec = min(PROGRESS_HEARTBEAT_SEC, PROGRESS_SHARED_POLL_SEC) if shared else PROGRESS_HEARTBEAT_SEC
+    try:
+        last = await run_in_threadpool(_get_progress, project_key)
+        yield last
+        idle = 0.0
+        while not await is_disconnected():
+            snapshot = await subscription.next(wait_sec, PROGRESS_COALESCE_SEC)
+            if snapshot is None and shared:
+                snapshot = await run_in_threadpool(_get_progress, project_key)
+                if snapshot == last:
+                    snapshot = None
+            if snapshot is not None:
+                last = snapshot
+                idle = 0.0
+                yield snapshot
+                continue
+            idle += wait_sec
+            if idle >= PROGRESS_HEARTBEAT_SEC:
+                idle = 0.0
+                yield None
+    finally:
+        subscription.close()
+
+
+@app.get("/srs_progress/{project_key}/stream")
+async def srs_progress_stream(project_key: str, request: Request):
+    """Server-Sent Events stream of progress updates (replaces polling /srs_progress)."""
+
+    async def events():
+        yield "retry: 3000\n\n"
+        async for snapshot in _progress_updates(project_key, request.is_disconnected):
+            if snapshot is None:
+                yield ": heartbeat\n\n"
+            else:
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/ws/srs_progress/{project_key}")
+async def srs_progress_ws(websocket: WebSocket, project_key: str):
+    """WebSocket variant of the progress stream; heartbeats are {"event": "heartbeat"}."""
+    await websocket.accept()
+
+    async def is_disconnected():
+        return websocket.client_state != WebSocketState.CONNECTED
+
+    try:
+        async for snapshot in _progress_updates(project_key, is_disconnected):
+            await websocket.send_json({"event": "heartbeat"} if snapshot is None else {"event": "progress", "data": snapshot})
+    except WebSocketDisconnect:
+        pass
+
+
+def _project_key_for(inputs: dict) -> str:
     # If project_id is provided from Node.js, use it as the stable key for files & progress.
     # This prevents creating multiple files for the same project during regeneration.
     project_id = inputs["project_identity"].get("project_id")
     if project_id:
-        project_key = str(project_id)
-    else:
-        project_key = _safe_project_key(project_name)
-    
+        return str(project_id)
+    return _safe_project_key(inputs["project_identity"]["project_name"])
+
+
+def _in_background(fn, *args) -> Future:
+    """Run fn on its own thread so the caller can overlap it with other work."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        return executor.submit(fn, *args)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _run_srs_generation(inputs: dict, mode: str, use_cache: bool, schedule_enhanced) -> dict:
+    """
+    The blocking SRS pipeline behind /generate_srs, run either in the API
+    threadpool or by a queue worker. schedule_enhanced(inputs, project_name,
+    project_key, use_cache, quick_artifacts=None) queues the follow-up
+    enhanced build for instant/quick results.
+    """
+    project_name = inputs["project_identity"]["project_name"]
+    project_key = _project_key_for(inputs)
+
     _ensure_output_dir()
     image_paths = _build_image_paths(project_key)
     _set_progress(project_key, "init", 5, "Initializing generation...")
@@ -947,8 +1629,7 @@ async def generate_srs(
 
             try:
                 _set_progress(project_key, "doc", 70, "Building DOCX file...")
-                generated_path = await run_in_threadpool(
-                    _generate_document,
+                generated_path = _generate_document(
                     project_name, project_key, inputs, sections, instant_image_paths, "instant"
                 )
                 _set_progress(
@@ -960,7 +1641,7 @@ async def generate_srs(
                     download_url=f"/download_srs/{Path(generated_path).name}",
                     mode="instant",
                 )
-                background_tasks.add_task(_generate_enhanced_background, inputs, project_name, project_key)
+                schedule_enhanced(inputs, project_name, project_key, use_cache)
                 return {
                     "status": "success",
                     "mode": "instant",
@@ -979,10 +1660,24 @@ async def generate_srs(
 
         if mode == "quick":
             # Quick mode: AI-enriched sections + only 2 core diagrams (better quality, faster than full).
-            sections = _build_sections_with_ai(inputs, project_name, project_key, mode="quick")
+            # Core diagrams depend only on the inputs: start them now so mmdc overlaps the AI call.
+            core_render = _in_background(_render_quick_diagrams, inputs, image_paths, project_key)
+            try:
+                quick_ai = _expand_with_ai(inputs, project_name, project_key, "quick", use_cache)
+                sections = _sections_from_ai(inputs, quick_ai, project_key)
+            except Exception:
+                futures_wait([core_render])
+                raise
             _set_progress(project_key, "diagrams", 55, "Rendering core diagrams...")
-            quick_stats = await run_in_threadpool(_render_quick_diagrams, inputs, image_paths)
-            quick_template_stats = await run_in_threadpool(_ensure_minimum_diagrams, image_paths, "quick")
+            quick_stats = core_render.result()
+            # Handed to the enhanced build so it only fills in what quick mode skipped.
+            quick_artifacts = {
+                "ai_content": quick_ai,
+                "sections": copy.deepcopy(sections),
+                "rendered": {key: image_paths[key] for key in quick_stats["rendered_keys"]},
+                "render_profile": _render_profile_for("quick"),
+            }
+            quick_template_stats = _ensure_minimum_diagrams(image_paths, "quick")
             if quick_stats["core_rendered"] == 0:
                 # Do not fail quick mode; generate document without freshly rendered diagrams.
                 _set_progress(
@@ -1002,8 +1697,8 @@ async def generate_srs(
                 )
             try:
                 _set_progress(project_key, "doc", 80, "Compiling quick DOCX...")
-                generated_path = await run_in_threadpool(
-                    _generate_document, project_name, project_key, inputs, sections, image_paths, "quick"
+                generated_path = _generate_document(
+                    project_name, project_key, inputs, sections, image_paths, "quick"
                 )
                 _set_progress(
                     project_key,
@@ -1014,7 +1709,7 @@ async def generate_srs(
                     download_url=f"/download_srs/{Path(generated_path).name}",
                     mode="quick",
                 )
-                background_tasks.add_task(_generate_enhanced_background, inputs, project_name, project_key)
+                schedule_enhanced(inputs, project_name, project_key, use_cache, quick_artifacts)
                 return {
                     "status": "success",
                     "mode": "quick",
@@ -1033,7 +1728,7 @@ async def generate_srs(
                 traceback.print_exc()
                 try:
                     _set_progress(project_key, "doc", 82, "Quick build failed, switching to instant fallback...")
-                    generated_path = await run_in_threadpool(_generate_instant_fallback, project_name, project_key, inputs, image_paths)
+                    generated_path = _generate_instant_fallback(project_name, project_key, inputs, image_paths)
                     _set_progress(
                         project_key,
                         "completed",
@@ -1043,7 +1738,7 @@ async def generate_srs(
                         download_url=f"/download_srs/{Path(generated_path).name}",
                         mode="instant",
                     )
-                    background_tasks.add_task(_generate_enhanced_background, inputs, project_name, project_key)
+                    schedule_enhanced(inputs, project_name, project_key, use_cache)
                     return {
                         "status": "success",
                         "mode": "instant",
@@ -1058,10 +1753,21 @@ async def generate_srs(
                     _set_progress(project_key, "failed", 100, str(fallback_err), status="failed")
                     raise HTTPException(status_code=500, detail=f"Quick and instant fallback failed: {fallback_err}")
 
-        sections = _build_sections_with_ai(inputs, project_name, project_key)
+        # Only the interface diagrams wait for the AI output; core diagrams render alongside it.
+        profile = _render_profile_for("full")
+        priority = _render_priority_for("full")
+        core_render = _in_background(_render_core_diagrams, inputs, image_paths, None, (), profile, priority, project_key)
+        try:
+            sections = _build_sections_with_ai(inputs, project_name, project_key, "full", use_cache)
+        except Exception:
+            futures_wait([core_render])
+            raise
         _set_progress(project_key, "diagrams", 60, "Rendering all diagrams...")
-        diagram_stats = await run_in_threadpool(_render_all_diagrams, inputs, image_paths, sections["external_interfaces_section"])
-        full_template_stats = await run_in_threadpool(_ensure_minimum_diagrams, image_paths, "full")
+        interface_stats = _render_interface_diagrams(
+            image_paths, sections["external_interfaces_section"], profile, priority, project_key
+        )
+        diagram_stats = _merge_render_stats(core_render.result(), interface_stats)
+        full_template_stats = _ensure_minimum_diagrams(image_paths, "full")
         if diagram_stats["core_rendered"] == 0:
             _set_progress(
                 project_key,
@@ -1082,8 +1788,8 @@ async def generate_srs(
         # 3. Document Construction Phase
         try:
             _set_progress(project_key, "doc", 85, "Building full DOCX...")
-            generated_path = await run_in_threadpool(
-                _generate_document, project_name, project_key, inputs, sections, image_paths, "full"
+            generated_path = _generate_document(
+                project_name, project_key, inputs, sections, image_paths, "full"
             )
             _set_progress(
                 project_key,
@@ -1112,7 +1818,7 @@ async def generate_srs(
             traceback.print_exc()
             try:
                 _set_progress(project_key, "doc", 88, "Full build failed, switching to instant fallback...")
-                generated_path = await run_in_threadpool(_generate_instant_fallback, project_name, project_key, inputs, image_paths)
+                generated_path = _generate_instant_fallback(project_name, project_key, inputs, image_paths)
                 _set_progress(
                     project_key,
                     "completed",
@@ -1122,7 +1828,7 @@ async def generate_srs(
                     download_url=f"/download_srs/{Path(generated_path).name}",
                     mode="instant",
                 )
-                background_tasks.add_task(_generate_enhanced_background, inputs, project_name, project_key)
+                schedule_enhanced(inputs, project_name, project_key, use_cache)
                 return {
                     "status": "success",
                     "message": "Full generation failed, instant fallback generated successfully.",
@@ -1150,7 +1856,7 @@ async def generate_srs(
                 download_url=f"/download_srs/{Path(generated_path).name}",
                 mode="instant",
             )
-            background_tasks.add_task(_generate_enhanced_background, inputs, project_name, project_key)
+            schedule_enhanced(inputs, project_name, project_key, use_cache)
             return {
                 "status": "success",
                 "message": "Unexpected error; instant fallback generated successfully.",
@@ -1164,6 +1870,122 @@ async def generate_srs(
             raise HTTPException(status_code=500, detail=f"Unexpected error; instant fallback failed: {fallback_err}")
 
 
+def _enqueue_enhanced(inputs: dict, project_name: str, project_key: str, use_cache: bool = True, quick_artifacts: dict | None = None):
+    get_job_queue().enqueue(
+        "enhanced_srs",
+        {
+            "inputs": inputs,
+            "project_name": project_name,
+            "project_key": project_key,
+            "use_cache": use_cache,
+            "quick_artifacts": quick_artifacts,
+        },
+    )
+
+
+def _run_generate_job(payload: dict) -> dict:
+    return _run_srs_generation(payload["inputs"], payload["mode"], payload["use_cache"], _enqueue_enhanced)
+
+
+def _run_enhanced_job(payload: dict) -> dict:
+    _generate_enhanced_background(
+        payload["inputs"],
+        payload["project_name"],
+        payload["project_key"],
+        payload.get("use_cache", True),
+        payload.get("quick_artifacts"),
+        reraise=True,
+    )
+    return {"project_key": payload["project_key"], "mode": "enhanced"}
+
+
+# Handlers run by `python -m backend.beta.worker`, keyed by job kind.
+JOB_HANDLERS = {
+    "generate_srs": _run_generate_job,
+    "enhanced_srs": _run_enhanced_job,
+}
+
+
+def _job_summary(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+@app.post("/generate_srs")
+async def generate_srs(
+    srs_data: SRSRequest,
+    background_tasks: BackgroundTasks,
+    mode: str = Query(default="full", regex="^(full|quick|instant)$"),
+    refresh: bool = Query(default=False, description="Bypass the AI response cache and regenerate content."),
+    wait: Optional[float] = Query(
+        default=None,
+        ge=0,
+        description="With the job queue enabled: seconds to wait for the result before returning the job handle.",
+    ),
+):
+    inputs = srs_data.dict()
+    if not job_queue_enabled():
+        def schedule_enhanced(*args):
+            background_tasks.add_task(_generate_enhanced_background, *args)
+
+        return await run_in_threadpool(_run_srs_generation, inputs, mode, not refresh, schedule_enhanced)
+
+    # Queue mode: the CPU-heavy pipeline runs in worker processes.
+    project_key = _project_key_for(inputs)
+    queue = get_job_queue()
+    job_id = await run_in_threadpool(
+        queue.enqueue, "generate_srs", {"inputs": inputs, "mode": mode, "use_cache": not refresh, "project_key": project_key}
+    )
+    _set_progress(project_key, "queued", 2, "Waiting for a generation worker...", job_id=job_id)
+    wait_sec = float(os.getenv("JOB_WAIT_SEC", "180")) if wait is None else wait
+    deadline = time.monotonic() + wait_sec
+    job = None
+    while True:
+        job = await run_in_threadpool(queue.get, job_id)
+        if job and job["status"] in FINISHED_STATES:
+            break
+        if time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(min(0.5, max(0.05, deadline - time.monotonic())))
+
+    if job and job["status"] == "succeeded":
+        return job["result"]
+    if job and job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"] or "SRS generation failed")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "queued",
+            "mode": mode,
+            "job_id": job_id,
+            "job_status": job["status"] if job else "queued",
+            "job_status_url": f"/jobs/{job_id}",
+            "progress_url": f"/srs_progress/{project_key}",
+            "enhanced_status_url": f"/srs_status/{project_key}",
+        },
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status (and result once finished) of a queued generation job."""
+    if not job_queue_enabled():
+        raise HTTPException(status_code=404, detail="Job queue is disabled")
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_summary(job)
+
+
 # --- AI Notebook Endpoints ---
 
 from backend.beta.services.workflow_service import WorkflowService
@@ -1279,7 +2101,9 @@ async def diagram_image_status():
     mmdc_path = shutil.which("mmdc") or shutil.which("mmdc.cmd")
     return JSONResponse(content={
         "enabled": bool(mmdc_path),
-        "reason": "" if mmdc_path else "mmdc not found. Install @mermaid-js/mermaid-cli."
+        "reason": "" if mmdc_path else "mmdc not found. Install @mermaid-js/mermaid-cli.",
+        # SRS template diagrams render in-process even without mmdc
+        "native": native_render_enabled(),
     })
 
 @app.get("/api/notebook/image/status")
@@ -1313,14 +2137,17 @@ async def append_diagram_to_project(project_id: str, request: AppendDiagramReque
         raise HTTPException(status_code=400, detail="Content is required")
 
     try:
-        data = await _generate_diagram_image_data(request.content)
+        # Embedded in the project's DOCX as well, so render at document size.
+        data = await _generate_diagram_image_data(request.content, profile="document")
         diagrams_dir = Path("backend/beta/static/diagrams")
         diagrams_dir.mkdir(parents=True, exist_ok=True)
         filename = f"{project_id}_diagram_{int(time.time())}.png"
         image_path = diagrams_dir / filename
+        detach(image_path)
         image_path.write_bytes(data)
 
         image_url = f"/static/diagrams/{filename}"
+        _store_outputs(project_id, [(f"studio:{filename}", image_path, image_url)])
         caption = (request.caption or "Studio Diagram").strip()
         markdown_block = f"\n\n## {caption}\n\n![{caption}]({image_url})\n"
         project.contentMarkdown = (project.contentMarkdown or "") + markdown_block
@@ -1332,8 +2159,14 @@ async def append_diagram_to_project(project_id: str, request: AppendDiagramReque
             doc.add_page_break()
             doc.add_heading(caption, level=1)
             doc.add_paragraph("Generated from DocuVerse Studio.")
-            doc.add_picture(str(image_path), width=Inches(6.5))
+            doc.add_picture(get_docx_image_assets().stream(image_path), width=Inches(6.5))
+            detach(doc_path)
             doc.save(doc_path)
+            document_url = f"/download_srs/{doc_path.name}"
+            store = get_blob_store()
+            entry = store.entry(document_url) if store else None
+            owner, variant = (entry["project_key"], entry["variant"]) if entry else (project_id, "docx:studio")
+            _store_outputs(owner, [(variant, doc_path, document_url)])
         else:
             updated_document_url = project.documentUrl
 
@@ -1403,6 +2236,63 @@ async def create_project(request: CreateProjectRequest):
     ProjectStore.save_project(project)
     return JSONResponse(content={"id": project_id, "message": "Project created successfully"})
 
+def _iso_filter(name: str, value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or timestamp")
+    if parsed.tzinfo is not None:
+        # created_at is stored as naive local time and compared as text.
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+@app.get("/api/projects")
+async def list_projects(
+    status: Optional[List[str]] = Query(default=None),
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    fields: Optional[str] = None,
+):
+    """
+    Lists projects newest first from ProjectStore's status/created_at indexes.
+    status may repeat or be comma-separated; pass next_cursor back as cursor
+    for the following page. contentMarkdown is only returned when named in fields.
+    """
+    statuses = [s.strip().upper() for value in status or [] for s in value.split(",") if s.strip()]
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        return ProjectStore.list_projects(
+            statuses=statuses,
+            created_after=_iso_filter("created_after", created_after),
+            created_before=_iso_filter("created_before", created_before),
+            cursor=cursor,
+            limit=limit,
+            fields=field_list,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/projects/search")
+async def search_projects(
+    q: str,
+    status: Optional[List[str]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    """
+    Ranked full-text search over project names, contentMarkdown and review
+    feedback. Every word must match; `word*` matches a prefix. Snippets mark
+    hits with **bold**.
+    """
+    statuses = [s.strip().upper() for value in status or [] for s in value.split(",") if s.strip()]
+    try:
+        return ProjectStore.search_projects(q, statuses=statuses, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/project/{project_id}")
 async def get_project(project_id: str):
     project = ProjectStore.get_project(project_id)
@@ -1431,7 +2321,7 @@ async def start_review(request: ReviewRequest):
             raise HTTPException(status_code=404, detail="Project not found in Python backend store")
 
     # Update Status
-    ProjectStore.update_status(project.id, "IN_REVIEW")
+    project.status = "IN_REVIEW"
     project.clientEmail = request.clientEmail
     project.reviewToken = project.reviewToken or str(uuid.uuid4())
     project.reviewTokenUsed = False
@@ -1441,6 +2331,7 @@ async def start_review(request: ReviewRequest):
         description="Email sent to client for review.",
         status="IN_REVIEW"
     ))
+    ProjectStore.save_project(project)
     
     from backend.beta.utils.email_service import send_review_email
 
@@ -1531,7 +2422,7 @@ async def resend_review(request: ReviewRequest):
         if not project:
             raise HTTPException(status_code=404, detail="Project not found in Python backend store")
 
-    ProjectStore.update_status(project.id, "IN_REVIEW")
+    project.status = "IN_REVIEW"
     project.clientEmail = request.clientEmail
     project.reviewToken = project.reviewToken or str(uuid.uuid4())
     project.reviewTokenUsed = False
@@ -1541,6 +2432,7 @@ async def resend_review(request: ReviewRequest):
         description="Updated review email sent to client.",
         status="IN_REVIEW"
     ))
+    ProjectStore.save_project(project)
 
     from backend.beta.utils.email_service import send_review_email
 
@@ -1610,32 +2502,42 @@ async def webhook_callback(request: WebhookCallbackRequest):
         raise HTTPException(status_code=404, detail="Project not found")
         
     if request.action == "APPROVED":
-        ProjectStore.update_status(project.id, "APPROVED")
+        project = ProjectStore.update_status(project.id, "APPROVED")
     elif request.action == "REJECTED":
-        ProjectStore.update_status(project.id, "CHANGES_REQUESTED")
+        project = ProjectStore.update_status(project.id, "CHANGES_REQUESTED")
         if request.feedbackText:
             feedback = ReviewFeedback(
                 date=datetime.now().isoformat(),
                 comment=request.feedbackText,
                 source="Client"
             )
-            ProjectStore.add_feedback(project.id, feedback)
+            project = ProjectStore.add_feedback(project.id, feedback)
             
     return JSONResponse(content={"message": "Callback processed", "new_status": project.status})
 
-@app.get("/api/workflow/review")
-async def review_from_email(projectId: str, action: str, token: Optional[str] = None):
-    project = ProjectStore.get_project(projectId)
+def _project_for_review(project_id: str, token: Optional[str]):
+    """
+    Project a client review link points at. A valid token is resolved through
+    the review_token index; projects without a token (older links) need none.
+    """
+    project = ProjectStore.get_project_by_review_token(token) if token else None
+    if project is not None and project.id == project_id:
+        return project
+    project = ProjectStore.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.reviewToken and token != project.reviewToken:
+    if project.reviewToken:
         raise HTTPException(status_code=403, detail="Invalid review token")
+    return project
+
+@app.get("/api/workflow/review")
+async def review_from_email(projectId: str, action: str, token: Optional[str] = None):
+    project = _project_for_review(projectId, token)
     if project.reviewTokenUsed:
         return HTMLResponse(content="<h2>Review already processed</h2><p>This review link has already been used.</p>")
 
     if action == "APPROVED":
-        ProjectStore.update_status(project.id, "APPROVED")
+        project.status = "APPROVED"
         project.reviewTokenUsed = True
         project.workflowEvents.append(WorkflowEvent(
             date=datetime.now().isoformat(),
@@ -1643,15 +2545,17 @@ async def review_from_email(projectId: str, action: str, token: Optional[str] =
             description="Client approved the document.",
             status="APPROVED"
         ))
+        ProjectStore.save_project(project)
         return HTMLResponse(content="<h2>Review recorded: Approved</h2><p>You can close this tab.</p>")
     if action == "REJECTED":
-        ProjectStore.update_status(project.id, "CHANGES_REQUESTED")
+        project.status = "CHANGES_REQUESTED"
         project.workflowEvents.append(WorkflowEvent(
             date=datetime.now().isoformat(),
             title="Changes Requested",
             description="Client requested changes.",
             status="CHANGES_REQUESTED"
         ))
+        ProjectStore.save_project(project)
         return HTMLResponse(content=f"""
         <html>
           <body style="font-family: Arial, sans-serif; background:#0f141b; color:#e6edf3; padding:24px;">
@@ -1673,18 +2577,13 @@ async def review_from_email(projectId: str, action: str, token: Optional[str] =
 
 @app.post("/api/workflow/review-feedback")
 async def review_feedback(projectId: str = Form(...), feedbackText: str = Form(...), token: str = Form("")):
-    project = ProjectStore.get_project(projectId)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    if project.reviewToken and token != project.reviewToken:
-        raise HTTPException(status_code=403, detail="Invalid review token")
-    ProjectStore.update_status(project.id, "CHANGES_REQUESTED")
-    feedback = ReviewFeedback(
+    project = _project_for_review(projectId, token)
+    project.status = "CHANGES_REQUESTED"
+    project.reviewFeedback.append(ReviewFeedback(
         date=datetime.now().isoformat(),
         comment=feedbackText,
         source="Client"
-    )
-    ProjectStore.add_feedback(project.id, feedback)
+    ))
     project.reviewTokenUsed = True
     project.workflowEvents.append(WorkflowEvent(
         date=datetime.now().isoformat(),
@@ -1692,6 +2591,7 @@ async def review_feedback(projectId: str = Form(...), feedbackText: str = Form(.
         description="Client submitted feedback.",
         status="CHANGES_REQUESTED"
     ))
+    ProjectStore.save_project(project)
     return HTMLResponse(content="<h2>Feedback received</h2><p>Thank you. You can close this tab.</p>")
 
 
@@ -1715,22 +2615,24 @@ async def upload_review(project_id: str, file: UploadFile = File(...)):
 
     # Save file
     filename = f"{project_id}_reviewed_{file.filename}"
-    file_path = Path("backend/beta/static") / filename
+    file_path = STATIC_DIR / filename
+    detach(file_path)
     with open(file_path, "wb") as buffer:
         import shutil
         shutil.copyfileobj(file.file, buffer)
+    _store_outputs(project_id, [("reviewed", file_path, f"/static/{filename}")])
         
     # Update project
-    ProjectStore.update_status(project.id, "CHANGES_REQUESTED")
+    project.status = "CHANGES_REQUESTED"
     project.reviewedDocumentUrl = f"/static/{filename}"
     
     # Add system feedback
-    feedback = ReviewFeedback(
+    project.reviewFeedback.append(ReviewFeedback(
         date=datetime.now().isoformat(),
         comment="Client uploaded a marked-up document with changes.",
         source="Client Attachment"
-    )
-    ProjectStore.add_feedback(project.id, feedback)
+    ))
+    ProjectStore.save_project(project)
 
     return JSONResponse(content={
         "status": "CHANGES_REQUESTED",
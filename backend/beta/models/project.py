@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -25,4 +25,4 @@ class Project(BaseModel):
     reviewToken: Optional[str] = None
     reviewTokenUsed: bool = False
     workflowEvents: List[WorkflowEvent] = []
-    created_at: str = datetime.now().isoformat()
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
@@ -0,0 +1,152 @@
+"""
+Self-hosted Mermaid render service with mermaid.ink's URL contract.
+
+    python -m backend.beta.render_service --port 8090
+
+Point API replicas at it with MERMAID_RENDER_SERVICE_URL=http://render:8090
+(and usually MERMAID_WARM_RENDERER=0, so only this tier runs Node):
+
+    GET /img/<base64 source>?type=png&width=1300&height=900&scale=2
+    GET /svg/<base64 source>
+    GET /health
+
+Sources are URL-safe base64 of the Mermaid text, of a {"code": ...} JSON
+state, or "pako:" + base64 of the deflated JSON state, as on mermaid.ink.
+Renders go through the same path as in the API (render cache, native
+renderer, warm renderer pool, then mmdc), so sizes and theme match local
+renders. An optional `profile` parameter picks the base render profile.
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Optional
+
+# This process is the fallback; it must never call itself (or mermaid.ink).
+os.environ["MERMAID_RENDER_SERVICE_URL"] = ""
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from backend.beta.utils.globals import (
+    MERMAID_RENDER_PROFILES,
+    _submit_render,
+    get_render_cache,
+    get_render_pool,
+    render_profile_options,
+)
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+app = FastAPI(title="DocuVerse Mermaid render service")
+
+
+def decode_source(encoded: str) -> str:
+    """Mermaid source from a mermaid.ink path segment."""
+    try:
+        if encoded.startswith("pako:"):
+            raw = _b64decode(encoded[len("pako:"):])
+            return json.loads(zlib.decompress(raw).decode("utf-8"))["code"]
+        text = _b64decode(encoded).decode("utf-8")
+        if text.lstrip().startswith("{"):
+            return json.loads(text)["code"]
+        return text
+    except (binascii.Error, zlib.error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode diagram: {e}")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _options(fmt: str, profile: Optional[str], width: Optional[int], height: Optional[int], scale: Optional[float]):
+    if profile is None:
+        profile = "document-svg" if fmt == "svg" else "thumbnail"
+    if profile not in MERMAID_RENDER_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown render profile '{profile}'")
+    options = render_profile_options(profile)
+    options.pop("fallback", None)
+    if fmt == "svg" and not options.get("mermaid_config"):
+        # Word and most SVG viewers ignore <foreignObject> labels.
+        options["mermaid_config"] = MERMAID_RENDER_PROFILES["document-svg"]["mermaid_config"]
+    options["format"] = fmt
+    for key, value, limit in (("width", width, 8000), ("height", height, 8000), ("scale", scale, 4)):
+        if value is not None:
+            if value <= 0 or value > limit:
+                raise HTTPException(status_code=400, detail=f"{key} must be in (0, {limit}]")
+            # mmdc only takes integer scales
+            options[key] = max(1, round(value)) if key == "scale" else int(value)
+    return options
+
+
+async def _render(request: Request, encoded: str, fmt: str, options: dict) -> Response:
+    source = decode_source(encoded)
+    if not source.strip():
+        raise HTTPException(status_code=400, detail="Empty diagram")
+    with tempfile.TemporaryDirectory(prefix="mermaid-render-") as tmp:
+        output = Path(tmp) / f"diagram.{fmt}"
+        try:
+            # Replicas share the workers fairly; each client host is one requester.
+            schedule = {"priority": "normal", "requester": request.client.host if request.client else ""}
+            await asyncio.wrap_future(_submit_render(source, output, options, schedule))
+            content = output.read_bytes()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Render failed: {e}")
+    return Response(content=content, media_type=MEDIA_TYPES[fmt], headers={"Cache-Control": "public, max-age=86400"})
+
+
+@app.get("/img/{encoded}")
+async def render_image(
+    request: Request,
+    encoded: str,
+    type: str = "png",
+    profile: Optional[str] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    scale: Optional[float] = None,
+):
+    fmt = type.lower()
+    if fmt != "png":
+        raise HTTPException(status_code=400, detail=f"Unsupported image type '{type}' (png only; use /svg/)")
+    return await _render(request, encoded, fmt, _options(fmt, profile, width, height, scale))
+
+
+@app.get("/svg/{encoded}")
+async def render_svg(
+    request: Request,
+    encoded: str,
+    profile: Optional[str] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+):
+    return await _render(request, encoded, "svg", _options("svg", profile, width, height, None))
+
+
+@app.get("/health")
+async def health():
+    cache = get_render_cache()
+    return {
+        "status": "ok",
+        "render_pool": get_render_pool().stats(),
+        "render_cache": cache.stats() if cache is not None else {"enabled": False},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Mermaid renders with mermaid.ink's URL contract.")
+    parser.add_argument("--host", default=os.getenv("MERMAID_RENDER_SERVICE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MERMAID_RENDER_SERVICE_PORT", "8090")))
+    args = parser.parse_args()
+
+    import uvicorn
+
+    get_render_pool()  # start the workers before the first request
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Retention and quota garbage collection for generated artifacts.
+
+Generated files are recognised by name, so bundled assets in static/ are
+never candidates:
+
+- document: generated_srs/{key}_SRS[_variant].docx
+- diagram: static/{key}_<diagram>.png|.svg, static/diagrams/{key}_diagram_<ts>.png
+- source: static/{key}_<diagram>.mmd (mmdc input)
+- review: static/{key}_reviewed_<file>
+
+Blob-store manifest entries are artifacts too, even when their working file
+is gone. Deleting an artifact unlinks the working file and releases its
+manifest entry, so the blob goes with its last reference.
+
+Each pass:
+
+1. deletes artifacts older than their class's retention;
+2. trims each project to max_project_bytes, oldest first;
+3. trims the rest to max_total_bytes, oldest first.
+
+Never deleted: URLs referenced by a Studio project (documentUrl,
+reviewedDocumentUrl, links in contentMarkdown), any artifact of a project
+with a build in flight (unfinished progress or a queued/running job),
+protected keys (the diagram templates), and anything modified within
+min_age_sec. Sizes are file sizes before deduplication, so the quotas
+overestimate disk use rather than underestimate it.
+"""
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import unquote, urlparse
+
+from backend.beta.services.blob_store import get_blob_store
+from backend.beta.services.job_queue import get_job_queue, job_queue_enabled
+from backend.beta.services.progress_store import get_progress_store
+from backend.beta.services.project_store import ProjectStore
+
+ARTIFACT_CLASSES = ("document", "diagram", "source", "review")
+# Default retention per class, in days (0 keeps them until a quota needs the space).
+DEFAULT_RETENTION_DAYS = {"document": 30, "diagram": 14, "source": 3, "review": 90}
+
+_DOCX_RE = re.compile(r"^(?P<key>.+)_SRS(?:_[a-z]+)?\.docx$")
+_STUDIO_RE = re.compile(r"^(?P<key>.+)_diagram_\d+\.png$")
+_REVIEW_RE = re.compile(r"^(?P<key>.+?)_reviewed_.+$")
+_LINK_RE = re.compile(r"/(?:static|download_srs)/[^\s)\"'<>?#]+")
+# Longest first: "x.svg.mmd" is an mmdc source, not an SVG.
+_STATIC_EXTENSIONS = ((".svg.mmd", "source"), (".mmd", "source"), (".png", "diagram"), (".svg", "diagram"))
+
+
+def _url_path(link: str) -> str:
+    return unquote(urlparse(link).path)
+
+
+def referenced_urls() -> set:
+    """Every /static/ and /download_srs/ URL a Studio project points at."""
+    urls, cursor = set(), None
+    while True:
+        page = ProjectStore.list_projects(
+            cursor=cursor, limit=200, fields=["documentUrl", "reviewedDocumentUrl", "contentMarkdown"]
+        )
+        for project in page["projects"]:
+            for field in ("documentUrl", "reviewedDocumentUrl"):
+                if project.get(field):
+                    urls.add(_url_path(project[field]))
+            urls.update(unquote(link) for link in _LINK_RE.findall(project.get("contentMarkdown") or ""))
+        cursor = page["next_cursor"]
+        if not cursor:
+            return urls
+
+
+def in_flight_keys() -> set:
+    """Project keys with a build queued or running, here or in a worker process."""
+    keys = set(get_progress_store().active_keys())
+    if job_queue_enabled():
+        keys.update(p["project_key"] for p in get_job_queue().active_payloads() if p.get("project_key"))
+    return keys
+
+
+class ArtifactGC:
+    def __init__(
+        self,
+        static_dir: Path,
+        output_dir: Path,
+        diagram_suffixes: Iterable[str],
+        protected_keys: Iterable[str] = (),
+        retention_sec: Optional[Dict[str, float]] = None,
+        max_total_bytes: int = 0,
+        max_project_bytes: int = 0,
+        min_age_sec: float = 900,
+        interval_sec: float = 3600,
+    ):
+        self.static_dir = Path(static_dir)
+        self.output_dir = Path(output_dir)
+        # Longest first, so "_user_interfaces_diagram" wins over a shorter suffix it ends with.
+        self.diagram_suffixes = sorted(set(diagram_suffixes), key=len, reverse=True)
+        self.protected_keys = set(protected_keys)
+        self.retention_sec = {c: (retention_sec or {}).get(c, DEFAULT_RETENTION_DAYS[c] * 86400) for c in ARTIFACT_CLASSES}
+        self.max_total_bytes = max(0, int(max_total_bytes))
+        self.max_project_bytes = max(0, int(max_project_bytes))
+        self.min_age_sec = max(0.0, float(min_age_sec))
+        self.interval_sec = max(60.0, float(interval_sec))
+        self._run_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.deleted_files = 0
+        self.released_entries = 0
+        self.deleted_bytes = 0
+        self.errors = 0
+        self.last_run = None
+
+    def _classify_static(self, name: str) -> Optional[tuple]:
+        # Diagram names first: a project key may itself contain "_reviewed_".
+        for ext, artifact_class in _STATIC_EXTENSIONS:
+            if not name.endswith(ext):
+                continue
+            stem = name[: -len(ext)]
+            for suffix in self.diagram_suffixes:
+                if stem.endswith(suffix) and len(stem) > len(suffix):
+                    return stem[: -len(suffix)], artifact_class
+            break
+        match = _REVIEW_RE.match(name)
+        return (match["key"], "review") if match else None
+
+    def _classify(self, url: str) -> Optional[tuple]:
+        """(project key, class, working path) for a generated artifact URL, else None."""
+        if url.startswith("/download_srs/"):
+            name = url[len("/download_srs/"):]
+            match = _DOCX_RE.match(name)
+            return (match["key"], "document", self.output_dir / name) if match else None
+        if url.startswith("/static/diagrams/"):
+            name = url[len("/static/diagrams/"):]
+            match = _STUDIO_RE.match(name)
+            return (match["key"], "diagram", self.static_dir / "diagrams" / name) if match else None
+        if url.startswith("/static/"):
+            name = url[len("/static/"):]
+            if "/" in name:
+                return None
+            found = self._classify_static(name)
+            return (found[0], found[1], self.static_dir / name) if found else None
+        return None
+
+    def _scan(self) -> Dict[str, dict]:
+        """url -> {url, project_key, class, path, size, mtime} for every generated artifact."""
+        artifacts = {}
+        for directory, prefix in (
+            (self.output_dir, "/download_srs/"),
+            (self.static_dir, "/static/"),
+            (self.static_dir / "diagrams", "/static/diagrams/"),
+        ):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                url = f"{prefix}{entry.name}"
+                found = self._classify(url)
+                if found is None:
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                key, artifact_class, path = found
+                artifacts[url] = {
+                    "url": url, "project_key": key, "class": artifact_class,
+                    "path": path, "size": stat.st_size, "mtime": stat.st_mtime,
+                }
+        store = get_blob_store()
+        for entry in store.entries() if store else ():
+            found = self._classify(entry["url"])
+            if found is None:
+                continue
+            artifact = artifacts.get(entry["url"])
+            if artifact is None:
+                # Served from the blob store only; its working file is already gone.
+                artifacts[entry["url"]] = {
+                    "url": entry["url"], "project_key": entry["project_key"], "class": found[1],
+                    "path": None, "size": entry["size"], "mtime": entry["updated_at"],
+                }
+            else:
+                artifact["project_key"] = entry["project_key"]
+                artifact["mtime"] = max(artifact["mtime"], entry["updated_at"])
+        return artifacts
+
+    def _plan(self, now: float) -> tuple:
+        """(summary, [(artifact, reason)]) for a pass at time now."""
+        artifacts = self._scan()
+        referenced = referenced_urls()
+        in_flight = in_flight_keys()
+
+        protected = {"referenced": 0, "in_flight": 0, "protected_key": 0, "recent": 0}
+        candidates = []
+        for artifact in artifacts.values():
+            if artifact["url"] in referenced:
+                protected["referenced"] += 1
+            elif artifact["project_key"] in in_flight:
+                protected["in_flight"] += 1
+            elif artifact["project_key"] in self.protected_keys:
+                protected["protected_key"] += 1
+            elif now - artifact["mtime"] < self.min_age_sec:
+                protected["recent"] += 1
+            else:
+                candidates.append(artifact)
+        candidates.sort(key=lambda a: (a["mtime"], a["url"]))
+
+        deletions = []
+        kept = []
+        for artifact in candidates:
+            retention = self.retention_sec[artifact["class"]]
+            if retention and now - artifact["mtime"] > retention:
+                deletions.append((artifact, "retention"))
+            else:
+                kept.append(artifact)
+
+        # Quotas count every remaining artifact, protected ones included.
+        deleted_urls = {a["url"] for a, _ in deletions}
+        remaining = [a for a in artifacts.values() if a["url"] not in deleted_urls]
+        if self.max_project_bytes:
+            project_bytes = {}
+            for artifact in remaining:
+                project_bytes[artifact["project_key"]] = project_bytes.get(artifact["project_key"], 0) + artifact["size"]
+            still_kept = []
+            for artifact in kept:
+                key = artifact["project_key"]
+                if project_bytes[key] > self.max_project_bytes:
+                    project_bytes[key] -= artifact["size"]
+                    deletions.append((artifact, "project_quota"))
+                else:
+                    still_kept.append(artifact)
+            kept = still_kept
+        if self.max_total_bytes:
+            total = sum(a["size"] for a in remaining) - sum(a["size"] for a, r in deletions if r == "project_quota")
+            for artifact in kept:
+                if total <= self.max_total_bytes:
+                    break
+                total -= artifact["size"]
+                deletions.append((artifact, "global_quota"))
+
+        total_bytes = sum(a["size"] for a in artifacts.values())
+        delete_bytes = sum(a["size"] for a, _ in deletions)
+        summary = {
+            "artifacts": len(artifacts),
+            "bytes": total_bytes,
+            "protected": protected,
+            "delete_count": len(deletions),
+            "delete_bytes": delete_bytes,
+            "bytes_after": total_bytes - delete_bytes,
+        }
+        return summary, deletions
+
+    def plan(self) -> dict:
+        """What a pass would delete right now, and why. Deletes nothing."""
+        now = time.time()
+        summary, deletions = self._plan(now)
+        summary["delete"] = [
+            {
+                "url": a["url"],
+                "project_key": a["project_key"],
+                "class": a["class"],
+                "size": a["size"],
+                "age_sec": round(now - a["mtime"]),
+                "reason": reason,
+            }
+            for a, reason in deletions
+        ]
+        return summary
+
+    def _delete(self, artifact: dict, store) -> tuple:
+        """(files unlinked, manifest entries released) for one artifact."""
+        deleted = 0
+        path = artifact["path"]
+        if path is not None:
+            try:
+                if time.time() - path.stat().st_mtime < self.min_age_sec:
+                    return 0, 0  # rewritten since the scan
+                path.unlink()
+                deleted = 1
+            except FileNotFoundError:
+                pass
+        return deleted, store.release_url(artifact["url"]) if store is not None else 0
+
+    def run(self) -> dict:
+        """One pass: delete what plan() reports."""
+        with self._run_lock:
+            started = time.time()
+            summary, deletions = self._plan(started)
+            # A build may have started since the scan; check again right before deleting.
+            in_flight = in_flight_keys()
+            store = get_blob_store()
+            deleted = released = deleted_bytes = errors = 0
+            for artifact, _ in deletions:
+                if artifact["project_key"] in in_flight:
+                    continue
+                try:
+                    files, entries = self._delete(artifact, store)
+                except Exception as e:
+                    errors += 1
+                    print(f"⚠️ Artifact GC could not delete {artifact['url']}: {e}")
+                    continue
+                if files or entries:
+                    deleted += files
+                    released += entries
+                    deleted_bytes += artifact["size"]
+            summary.update(
+                deleted_files=deleted,
+                released_entries=released,
+                deleted_bytes=deleted_bytes,
+                errors=errors,
+                duration_ms=round((time.time() - started) * 1000, 1),
+                finished_at=time.time(),
+            )
+            with self._stats_lock:
+                self.runs += 1
+                self.deleted_files += deleted
+                self.released_entries += released
+                self.deleted_bytes += deleted_bytes
+                self.errors += errors
+                self.last_run = summary
+            if deleted or released:
+                print(f"🧹 Artifact GC removed {deleted} files and {released} blob entries ({deleted_bytes / 1048576:.1f} MB)")
+            return summary
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_sec):
+            try:
+                self.run()
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += 1
+                print(f"⚠️ Artifact GC pass failed: {e}")
+
+    def start(self):
+        """Run a pass every interval_sec on a daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="artifact-gc", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "running": self._thread is not None,
+                "interval_sec": self.interval_sec,
+                "retention_days": {c: round(s / 86400, 2) for c, s in self.retention_sec.items()},
+                "max_total_bytes": self.max_total_bytes,
+                "max_project_bytes": self.max_project_bytes,
+                "min_age_sec": self.min_age_sec,
+                "runs": self.runs,
+                "deleted_files": self.deleted_files,
+                "released_entries": self.released_entries,
+                "deleted_bytes": self.deleted_bytes,
+                "errors": self.errors,
+                "last_run": self.last_run,
+            }
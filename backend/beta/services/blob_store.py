@@ -0,0 +1,305 @@
+"""
+Content-addressed store for generated documents and diagrams.
+
+Each file is kept once, under its SHA-256, at BLOB_STORE_DIR/ab/<digest><ext>
+(read-only). A SQLite manifest maps (project_key, variant) to a blob and to
+the URL it is served at (/download_srs/..., /static/...). Every blob counts
+the manifest rows pointing at it. When a variant is regenerated or released
+the old blob loses a reference and is deleted at zero. Identical diagrams
+shared by many projects take the space of one, and replaced outputs no longer
+pile up.
+
+After put_files() the working file (generated_srs/..., static/...) is swapped
+for a hard link to its blob, so code that reads those paths keeps working
+without a second copy. Blobs are never written in place: anything that
+rewrites a working file must detach() it first.
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+CHUNK_BYTES = 1024 * 1024
+
+
+def detach(path) -> None:
+    """Unlink path before rewriting it; it may be a hard link to a shared blob."""
+    Path(path).unlink(missing_ok=True)
+
+
+class BlobStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self.puts = 0
+        self.dedup_hits = 0
+        self.deleted = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.root / "manifest.sqlite3"), check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                suffix TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                refs INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS manifest (
+                project_key TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                url TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (project_key, variant)
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_manifest_url ON manifest(url);
+            CREATE INDEX IF NOT EXISTS idx_manifest_digest ON manifest(digest);
+            """
+        )
+
+    def _blob_path(self, digest: str, suffix: str) -> Path:
+        return self.root / digest[:2] / f"{digest}{suffix}"
+
+    def _stage(self, path: Path) -> tuple:
+        """Copy path into a temp file in the store, hashing on the way: (digest, temp path)."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+                for chunk in iter(lambda: src.read(CHUNK_BYTES), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            os.chmod(tmp_name, 0o444)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        return digest.hexdigest(), Path(tmp_name)
+
+    @staticmethod
+    def _link(blob: Path, path: Path):
+        """Point the working path at the blob (atomic rename over it); keep the copy if links fail."""
+        try:
+            if os.path.samefile(blob, path):
+                return
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.link")
+            os.link(blob, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _assign_locked(self, project_key: str, variant: str, digest: str, url: str, now: float) -> list:
+        """Point (project_key, variant) and url at digest; returns digests that lost a reference."""
+        released = []
+        for row in self._conn.execute(
+            "SELECT project_key, variant, digest FROM manifest WHERE url = ? AND NOT (project_key = ? AND variant = ?)",
+            (url, project_key, variant),
+        ).fetchall():
+            # The URL now serves another variant's file.
+            self._conn.execute(
+                "DELETE FROM manifest WHERE project_key = ? AND variant = ?", (row["project_key"], row["variant"])
+            )
+            self._conn.execute("UPDATE blobs SET refs = refs - 1 WHERE digest = ?", (row["digest"],))
+            released.append(row["digest"])
+        old = self._conn.execute(
+            "SELECT digest FROM manifest WHERE project_key = ? AND variant = ?", (project_key, variant)
+        ).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO manifest (project_key, variant, digest, url, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (project_key, variant, digest, url, now),
+        )
+        if old is not None and old["digest"] == digest:
+            return released
+        self._conn.execute("UPDATE blobs SET refs = refs + 1 WHERE digest = ?", (digest,))
+        if old is not None:
+            self._conn.execute("UPDATE blobs SET refs = refs - 1 WHERE digest = ?", (old["digest"],))
+            released.append(old["digest"])
+        return released
+
+    def _drop_orphans_locked(self, digests: Iterable[str]):
+        # Inside the write transaction, so a put() in another process can't adopt a blob being deleted.
+        for digest in set(digests):
+            row = self._conn.execute("SELECT suffix, refs FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None or row["refs"] > 0:
+                continue
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._blob_path(digest, row["suffix"]).unlink(missing_ok=True)
+            self.deleted += 1
+
+    def put_files(self, project_key: str, items: Iterable[tuple]) -> dict:
+        """
+        Store (variant, path, url) files for a project, replacing what those
+        variants pointed at before. Returns {variant: digest}; unreadable
+        files are skipped.
+        """
+        staged = []
+        for variant, path, url in items:
+            path = Path(path)
+            try:
+                digest, tmp = self._stage(path)
+            except OSError as e:
+                print(f"⚠️ Blob store skipped {path}: {e}")
+                continue
+            staged.append((variant, path, url, digest, tmp))
+        if not staged:
+            return {}
+        stored = {}
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    released = []
+                    for variant, path, url, digest, tmp in staged:
+                        row = self._conn.execute("SELECT suffix FROM blobs WHERE digest = ?", (digest,)).fetchone()
+                        if row is None:
+                            self._conn.execute(
+                                "INSERT INTO blobs (digest, suffix, size, refs, created_at) VALUES (?, ?, ?, 0, ?)",
+                                (digest, path.suffix.lower(), tmp.stat().st_size, now),
+                            )
+                            blob = self._blob_path(digest, path.suffix.lower())
+                        else:
+                            self.dedup_hits += 1
+                            blob = self._blob_path(digest, row["suffix"])
+                        if not blob.exists():
+                            blob.parent.mkdir(exist_ok=True)
+                            os.replace(tmp, blob)
+                        released += self._assign_locked(project_key, variant, digest, url, now)
+                        self._link(blob, path)
+                        stored[variant] = digest
+                        self.puts += 1
+                    self._drop_orphans_locked(released)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        finally:
+            for *_, tmp in staged:
+                tmp.unlink(missing_ok=True)
+        return stored
+
+    def assign(self, project_key: str, variant: str, digest: str, url: str) -> bool:
+        """Add a manifest entry for a blob that is already stored (no copy)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None:
+                    self._conn.execute("COMMIT")
+                    return False
+                self._drop_orphans_locked(self._assign_locked(project_key, variant, digest, url, time.time()))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def _release(self, where: str, params: tuple) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT project_key, variant, digest FROM manifest WHERE {where}", params
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "DELETE FROM manifest WHERE project_key = ? AND variant = ?", (row["project_key"], row["variant"])
+                    )
+                    self._conn.execute("UPDATE blobs SET refs = refs - 1 WHERE digest = ?", (row["digest"],))
+                self._drop_orphans_locked(row["digest"] for row in rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def release(self, project_key: str, variant: Optional[str] = None) -> int:
+        """Drop a project's manifest entries (one variant, or all); returns how many."""
+        if variant is None:
+            return self._release("project_key = ?", (project_key,))
+        return self._release("project_key = ? AND variant = ?", (project_key, variant))
+
+    def release_url(self, url: str) -> int:
+        """Drop the manifest entry served at url."""
+        return self._release("url = ?", (url,))
+
+    def resolve(self, url: str) -> Optional[Path]:
+        """Blob file currently served at url, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.digest, b.suffix FROM manifest m JOIN blobs b ON b.digest = m.digest WHERE m.url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        path = self._blob_path(row["digest"], row["suffix"])
+        return path if path.is_file() else None
+
+    def entry(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT project_key, variant, digest FROM manifest WHERE url = ?", (url,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def entries(self) -> list:
+        """Every manifest entry: [{project_key, variant, url, size, updated_at}]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT m.project_key, m.variant, m.url, m.updated_at, b.size FROM manifest m "
+                "JOIN blobs b ON b.digest = m.digest"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def manifest(self, project_key: str) -> dict:
+        """{variant: {digest, url, size, updated_at}} for one project."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT m.variant, m.digest, m.url, m.updated_at, b.size FROM manifest m "
+                "JOIN blobs b ON b.digest = m.digest WHERE m.project_key = ? ORDER BY m.variant",
+                (project_key,),
+            ).fetchall()
+        return {
+            row["variant"]: {"digest": row["digest"], "url": row["url"], "size": row["size"], "updated_at": row["updated_at"]}
+            for row in rows
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            blobs, stored_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            entries, logical_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM manifest m JOIN blobs b ON b.digest = m.digest"
+            ).fetchone()
+        return {
+            "blobs": blobs,
+            "bytes": stored_bytes,
+            "manifest_entries": entries,
+            "referenced_bytes": logical_bytes,
+            "dedup_ratio": round(logical_bytes / stored_bytes, 4) if stored_bytes else 0.0,
+            "puts": self.puts,
+            "dedup_hits": self.dedup_hits,
+            "deleted": self.deleted,
+        }
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Process-wide blob store, or None when BLOB_STORE_ENABLED=0."""
+    global _STORE
+    if os.getenv("BLOB_STORE_ENABLED", "1").strip().lower() in ("0", "false", "no"):
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = BlobStore(Path(os.getenv("BLOB_STORE_DIR", "./backend/beta/.blobs")))
+        return _STORE
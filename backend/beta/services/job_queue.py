@@ -0,0 +1,216 @@
+"""
+Durable SQLite job queue for SRS generation.
+
+The API process enqueues jobs; `python -m backend.beta.worker` processes claim
+them. Delivery is at-least-once: a claimed job is invisible to other workers
+only for its lease (visibility timeout), which the owning worker extends with
+heartbeats. If a worker dies the lease runs out and another worker picks the
+job up again, until `max_attempts` is reached. Handlers must be idempotent.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class JobQueue:
+    def __init__(self, db_path: Path, lease_sec: float = 120, max_attempts: int = 3):
+        self.db_path = Path(db_path)
+        self.lease_sec = lease_sec
+        self.max_attempts = max(1, int(max_attempts))
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                visible_at REAL NOT NULL,
+                lease_owner TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, visible_at);
+            """
+        )
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: Optional[int] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, attempts, max_attempts, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    kind,
+                    json.dumps(payload, ensure_ascii=False, default=str),
+                    QUEUED,
+                    max_attempts or self.max_attempts,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+        return job_id
+
+    def claim(self, worker_id: str, lease_sec: Optional[float] = None) -> Optional[dict]:
+        """
+        Take the oldest visible job: queued ones, or running ones whose lease
+        expired. Jobs that already used every attempt are marked failed instead.
+        """
+        lease_sec = lease_sec or self.lease_sec
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, lease_owner = NULL, updated_at = ?, "
+                    "error = COALESCE(error, 'lease expired after final attempt') "
+                    "WHERE status = ? AND visible_at <= ? AND attempts >= max_attempts",
+                    (FAILED, now, RUNNING, now),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status IN (?, ?) AND visible_at <= ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, visible_at = ?, "
+                    "lease_owner = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, now + lease_sec, worker_id, now, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = self._row_to_job(row)
+        job.update(status=RUNNING, attempts=row["attempts"] + 1, lease_owner=worker_id)
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_sec: Optional[float] = None) -> bool:
+        """Extend the lease; False means the job was reclaimed by someone else."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET visible_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                (now + (lease_sec or self.lease_sec), now, job_id, worker_id, RUNNING),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Optional[dict] = None) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (
+                    SUCCEEDED,
+                    json.dumps(result or {}, ensure_ascii=False, default=str),
+                    time.time(),
+                    job_id,
+                    worker_id,
+                    RUNNING,
+                ),
+            )
+        return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay_sec: float = 5) -> bool:
+        """Release a failed attempt: requeue after a delay, or fail for good after max_attempts."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+                "visible_at = ?, error = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (FAILED, QUEUED, now + retry_delay_sec, error[:2000], now, job_id, worker_id, RUNNING),
+            )
+        return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def purge_finished(self, older_than_sec: float) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED_STATES, time.time() - older_than_sec),
+            )
+        return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def active_payloads(self) -> list:
+        """Payloads of queued and running jobs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "lease_owner": row["lease_owner"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def job_queue_enabled() -> bool:
+    return os.getenv("JOB_QUEUE_ENABLED", "0").strip().lower() in ("1", "true", "yes")
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue handle (one SQLite connection per process)."""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = JobQueue(
+                Path(os.getenv("JOB_QUEUE_PATH", "./backend/beta/.cache/jobs.sqlite3")),
+                lease_sec=float(os.getenv("JOB_LEASE_SEC", "120")),
+                max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+            )
+        return _QUEUE
@@ -0,0 +1,262 @@
+"""
+Bounded progress store for SRS generation.
+
+Snapshots expire PROGRESS_TTL_SEC after a build finishes (completed/failed) and
+PROGRESS_ACTIVE_TTL_SEC after the last update of a build that never finished.
+Each backend also caps the number of projects. Over the cap, expired and
+finished snapshots go first, least recently used (memory) or updated (sqlite)
+first. An unfinished build is evicted only when nothing else is left, so it
+stays visible to active_keys() (the artifact GC's in-flight protection).
+
+- memory: per-process, split into lock stripes so concurrent projects do not
+  serialize on one lock.
+- sqlite: one WAL database shared by every process on the host (uvicorn
+  workers, job queue workers); each thread reads through its own connection.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from backend.beta.services.job_queue import job_queue_enabled
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def _expires_at(snapshot: dict, ttl_sec: float, active_ttl_sec: float, now: float) -> float:
+    return now + (ttl_sec if snapshot.get("status") in TERMINAL_STATUSES else active_ttl_sec)
+
+
+class _Stripe:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # project_key -> (snapshot, expires_at), least recently used first
+
+
+class MemoryProgressStore:
+    """
+    max_entries caps the whole store, not each stripe. Recency is tracked per
+    stripe, so over the cap the home stripe's least recently used finished
+    snapshot goes first, then the other stripes'.
+    """
+
+    shared = False
+
+    def __init__(self, ttl_sec: float, active_ttl_sec: float, max_entries: int, stripes: int = 16):
+        self.ttl_sec = ttl_sec
+        self.active_ttl_sec = active_ttl_sec
+        self.max_entries = max(1, int(max_entries))
+        self._stripes = [_Stripe() for _ in range(max(1, int(stripes)))]
+        self.evictions = 0
+        self.expirations = 0
+
+    def _stripe(self, project_key: str) -> _Stripe:
+        return self._stripes[zlib.crc32(project_key.encode("utf-8")) % len(self._stripes)]
+
+    def get(self, project_key: str) -> Optional[dict]:
+        stripe = self._stripe(project_key)
+        now = time.time()
+        with stripe.lock:
+            entry = stripe.entries.get(project_key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del stripe.entries[project_key]
+                self.expirations += 1
+                return None
+            stripe.entries.move_to_end(project_key)
+            return entry[0]
+
+    def set(self, project_key: str, snapshot: dict):
+        stripe = self._stripe(project_key)
+        now = time.time()
+        expires_at = _expires_at(snapshot, self.ttl_sec, self.active_ttl_sec, now)
+        with stripe.lock:
+            stripe.entries[project_key] = (snapshot, expires_at)
+            stripe.entries.move_to_end(project_key)
+            for key in [k for k, (_, exp) in stripe.entries.items() if exp <= now]:
+                del stripe.entries[key]
+                self.expirations += 1
+        # len() of another stripe's dict is safe without its lock.
+        excess = sum(len(s.entries) for s in self._stripes) - self.max_entries
+        if excess > 0:
+            self._evict(excess, stripe, project_key, now)
+
+    def _evict(self, excess: int, home: _Stripe, keep: str, now: float):
+        """Drop excess entries: expired or finished ones first, unfinished builds last."""
+        stripes = [home] + [s for s in self._stripes if s is not home]
+        for finished_only in (True, False):
+            for stripe in stripes:
+                with stripe.lock:
+                    victims = []
+                    for key, (snapshot, expires_at) in stripe.entries.items():
+                        if len(victims) == excess:
+                            break
+                        if key == keep:
+                            continue
+                        if not finished_only or expires_at <= now or snapshot.get("status") in TERMINAL_STATUSES:
+                            victims.append(key)
+                    for key in victims:
+                        del stripe.entries[key]
+                    self.evictions += len(victims)
+                excess -= len(victims)
+                if excess <= 0:
+                    return
+
+    def active_keys(self) -> set:
+        """Projects whose latest snapshot is an unfinished, unexpired build."""
+        now = time.time()
+        keys = set()
+        for stripe in self._stripes:
+            with stripe.lock:
+                keys.update(
+                    key
+                    for key, (snapshot, expires_at) in stripe.entries.items()
+                    if expires_at > now and snapshot.get("status") not in TERMINAL_STATUSES
+                )
+        return keys
+
+    def stats(self) -> dict:
+        entries = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                entries += len(stripe.entries)
+        return {
+            "backend": "memory",
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "stripes": len(self._stripes),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteProgressStore:
+    shared = True
+
+    def __init__(self, db_path: Path, ttl_sec: float, active_ttl_sec: float, max_entries: int, prune_every: int = 200):
+        self.db_path = Path(db_path)
+        self.ttl_sec = ttl_sec
+        self.active_ttl_sec = active_ttl_sec
+        self.max_entries = max(1, int(max_entries))
+        self.prune_every = max(1, int(prune_every))
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS srs_progress (
+                project_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_srs_progress_last_used ON srs_progress(last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, project_key: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT payload FROM srs_progress WHERE project_key = ? AND expires_at > ?",
+            (project_key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, project_key: str, snapshot: dict):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO srs_progress (project_key, payload, expires_at, last_used) VALUES (?, ?, ?, ?)",
+            (
+                project_key,
+                json.dumps(snapshot, ensure_ascii=False, default=str),
+                _expires_at(snapshot, self.ttl_sec, self.active_ttl_sec, now),
+                now,
+            ),
+        )
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM srs_progress WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM srs_progress WHERE project_key IN ("
+            "SELECT project_key FROM srs_progress "
+            "ORDER BY COALESCE(json_extract(payload, '$.status'), '') NOT IN (?, ?) DESC, last_used DESC "
+            "LIMIT -1 OFFSET ?)",
+            (*TERMINAL_STATUSES, self.max_entries),
+        )
+
+    def active_keys(self) -> set:
+        """Projects whose latest snapshot is an unfinished, unexpired build."""
+        rows = self._conn().execute(
+            "SELECT project_key FROM srs_progress WHERE expires_at > ? "
+            "AND COALESCE(json_extract(payload, '$.status'), '') NOT IN (?, ?)",
+            (time.time(), *TERMINAL_STATUSES),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def stats(self) -> dict:
+        entries = self._conn().execute("SELECT COUNT(*) FROM srs_progress").fetchone()[0]
+        return {"backend": "sqlite", "entries": entries, "max_entries": self.max_entries}
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_progress_store():
+    """
+    Process-wide progress store. PROGRESS_BACKEND picks memory or sqlite; the
+    default is sqlite when the job queue is enabled (builds run in other
+    processes) and memory otherwise.
+    """
+    global _STORE
+    if _STORE is not None:
+        # Hot path: every progress poll and update lands here.
+        return _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            backend = os.getenv("PROGRESS_BACKEND", "").strip().lower() or (
+                "sqlite" if job_queue_enabled() else "memory"
+            )
+            ttl_sec = float(os.getenv("PROGRESS_TTL_SEC", "3600"))
+            active_ttl_sec = float(os.getenv("PROGRESS_ACTIVE_TTL_SEC", str(6 * 3600)))
+            max_entries = int(os.getenv("PROGRESS_MAX_ENTRIES", "10000"))
+            if backend == "sqlite":
+                _STORE = SQLiteProgressStore(
+                    Path(os.getenv("PROGRESS_DB_PATH", "./backend/beta/.cache/progress.sqlite3")),
+                    ttl_sec,
+                    active_ttl_sec,
+                    max_entries,
+                )
+            else:
+                _STORE = MemoryProgressStore(
+                    ttl_sec,
+                    active_ttl_sec,
+                    max_entries,
+                    stripes=int(os.getenv("PROGRESS_LOCK_STRIPES", "16")),
+                )
+        return _STORE
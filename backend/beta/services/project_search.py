@@ -0,0 +1,184 @@
+"""
+Full-text search over Studio projects (name, contentMarkdown, review feedback).
+
+Each save_project() updates the index incrementally, but only when the
+searchable text has changed (a digest is compared). Status changes cost
+nothing. The sqlite backend keeps an FTS5 table keyed by the project's rowid,
+with BM25 ranking and FTS5 snippets. The memory backend uses the
+InMemorySearchIndex below, with the same tokens (unicode61 style, case and
+diacritics folded, no stemming) and BM25 ranking.
+
+BM25 has to score every match. A query made only of words that appear in
+most projects therefore ranks just the newest PROJECT_SEARCH_MAX_RANKED
+matches. That keeps broad queries at about 10 ms over 100k projects instead
+of hundreds. Selective words are unaffected.
+
+Queries are plain words. All of them must match, and `word*` matches a
+prefix. Snippets mark hits with **bold**, like the Markdown they come from.
+"""
+import hashlib
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List
+
+# Relative weight of a hit in the name / feedback / body.
+FIELD_WEIGHTS = {"name": 4.0, "feedback": 2.0, "content": 1.0}
+SNIPPET_TOKENS = 16
+HIGHLIGHT = ("**", "**")
+ELLIPSIS = "…"
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_QUERY_TERM_RE = re.compile(r"([^\W_]+)(\*)?")
+
+
+def search_fields(project) -> Dict[str, str]:
+    feedback = "\n".join(
+        (item.get("comment") if isinstance(item, dict) else getattr(item, "comment", "")) or ""
+        for item in project.reviewFeedback
+    )
+    return {"name": project.name or "", "content": project.contentMarkdown or "", "feedback": feedback}
+
+
+def search_digest(fields: Dict[str, str]) -> str:
+    return hashlib.sha1("\0".join(fields[k] for k in FIELD_WEIGHTS).encode("utf-8")).hexdigest()
+
+
+def fold(word: str) -> str:
+    """Lowercase and strip diacritics (café -> cafe), like FTS5's remove_diacritics 2."""
+    if word.isascii():
+        return word.lower()
+    return "".join(ch for ch in unicodedata.normalize("NFKD", word) if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [fold(token) for token in _TOKEN_RE.findall(text)]
+
+
+def parse_query(query: str) -> List[tuple]:
+    """[(term, is_prefix)]; empty when the query has no searchable words."""
+    return [(fold(term), bool(star)) for term, star in _QUERY_TERM_RE.findall(query or "")]
+
+
+def fts_query(terms: List[tuple]) -> str:
+    """FTS5 MATCH expression: every term quoted (no operator injection), ANDed."""
+    return " ".join(f'"{term}"' + ("*" if prefix else "") for term, prefix in terms)
+
+
+def _snippet(fields: Dict[str, str], terms: List[tuple]) -> str:
+    def hit(token: str) -> bool:
+        token = fold(token)
+        return any(token.startswith(t) if prefix else token == t for t, prefix in terms)
+
+    for name in ("content", "feedback", "name"):
+        text = fields[name]
+        tokens = list(_TOKEN_RE.finditer(text))
+        first = next((i for i, m in enumerate(tokens) if hit(m.group(0))), None)
+        if first is None:
+            continue
+        start = max(0, first - SNIPPET_TOKENS // 4)
+        window = tokens[start:start + SNIPPET_TOKENS]
+        out, cursor = [], window[0].start()
+        for match in window:
+            out.append(text[cursor:match.start()])
+            word = match.group(0)
+            out.append(f"{HIGHLIGHT[0]}{word}{HIGHLIGHT[1]}" if hit(word) else word)
+            cursor = match.end()
+        snippet = " ".join("".join(out).split())
+        prefix = ELLIPSIS if start > 0 else ""
+        suffix = ELLIPSIS if start + SNIPPET_TOKENS < len(tokens) else ""
+        return f"{prefix}{snippet}{suffix}"
+    return ""
+
+
+class InMemorySearchIndex:
+    """Inverted index (term -> {project id: weighted tf}) with BM25 ranking."""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, max_ranked: int = 1000):
+        self.max_ranked = max(1, int(max_ranked))
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._seq: Dict[str, int] = {}  # first-index order, newest highest
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._digests: Dict[str, str] = {}
+        self._total_len = 0.0
+        self._lock = threading.Lock()
+        self.reindexed = 0
+
+    def update(self, project_id: str, fields: Dict[str, str]):
+        digest = search_digest(fields)
+        with self._lock:
+            if self._digests.get(project_id) == digest:
+                return
+            self._remove(project_id)
+            terms = Counter()
+            for name, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(fields[name]):
+                    terms[token] += weight
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[project_id] = tf
+            self._doc_terms[project_id] = terms
+            self._doc_len[project_id] = sum(terms.values())
+            self._total_len += self._doc_len[project_id]
+            self._digests[project_id] = digest
+            self._seq.setdefault(project_id, len(self._seq))
+            self.reindexed += 1
+
+    def _remove(self, project_id: str):
+        for term in self._doc_terms.pop(project_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(project_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(project_id, 0.0)
+        self._digests.pop(project_id, None)
+
+    def _matches(self, term: str, prefix: bool) -> Dict[str, float]:
+        if not prefix:
+            return self._postings.get(term, {})
+        merged: Dict[str, float] = {}
+        for word, postings in self._postings.items():
+            if word.startswith(term):
+                for project_id, tf in postings.items():
+                    merged[project_id] = merged.get(project_id, 0.0) + tf
+        return merged
+
+    def search(self, terms: List[tuple], limit: int, allowed=None) -> List[tuple]:
+        """[(project id, score)] best first; every term must match. allowed filters ids."""
+        with self._lock:
+            if not terms or not self._doc_len:
+                return []
+            postings = sorted((self._matches(term, prefix) for term, prefix in terms), key=len)
+            candidates = set(postings[0])
+            for other in postings[1:]:
+                candidates &= other.keys()
+            if len(candidates) > self.max_ranked:
+                # Same bound as the FTS5 backend: the newest max_ranked matches.
+                candidates = heapq.nlargest(self.max_ranked, candidates, key=self._seq.__getitem__)
+            if allowed is not None:
+                candidates = [c for c in candidates if allowed(c)]
+            docs = len(self._doc_len)
+            avg_len = self._total_len / docs
+            scores = {}
+            for matches in postings:
+                idf = math.log(1 + (docs - len(matches) + 0.5) / (len(matches) + 0.5))
+                for project_id in candidates:
+                    tf = matches[project_id]
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[project_id] / avg_len)
+                    scores[project_id] = scores.get(project_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"documents": len(self._doc_len), "terms": len(self._postings), "reindexed": self.reindexed}
+
+
+def snippet_for(project, terms: List[tuple]) -> str:
+    return _snippet(search_fields(project), terms)
@@ -1,28 +1,583 @@
+"""
+Project storage for DocuVerse Studio.
+
+ProjectStore keeps its classmethod API. The data lives in a backend picked by
+PROJECT_STORE_BACKEND:
+
+- sqlite (default): one WAL database. Every uvicorn worker shares it, and it
+  survives restarts. id is the primary key, and status and reviewToken are
+  indexed. Connections come from a small pool. Every query is a fixed SQL
+  string with parameters, so each connection reuses its prepared statements
+  from sqlite3's statement cache.
+- memory: the old per-process dict, for throwaway runs.
+
+Both backends keep secondary indexes for listing: (status, created_at, id)
+and (created_at, id). list_projects() walks them newest first from a cursor
+and never scans every project. Listings read a summary of each project
+without contentMarkdown unless it is asked for.
+
+search_projects() ranks full-text matches over the name, contentMarkdown
+and review feedback (see project_search).
+
+Both backends keep Project objects in a per-process dict that acts as a
+read-through cache. Handlers mutate the returned Project in place and then
+call save_project(). Before serving a cached object, the sqlite backend
+compares its row version with a primary-key lookup, so a write from another
+worker is never hidden.
+"""
+import base64
+import bisect
+import heapq
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
 from typing import Dict, Optional
+
 from backend.beta.models.project import Project
+from backend.beta.services.project_search import (
+    FIELD_WEIGHTS,
+    HIGHLIGHT,
+    ELLIPSIS,
+    SNIPPET_TOKENS,
+    InMemorySearchIndex,
+    fts_query,
+    parse_query,
+    search_digest,
+    search_fields,
+    snippet_for,
+)
 
-class ProjectStore:
-    _projects: Dict[str, Project] = {}
 
+PROJECT_STATUSES = ("DRAFT", "IN_REVIEW", "CHANGES_REQUESTED", "APPROVED")
+# Left out of listings unless requested by name.
+HEAVY_FIELDS = ("contentMarkdown",)
+
+
+def _dump(project: Project) -> dict:
+    # Events/feedback passed through from requests may still be plain dicts.
+    return project.model_dump(mode="json", warnings=False)
+
+
+def _payload(project: Project) -> str:
+    return json.dumps(_dump(project), ensure_ascii=False)
+
+
+def _summary(data: dict) -> dict:
+    return {key: value for key, value in data.items() if key not in HEAVY_FIELDS}
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(created_at, id) of the last project on the previous page; ValueError if malformed."""
+    try:
+        created_at, project_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("malformed cursor")
+    return str(created_at), str(project_id)
+
+
+class _SortedKeys:
+    """(created_at, id) keys in order; one per index."""
+
+    __slots__ = ("keys",)
+
+    def __init__(self):
+        self.keys = []
+
+    def add(self, key: tuple):
+        bisect.insort(self.keys, key)
+
+    def discard(self, key: tuple):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def newest_first(self, below: Optional[tuple], low: Optional[str]):
+        """Keys below the cursor/upper bound, newest first, stopping at created_at < low."""
+        end = bisect.bisect_left(self.keys, below) if below is not None else len(self.keys)
+        for i in range(end - 1, -1, -1):
+            key = self.keys[i]
+            if low is not None and key[0] < low:
+                return
+            yield key
+
+
+def _upper_bound(cursor: Optional[tuple], created_before: Optional[str]) -> Optional[tuple]:
+    """Exclusive (created_at, id) bound from the cursor and the created_before filter."""
+    bounds = [b for b in (cursor, (created_before, "") if created_before is not None else None) if b is not None]
+    return min(bounds) if bounds else None
+
+
+class MemoryProjectBackend:
+    shared = False
+
+    def __init__(self):
+        self._projects: Dict[str, Project] = {}
+        self._keys: Dict[str, tuple] = {}  # id -> (status, created_at) as indexed
+        self._by_created = _SortedKeys()
+        self._by_status = {}  # status -> _SortedKeys
+        self._search = InMemorySearchIndex(max_ranked=int(os.getenv("PROJECT_SEARCH_MAX_RANKED", "1000")))
+        self._lock = threading.Lock()
+
+    def get(self, project_id: str) -> Optional[Project]:
+        return self._projects.get(project_id)
+
+    def get_by_review_token(self, token: str) -> Optional[Project]:
+        with self._lock:
+            return next((p for p in self._projects.values() if p.reviewToken == token), None)
+
+    def save(self, project: Project) -> Project:
+        with self._lock:
+            self._projects[project.id] = project
+            indexed = (project.status, project.created_at)
+            previous = self._keys.get(project.id)
+            if previous != indexed:
+                if previous is not None:
+                    self._by_created.discard((previous[1], project.id))
+                    self._by_status[previous[0]].discard((previous[1], project.id))
+                self._by_created.add((project.created_at, project.id))
+                self._by_status.setdefault(project.status, _SortedKeys()).add((project.created_at, project.id))
+                self._keys[project.id] = indexed
+        self._search.update(project.id, search_fields(project))
+        return project
+
+    def list(self, statuses, created_after, created_before, cursor, limit: int, include_heavy: bool):
+        with self._lock:
+            below = _upper_bound(cursor, created_before)
+            if statuses:
+                runs = [self._by_status[s].newest_first(below, created_after) for s in statuses if s in self._by_status]
+                keys = heapq.merge(*runs, reverse=True)
+            else:
+                keys = self._by_created.newest_first(below, created_after)
+            page = []
+            for _, project_id in keys:
+                data = _dump(self._projects[project_id])
+                page.append(data if include_heavy else _summary(data))
+                if len(page) > limit:
+                    break
+        return page
+
+    def search(self, terms: list, statuses, limit: int) -> list:
+        allowed = (lambda project_id: self._projects[project_id].status in statuses) if statuses else None
+        results = []
+        for project_id, score in self._search.search(terms, limit, allowed):
+            project = self._projects[project_id]
+            results.append({
+                "id": project.id,
+                "name": project.name,
+                "status": project.status,
+                "created_at": project.created_at,
+                "snippet": snippet_for(project, terms),
+                "score": round(score, 4),
+            })
+        return results
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "projects": len(self._projects), "search": self._search.stats()}
+
+
+class _ConnectionPool:
+    """Up to size connections to one database, handed out one caller at a time."""
+
+    def __init__(self, db_path: Path, size: int, statement_cache: int = 64):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self.statement_cache = statement_cache
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            conn = self._connect() if create else self._idle.get(timeout=30)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def stats(self) -> dict:
+        return {"size": self.size, "open": self._created, "idle": self._idle.qsize()}
+
+
+_SELECT_VERSION = "SELECT version FROM projects WHERE id = ?"
+_SELECT_PROJECT = "SELECT version, payload FROM projects WHERE id = ?"
+_SELECT_SEARCH_STATE = "SELECT search_rowid, search_digest FROM projects WHERE id = ?"
+# rowid of the match just past the newest max_ranked ones; NULL when there are fewer.
+_SEARCH_FLOOR = "SELECT rowid FROM project_search WHERE project_search MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?"
+_NEXT_SEARCH_ROWID = "SELECT COALESCE(MAX(search_rowid), 0) + 1 FROM projects"
+_SET_SEARCH_ROWID = "UPDATE projects SET search_rowid = ? WHERE id = ?"
+_DELETE_SEARCH = "DELETE FROM project_search WHERE rowid = ?"
+_INSERT_SEARCH = "INSERT INTO project_search (rowid, name, content, feedback) VALUES (?, ?, ?, ?)"
+_SELECT_BY_TOKEN = "SELECT id FROM projects WHERE review_token = ? LIMIT 1"
+_UPSERT_PROJECT = """
+    INSERT INTO projects (id, name, status, review_token, created_at, updated_at, version, payload, summary, search_digest)
+    VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        status = excluded.status,
+        review_token = excluded.review_token,
+        created_at = excluded.created_at,
+        updated_at = excluded.updated_at,
+        version = projects.version + 1,
+        payload = excluded.payload,
+        summary = excluded.summary,
+        search_digest = excluded.search_digest
+"""
+
+
+class SQLiteProjectBackend:
+    shared = True
+
+    def __init__(self, db_path: Path, pool_size: int = 4, cache_entries: int = 1000, search_max_ranked: int = 1000):
+        self.db_path = Path(db_path)
+        self.search_max_ranked = max(1, int(search_max_ranked))
+        self.cache_entries = max(0, int(cache_entries))
+        self._cache = OrderedDict()  # id -> (version, Project), least recently used first
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.loads = 0
+        self.writes = 0
+        self.reindexed = 0
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool = _ConnectionPool(self.db_path, pool_size)
+        with self._pool.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS projects (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    review_token TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    version INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    summary TEXT NOT NULL DEFAULT '{}',
+                    search_digest TEXT,
+                    search_rowid INTEGER
+                )
+                """
+            )
+            # FTS rows are keyed by projects.search_rowid (implicit rowids can change on VACUUM).
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS project_search "
+                "USING fts5(name, content, feedback, tokenize='unicode61 remove_diacritics 2')"
+            )
+            # Workers start together; one of them migrates/backfills.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._migrate(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            # Listing indexes: newest first, optionally per status.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_created ON projects(status, created_at, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_review_token ON projects(review_token)")
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Databases from before listings: add the summary column and the composite status index."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(projects)")}
+        if "summary" not in columns:
+            conn.execute("ALTER TABLE projects ADD COLUMN summary TEXT NOT NULL DEFAULT '{}'")
+            rows = conn.execute("SELECT id, payload FROM projects").fetchall()
+            conn.executemany(
+                "UPDATE projects SET summary = ? WHERE id = ?",
+                [(json.dumps(_summary(json.loads(payload)), ensure_ascii=False), pid) for pid, payload in rows],
+            )
+        if "search_digest" not in columns:
+            conn.execute("ALTER TABLE projects ADD COLUMN search_digest TEXT")
+            conn.execute("ALTER TABLE projects ADD COLUMN search_rowid INTEGER")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_projects_search_rowid ON projects(search_rowid)")
+        stale = conn.execute("SELECT id, payload FROM projects WHERE search_rowid IS NULL").fetchall()
+        for project_id, payload in stale:
+            fields = search_fields(Project.model_validate_json(payload))
+            doc = conn.execute(_NEXT_SEARCH_ROWID).fetchone()[0]
+            conn.execute(_INSERT_SEARCH, (doc, fields["name"], fields["content"], fields["feedback"]))
+            conn.execute(
+                "UPDATE projects SET search_rowid = ?, search_digest = ? WHERE id = ?",
+                (doc, search_digest(fields), project_id),
+            )
+        conn.execute("DROP INDEX IF EXISTS idx_projects_status")
+
+    def _cached(self, project_id: str, version: int) -> Optional[Project]:
+        with self._cache_lock:
+            entry = self._cache.get(project_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._cache.move_to_end(project_id)
+            self.cache_hits += 1
+            return entry[1]
+
+    def _remember(self, project_id: str, version: int, project: Project):
+        if not self.cache_entries:
+            return
+        with self._cache_lock:
+            self._cache[project_id] = (version, project)
+            self._cache.move_to_end(project_id)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, project_id: str) -> Optional[Project]:
+        with self._pool.connection() as conn:
+            row = conn.execute(_SELECT_VERSION, (project_id,)).fetchone()
+            if row is None:
+                return None
+            cached = self._cached(project_id, row[0])
+            if cached is not None:
+                return cached
+            row = conn.execute(_SELECT_PROJECT, (project_id,)).fetchone()
+        if row is None:
+            return None
+        project = Project.model_validate_json(row[1])
+        with self._cache_lock:
+            self.loads += 1
+        self._remember(project_id, row[0], project)
+        return project
+
+    def get_by_review_token(self, token: str) -> Optional[Project]:
+        with self._pool.connection() as conn:
+            row = conn.execute(_SELECT_BY_TOKEN, (token,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def save(self, project: Project) -> Project:
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                data = _dump(project)
+                fields = search_fields(project)
+                digest = search_digest(fields)
+                before = conn.execute(_SELECT_SEARCH_STATE, (project.id,)).fetchone()
+                conn.execute(
+                    _UPSERT_PROJECT,
+                    (
+                        project.id,
+                        project.name,
+                        project.status,
+                        project.reviewToken,
+                        project.created_at,
+                        time.time(),
+                        json.dumps(data, ensure_ascii=False),
+                        json.dumps(_summary(data), ensure_ascii=False),
+                        digest,
+                    ),
+                )
+                version = conn.execute(_SELECT_VERSION, (project.id,)).fetchone()[0]
+                # Status-only saves leave the full-text index alone.
+                if before is None or before[0] is None or before[1] != digest:
+                    doc = before[0] if before is not None and before[0] is not None else None
+                    if doc is None:
+                        doc = conn.execute(_NEXT_SEARCH_ROWID).fetchone()[0]
+                        conn.execute(_SET_SEARCH_ROWID, (doc, project.id))
+                    conn.execute(_DELETE_SEARCH, (doc,))
+                    conn.execute(_INSERT_SEARCH, (doc, fields["name"], fields["content"], fields["feedback"]))
+                    self.reindexed += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        with self._cache_lock:
+            self.writes += 1
+        self._remember(project.id, version, project)
+        return project
+
+    def list(self, statuses, created_after, created_before, cursor, limit: int, include_heavy: bool):
+        where, params = [], []
+        if created_after is not None:
+            where.append("created_at >= ?")
+            params.append(created_after)
+        below = _upper_bound(cursor, created_before)
+        if below is not None:
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend([below[0], below[0], below[1]])
+        column = "payload" if include_heavy else "summary"
+        with self._pool.connection() as conn:
+            if not statuses:
+                sql = f"SELECT created_at, id, {column} FROM projects"
+                sql += f" WHERE {' AND '.join(where)}" if where else ""
+                rows = conn.execute(sql + " ORDER BY created_at DESC, id DESC LIMIT ?", (*params, limit + 1)).fetchall()
+            else:
+                # One ordered walk of (status, created_at, id) per status, merged;
+                # a single IN (...) query would sort every matching row.
+                sql = f"SELECT created_at, id, {column} FROM projects WHERE {' AND '.join(['status = ?'] + where)}"
+                sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+                runs = [conn.execute(sql, (status, *params, limit + 1)).fetchall() for status in statuses]
+                rows = list(heapq.merge(*runs, key=lambda row: (row[0], row[1]), reverse=True))[:limit + 1]
+        return [json.loads(row[2]) for row in rows]
+
+    def search(self, terms: list, statuses, limit: int) -> list:
+        match = fts_query(terms)
+        status_filter = f" AND p.status IN ({', '.join('?' * len(statuses))})" if statuses else ""
+        sql = (
+            "SELECT p.id, p.name, p.status, p.created_at, "
+            f"snippet(project_search, -1, ?, ?, ?, {SNIPPET_TOKENS}), "
+            f"bm25(project_search, {FIELD_WEIGHTS['name']}, {FIELD_WEIGHTS['content']}, {FIELD_WEIGHTS['feedback']}) AS score "
+            "FROM project_search JOIN projects p ON p.search_rowid = project_search.rowid "
+            f"WHERE project_search MATCH ? AND project_search.rowid > ?{status_filter} ORDER BY score LIMIT ?"
+        )
+        with self._pool.connection() as conn:
+            # BM25 scores every match; for words in most projects, rank only the newest matches.
+            floor = conn.execute(_SEARCH_FLOOR, (match, self.search_max_ranked)).fetchone()
+            rows = conn.execute(
+                sql, (*HIGHLIGHT, ELLIPSIS, match, floor[0] if floor else 0, *(statuses or []), limit)
+            ).fetchall()
+        return [
+            {"id": r[0], "name": r[1], "status": r[2], "created_at": r[3], "snippet": " ".join(r[4].split()), "score": round(-r[5], 4)}
+            for r in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._pool.connection() as conn:
+            projects = conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+        with self._cache_lock:
+            return {
+                "backend": "sqlite",
+                "projects": projects,
+                "cache_entries": len(self._cache),
+                "cache_hits": self.cache_hits,
+                "loads": self.loads,
+                "writes": self.writes,
+                "search_reindexed": self.reindexed,
+                "pool": self._pool.stats(),
+            }
+
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_project_backend():
+    """Process-wide project backend; PROJECT_STORE_BACKEND picks sqlite (default) or memory."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            backend = os.getenv("PROJECT_STORE_BACKEND", "sqlite").strip().lower()
+            if backend == "memory":
+                _BACKEND = MemoryProjectBackend()
+            else:
+                _BACKEND = SQLiteProjectBackend(
+                    Path(os.getenv("PROJECT_DB_PATH", "./backend/beta/.cache/projects.sqlite3")),
+                    pool_size=int(os.getenv("PROJECT_DB_POOL_SIZE", "4")),
+                    cache_entries=int(os.getenv("PROJECT_CACHE_MAX_ENTRIES", "1000")),
+                    search_max_ranked=int(os.getenv("PROJECT_SEARCH_MAX_RANKED", "1000")),
+                )
+        return _BACKEND
+
+
+class ProjectStore:
     @classmethod
     def save_project(cls, project: Project):
-        cls._projects[project.id] = project
-        return project
+        return get_project_backend().save(project)
 
     @classmethod
     def get_project(cls, project_id: str) -> Optional[Project]:
-        return cls._projects.get(project_id)
+        return get_project_backend().get(project_id)
+
+    @classmethod
+    def get_project_by_review_token(cls, token: str) -> Optional[Project]:
+        if not token:
+            return None
+        return get_project_backend().get_by_review_token(token)
 
     @classmethod
     def update_status(cls, project_id: str, status: str):
-        if project_id in cls._projects:
-            cls._projects[project_id].status = status
-            return cls._projects[project_id]
-        return None
+        project = cls.get_project(project_id)
+        if project is None:
+            return None
+        project.status = status
+        return cls.save_project(project)
 
     @classmethod
     def add_feedback(cls, project_id: str, feedback):
-        if project_id in cls._projects:
-            cls._projects[project_id].reviewFeedback.append(feedback)
-            return cls._projects[project_id]
-        return None
+        project = cls.get_project(project_id)
+        if project is None:
+            return None
+        project.reviewFeedback.append(feedback)
+        return cls.save_project(project)
+
+    @classmethod
+    def list_projects(
+        cls,
+        statuses=None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        fields=None,
+    ) -> dict:
+        """
+        One page of projects, newest first: {"projects": [...], "next_cursor": ...}.
+        created_after is inclusive, created_before exclusive (ISO timestamps).
+        fields restricts each project to those keys; by default every field
+        except HEAVY_FIELDS is returned. Raises ValueError on bad arguments.
+        """
+        statuses = list(dict.fromkeys(statuses or []))
+        unknown = [s for s in statuses if s not in PROJECT_STATUSES]
+        if unknown:
+            raise ValueError(f"unknown status {', '.join(unknown)}; expected one of {', '.join(PROJECT_STATUSES)}")
+        if fields:
+            unknown = [f for f in fields if f not in Project.model_fields]
+            if unknown:
+                raise ValueError(f"unknown field {', '.join(unknown)}")
+        include_heavy = bool(fields) and any(f in HEAVY_FIELDS for f in fields)
+        rows = get_project_backend().list(
+            statuses,
+            created_after,
+            created_before,
+            decode_cursor(cursor) if cursor else None,
+            limit,
+            include_heavy,
+        )
+        page = rows[:limit]
+        next_cursor = encode_cursor((page[-1]["created_at"], page[-1]["id"])) if len(rows) > limit else None
+        if fields:
+            page = [{f: row.get(f) for f in fields} for row in page]
+        return {"projects": page, "next_cursor": next_cursor}
+
+    @classmethod
+    def search_projects(cls, query: str, statuses=None, limit: int = 20) -> dict:
+        """Ranked full-text matches: {"query", "results": [{id, name, status, created_at, snippet, score}]}."""
+        terms = parse_query(query)
+        if not terms:
+            raise ValueError("query has no searchable words")
+        statuses = list(dict.fromkeys(statuses or []))
+        unknown = [s for s in statuses if s not in PROJECT_STATUSES]
+        if unknown:
+            raise ValueError(f"unknown status {', '.join(unknown)}; expected one of {', '.join(PROJECT_STATUSES)}")
+        return {"query": query, "results": get_project_backend().search(terms, statuses, limit)}
+
+    @classmethod
+    def stats(cls) -> dict:
+        return get_project_backend().stats()
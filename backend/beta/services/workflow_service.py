@@ -4,7 +4,12 @@ import requests
 import traceback
 from fastapi import HTTPException
 from backend.beta.utils.model import GEMINI_API_KEY, GROQ_API_KEY, GROQ_MODEL
-from litellm import completion as litellm_completion
+from backend.beta.utils.llm_client import acompletion, response_text
+from backend.beta.utils.graph_layout import layered_layout
+
+# Notebook calls are interactive; fail fast rather than hold the request open.
+WORKFLOW_LLM_TIMEOUT_SEC = float(os.getenv("WORKFLOW_LLM_TIMEOUT_SEC", "45"))
+DIAGRAM_NODE_TYPES = ("client", "server", "db", "api")
 
 class WorkflowService:
     @staticmethod
@@ -78,13 +83,14 @@ class WorkflowService:
         {content}
         """
         
-        response = litellm_completion(
+        response = await acompletion(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             api_key=key,
-            temperature=0.7
+            temperature=0.7,
+            timeout=WORKFLOW_LLM_TIMEOUT_SEC
         )
-        raw = response.choices[0].message.content
+        raw = response_text(response)
         return WorkflowService._safe_json(raw, fallback={"services": []})
 
     @staticmethod
@@ -112,13 +118,14 @@ class WorkflowService:
             
         messages.append({"role": "user", "content": f"CONTEXT NOTES:\n{content}\n\nUSER QUESTION: {query}"})
 
-        response = litellm_completion(
+        response = await acompletion(
             model=model,
             messages=messages,
             api_key=key,
-            temperature=0.7
+            temperature=0.7,
+            timeout=WORKFLOW_LLM_TIMEOUT_SEC
         )
-        return {"answer": response.choices[0].message.content}
+        return {"answer": response_text(response)}
 
     @staticmethod
     async def _local_diagram(payload, model, key):
@@ -126,29 +133,23 @@ class WorkflowService:
         if not content.strip():
             return {"nodes": [], "edges": []}
 
+        # Positions come from graph_layout; the model only supplies topology.
         prompt = f"""
         You are a Cloud Solution Architect. Generate a clear, detailed system architecture diagram for these requirements.
-        Output MUST be valid JSON structure compatible with ReactFlow.
+        Output MUST be valid JSON with only the graph topology (no coordinates).
         
         Strictly follow this structure:
         {{
             "nodes": [
-                {{
-                    "id": "1", 
-                    "type": "server|db|client|api", 
-                    "label": "Short Name", 
-                    "x": 250, 
-                    "y": 50 
-                }}
+                {{ "id": "1", "type": "server|db|client|api", "label": "Short Name" }}
             ],
             "edges": [
-                {{ "id": "e1-2", "source": "1", "target": "2", "animated": true, "label": "calls" }}
+                {{ "source": "1", "target": "2", "label": "calls" }}
             ]
         }}
         
         Style Guide:
-        - Layout nodes in a logical flow (Left-Right).
-        - Use x,y coordinates to space them out (assume canvas is 1200x800).
+        - Edges follow the request flow (client -> api -> server -> db).
         - 'type' must be one of: 'client', 'server', 'db', 'api'.
         - Use 8-12 nodes for more detail and clarity.
         - Keep labels short (2-4 words).
@@ -157,14 +158,58 @@ class WorkflowService:
         {content}
         """
 
-        response = litellm_completion(
+        response = await acompletion(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             api_key=key,
-            temperature=0.2
+            temperature=0.2,
+            timeout=WORKFLOW_LLM_TIMEOUT_SEC
         )
-        raw = response.choices[0].message.content
-        return WorkflowService._safe_json(raw, fallback={"nodes": [], "edges": []})
+        raw = response_text(response)
+        diagram = WorkflowService._safe_json(raw, fallback={"nodes": [], "edges": []})
+        return WorkflowService._layout_diagram(diagram)
+
+    @staticmethod
+    def _layout_diagram(diagram: dict) -> dict:
+        """
+        Cleans the model's topology into ReactFlow nodes/edges and positions
+        the nodes with the layered left-to-right layout (x/y on each node).
+        """
+        if not isinstance(diagram, dict):
+            # _safe_json returns whatever parsed, e.g. a bare list.
+            diagram = {"nodes": [], "edges": []}
+        nodes, seen = [], set()
+        for raw_node in diagram.get("nodes") or []:
+            if not isinstance(raw_node, dict) or raw_node.get("id") in (None, ""):
+                continue
+            node_id = str(raw_node["id"])
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            node_type = str(raw_node.get("type") or "").lower()
+            nodes.append({
+                "id": node_id,
+                "type": node_type if node_type in DIAGRAM_NODE_TYPES else "server",
+                "label": str(raw_node.get("label") or node_id),
+            })
+
+        edges = []
+        for raw_edge in diagram.get("edges") or []:
+            if not isinstance(raw_edge, dict):
+                continue
+            source, target = str(raw_edge.get("source", "")), str(raw_edge.get("target", ""))
+            if source not in seen or target not in seen or source == target:
+                continue
+            edge = {"id": f"e{source}-{target}", "source": source, "target": target, "animated": True}
+            if raw_edge.get("label"):
+                edge["label"] = str(raw_edge["label"])
+            if all(e["id"] != edge["id"] for e in edges):
+                edges.append(edge)
+
+        positions = layered_layout([n["id"] for n in nodes], [(e["source"], e["target"]) for e in edges])
+        for node in nodes:
+            node["x"], node["y"] = positions[node["id"]]
+        return {"nodes": nodes, "edges": edges}
 
     @staticmethod
     def _safe_json(text: str, fallback: dict):
@@ -0,0 +1,113 @@
+"""
+Disk-backed cache for AI section expansion.
+
+Maps a canonical hash of the normalized SRS form data, generation mode and
+model configuration to the parsed AI JSON, so regenerating with identical
+inputs skips the LLM round trip. Entries expire after a TTL and the table is
+trimmed to a maximum number of rows, least recently used first.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+# Fields that identify a record but never change what the model is asked.
+_IGNORED_INPUT_FIELDS = {("project_identity", "project_id")}
+
+
+def _normalize(value: Any, path: tuple = ()) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: _normalize(v, path + (k,))
+            for k, v in sorted(value.items())
+            if path + (k,) not in _IGNORED_INPUT_FIELDS and v not in (None, "", [], {})
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v, path) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def make_cache_key(inputs: dict, mode: str, model: str) -> str:
+    canonical = json.dumps(
+        {"inputs": _normalize(inputs), "mode": mode, "model": model},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AIResponseCache:
+    def __init__(self, db_path: Path, ttl_sec: float, max_entries: int):
+        self.db_path = Path(db_path)
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ai_responses (
+                key TEXT PRIMARY KEY,
+                mode TEXT NOT NULL,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_responses_last_used ON ai_responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM ai_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_sec:
+                if row is not None:
+                    self._conn.execute("DELETE FROM ai_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE ai_responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, mode: str, model: str, payload: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_responses (key, mode, model, payload, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, mode, model, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+            self._conn.execute("DELETE FROM ai_responses WHERE created_at < ?", (now - self.ttl_sec,))
+            self._conn.execute(
+                "DELETE FROM ai_responses WHERE key IN ("
+                "SELECT key FROM ai_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM ai_responses").fetchone()[0]
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,127 @@
+"""
+Right-sized images for generated DOCX files.
+
+Diagrams are rendered far larger than they are ever shown (a 3600 px wide
+PNG for a 2.8"-6" figure). Before embedding, each source image is downscaled
+once to the widest size the document displays images at (the 6.5" text
+block, DOCX_IMAGE_MAX_WIDTH_IN) at DOCX_IMAGE_DPI. Every placement of the
+same picture (grid thumbnail, section figure) then embeds identical bytes,
+which python-docx stores as a single media part referenced by one rId.
+
+Derivatives are cached per process by source content hash, so the quick and
+enhanced builds of a project resize each diagram only once. Pillow is
+optional: without it, images are embedded as rendered (still deduplicated).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow not installed: embed originals
+    Image = None
+
+
+class DocxImageAssets:
+    def __init__(self, dpi: int, max_width_in: float, cache_bytes: int):
+        self.dpi = max(0, int(dpi))
+        self.max_width_in = max_width_in
+        self.cache_bytes = max(0, int(cache_bytes))
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # source sha256 -> embedded bytes, least recently used first
+        self._cache_total = 0
+        self.resized = 0
+        self.passthrough = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def target_px(self) -> int:
+        return int(round(self.max_width_in * self.dpi))
+
+    def stream(self, path) -> BytesIO:
+        """Bytes to embed for the image at path, as a stream for run.add_picture()."""
+        data = Path(path).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                self.cache_hits += 1
+                return BytesIO(cached)
+        embedded = self._downscale(data)
+        with self._lock:
+            self.bytes_in += len(data)
+            self.bytes_out += len(embedded)
+            if digest not in self._cache and len(embedded) <= self.cache_bytes:
+                self._cache[digest] = embedded
+                self._cache_total += len(embedded)
+                while self._cache_total > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_total -= len(evicted)
+        return BytesIO(embedded)
+
+    def _downscale(self, data: bytes) -> bytes:
+        if Image is None or self.target_px <= 0:
+            self._count("passthrough")
+            return data
+        try:
+            with Image.open(BytesIO(data)) as image:
+                if image.width <= self.target_px or image.format not in ("PNG", "JPEG"):
+                    self._count("passthrough")
+                    return data
+                height = max(1, round(image.height * self.target_px / image.width))
+                fmt = image.format
+                resized = image.resize((self.target_px, height), Image.LANCZOS)
+            out = BytesIO()
+            if fmt == "JPEG":
+                resized.convert("RGB").save(out, format="JPEG", quality=90, dpi=(self.dpi, self.dpi))
+            else:
+                resized.save(out, format="PNG", dpi=(self.dpi, self.dpi))
+        except Exception as e:
+            print(f"⚠️ Could not downscale image for DOCX: {e}")
+            self._count("passthrough")
+            return data
+        if out.tell() >= len(data):
+            self._count("passthrough")
+            return data
+        self._count("resized")
+        return out.getvalue()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pillow": Image is not None,
+                "dpi": self.dpi,
+                "target_px": self.target_px,
+                "resized": self.resized,
+                "passthrough": self.passthrough,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._cache),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
+
+
+_ASSETS = None
+_ASSETS_LOCK = threading.Lock()
+
+
+def get_docx_image_assets() -> DocxImageAssets:
+    global _ASSETS
+    with _ASSETS_LOCK:
+        if _ASSETS is None:
+            _ASSETS = DocxImageAssets(
+                dpi=int(os.getenv("DOCX_IMAGE_DPI", "200")),
+                max_width_in=float(os.getenv("DOCX_IMAGE_MAX_WIDTH_IN", "6.5")),
+                cache_bytes=int(float(os.getenv("DOCX_IMAGE_CACHE_MB", "64")) * 1024 * 1024),
+            )
+        return _ASSETS
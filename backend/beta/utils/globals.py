@@ -1,10 +1,23 @@
 from google.genai import types
 from google.adk.runners import Runner
 from google.adk.agents import SequentialAgent , ParallelAgent
+import atexit
 import base64
-import json , shutil , re , subprocess
+import hashlib
+import json , os , shutil , re , subprocess , threading
+from concurrent.futures import Future
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+from backend.beta.utils.mermaid_renderer import (
+    MermaidRenderError,
+    MermaidRenderPool,
+    WarmMermaidRenderer,
+    pool_settings_from_env,
+)
+from backend.beta.utils import native_mermaid
+from backend.beta.utils.mermaid_validator import check_mermaid
+from backend.beta.utils.render_cache import RenderCache
 
 
 
@@ -218,6 +231,11 @@ def _default_interface_section(title: str) -> dict:
     }
 
 
+def mermaid_prevalidation_enabled() -> bool:
+    """MERMAID_PREVALIDATE=0 sends LLM diagrams to the renderers unchecked."""
+    return os.getenv("MERMAID_PREVALIDATE", "1").strip().lower() not in ("0", "false", "no")
+
+
 def clean_interface_diagrams(external_interfaces: dict) -> dict:
     """
     Iterates through the external_interfaces dictionary, cleans the mermaid code 
@@ -254,6 +272,12 @@ def clean_interface_diagrams(external_interfaces: dict) -> dict:
                 continue
             raw_code = inner["code"]
             cleaned_code = sanitize_mermaid_output(raw_code)
+            if cleaned_code and mermaid_prevalidation_enabled():
+                cleaned_code, status, errors = check_mermaid(cleaned_code)
+                if status == "repaired":
+                    print(f"🔧 Repaired {key} diagram: {'; '.join(errors[:3])}")
+                elif status == "invalid":
+                    print(f"⚠️ Invalid {key} diagram, using the default: {'; '.join(errors[:3])}")
             if cleaned_code:
                 external_interfaces[key]["interface_diagram"]["code"] = cleaned_code
             else:
@@ -264,51 +288,165 @@ def clean_interface_diagrams(external_interfaces: dict) -> dict:
     return external_interfaces
 
 
-def render_mermaid_png(mermaid_code: str, output_png: Path):
+_MERMAID_CSS_PATH = Path("backend/beta/static/custom-diagram.css")
+_MERMAID_CONFIG_PATH = Path("backend/beta/static/mermaid-config.json")
+_MERMAID_RENDER_OPTIONS = {
+    "theme": "neutral",
+    "background": "white",
+}
+# Named render sizes; callers pick one per target. mmdc takes integer scales.
+MERMAID_RENDER_PROFILES = {
+    # 2.8" visual-overview cells and fast drafts
+    "thumbnail": {"format": "png", "width": 900, "height": 600, "scale": 1},
+    # 6-6.5" DOCX figures; embedded at DOCX_IMAGE_DPI, so 2x leaves headroom
+    "document": {"format": "png", "width": 1300, "height": 900, "scale": 2},
+    # Previous fixed setting, for print-quality exports
+    "print": {"format": "png", "width": 3600, "height": 2200, "scale": 3},
+    # Base64 images returned to the Studio UI
+    "api-preview": {"format": "png", "width": 1200, "height": 800, "scale": 1},
+    # Vector DOCX figures: <name>.svg plus a small raster fallback at <name>.png.
+    # Word's SVG renderer ignores <foreignObject>, so labels must be SVG text.
+    "document-svg": {
+        "format": "svg",
+        "width": 1300,
+        "height": 900,
+        "scale": 1,
+        "fallback": "thumbnail",
+        "mermaid_config": {"htmlLabels": False, "flowchart": {"htmlLabels": False}},
+    },
+}
+DEFAULT_RENDER_PROFILE = "document"
+_MERMAID_RENDER_TIMEOUT_SEC = float(os.getenv("MERMAID_RENDER_TIMEOUT_SEC", "60"))
+
+
+def render_profile_options(profile: str = DEFAULT_RENDER_PROFILE) -> dict:
+    """Full render options (size, scale, format, theme) for a named profile."""
+    if profile not in MERMAID_RENDER_PROFILES:
+        print(f"⚠️ Unknown Mermaid render profile '{profile}'; using '{DEFAULT_RENDER_PROFILE}'")
+        profile = DEFAULT_RENDER_PROFILE
+    return {**_MERMAID_RENDER_OPTIONS, **MERMAID_RENDER_PROFILES[profile], "profile": profile}
+
+
+def _merge_config(base: dict, overrides: dict) -> dict:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _profile_mermaid_config(options: dict) -> dict | None:
+    """mermaid-config.json with the profile's overrides, or None when it has none."""
+    overrides = options.get("mermaid_config")
+    if not overrides:
+        return None
+    try:
+        base = json.loads(_MERMAID_CONFIG_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        base = {}
+    return _merge_config(base, overrides)
+
+
+def vector_sibling(output_png: Path) -> Path:
+    """Where an SVG-profile render keeps the vector version of output_png."""
+    return Path(output_png).with_suffix(".svg")
+
+
+_PUBLIC_MERMAID_INK = "https://mermaid.ink"
+_RENDER_SERVICE_SESSION = None
+_RENDER_SERVICE_LOCK = threading.Lock()
+
+
+def render_service_url() -> str:
     """
-    Renders Mermaid code into a PNG file using mmdc (npm).
-    Uses PATH first so it works on any machine; no hardcoded paths.
+    Base URL of the mermaid.ink-compatible fallback renderer: the public
+    service by default, or a self-hosted `python -m backend.beta.render_service`.
+    Empty disables the fallback.
     """
-    def _render_with_mermaid_ink():
-        encoded = base64.urlsafe_b64encode(mermaid_code.encode("utf-8")).decode("utf-8")
-        url = f"https://mermaid.ink/img/{encoded}?type=png"
-        resp = requests.get(url, timeout=45)
-        resp.raise_for_status()
-        if not resp.content:
-            raise RuntimeError("Empty image response from mermaid.ink")
-        output_png.write_bytes(resp.content)
-        print(f"✅ Mermaid diagram saved via mermaid.ink: {output_png}")
+    return os.getenv("MERMAID_RENDER_SERVICE_URL", _PUBLIC_MERMAID_INK).strip().rstrip("/")
+
+
+def get_render_service_session() -> requests.Session:
+    """Keep-alive session for the render service, one connection per pool worker."""
+    global _RENDER_SERVICE_SESSION
+    with _RENDER_SERVICE_LOCK:
+        if _RENDER_SERVICE_SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=max(1, pool_settings_from_env()["size"])
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _RENDER_SERVICE_SESSION = session
+        return _RENDER_SERVICE_SESSION
+
+
+def _render_with_service(mermaid_code: str, output_png: Path, options: dict):
+    base_url = render_service_url()
+    fmt = options.get("format", "png")
+    if not base_url:
+        raise RuntimeError("No Mermaid render service configured (MERMAID_RENDER_SERVICE_URL is empty)")
+    if fmt != "png" and base_url == _PUBLIC_MERMAID_INK:
+        # mermaid.ink applies its own config (HTML labels), which Word cannot show in SVGs.
+        raise RuntimeError(f"mermaid.ink fallback only renders PNG, not {fmt}")
+    encoded = base64.urlsafe_b64encode(mermaid_code.encode("utf-8")).decode("utf-8")
+    if fmt == "svg":
+        url, params = f"{base_url}/svg/{encoded}", {}
+    else:
+        url, params = f"{base_url}/img/{encoded}", {"type": "png"}
+    params.update(width=options["width"], height=options["height"], scale=options["scale"])
+    if options.get("profile"):
+        params["profile"] = options["profile"]  # only the self-hosted service reads this
+    resp = get_render_service_session().get(
+        url, params=params, timeout=float(os.getenv("MERMAID_RENDER_SERVICE_TIMEOUT_SEC", "45"))
+    )
+    resp.raise_for_status()
+    if not resp.content:
+        raise RuntimeError(f"Empty image response from {base_url}")
+    output_png.write_bytes(resp.content)
+    print(f"✅ Mermaid diagram saved via {base_url}: {output_png}")
 
+
+def _render_mermaid_oneshot(mermaid_code: str, output_png: Path, options: dict):
+    """
+    Renders Mermaid code into a PNG (or SVG, by the output suffix) file using a
+    one-off mmdc (npm) process. Uses PATH first so it works on any machine; no
+    hardcoded paths.
+    """
+    fmt = options.get("format", "png")
     mmdc_path = shutil.which("mmdc") or shutil.which("mmdc.cmd")
     if not mmdc_path:
-        print("⚠️ mmdc not found; using mermaid.ink fallback")
-        output_png.parent.mkdir(parents=True, exist_ok=True)
-        _render_with_mermaid_ink()
+        print("⚠️ mmdc not found; using the render service fallback")
+        _render_with_service(mermaid_code, output_png, options)
         return
-    
-    output_png.parent.mkdir(parents=True, exist_ok=True)
-    mmd_path = output_png.with_suffix(".mmd")
+
+    # The SVG and its PNG fallback render concurrently; keep their sources apart.
+    mmd_path = output_png.with_suffix(".mmd" if fmt == "png" else f".{fmt}.mmd")
 
     with open(mmd_path, "w", encoding="utf-8") as f:
         f.write(mermaid_code)
 
-    css_path = Path("backend/beta/static/custom-diagram.css")
-    config_path = Path("backend/beta/static/mermaid-config.json")
-
     cmd = [
         mmdc_path,
         "-i", str(mmd_path),
         "-o", str(output_png),
-        "-w", "3600",
-        "-H", "2200",
-        "-t", "neutral",
-        "-b", "white",
-        "-s", "3"
+        "-w", str(options["width"]),
+        "-H", str(options["height"]),
+        "-t", options["theme"],
+        "-b", options["background"],
+        "-s", str(options["scale"])
     ]
-    if config_path.exists():
+    profile_config = _profile_mermaid_config(options)
+    if profile_config is not None:
+        config_path = mmd_path.with_suffix(".config.json")
+        config_path.write_text(json.dumps(profile_config), encoding="utf-8")
         cmd.extend(["-c", str(config_path)])
-    if css_path.exists():
-        cmd.extend(["-C", str(css_path)])
+    elif _MERMAID_CONFIG_PATH.exists():
+        cmd.extend(["-c", str(_MERMAID_CONFIG_PATH)])
+    if _MERMAID_CSS_PATH.exists():
+        cmd.extend(["-C", str(_MERMAID_CSS_PATH)])
 
 
     try:
@@ -317,5 +455,219 @@ def render_mermaid_png(mermaid_code: str, output_png: Path):
     except subprocess.CalledProcessError as e:
         print(f"❌ mmdc error: {e.stderr}")
         print(f"Command that failed: {' '.join(cmd)}")
-        print("⚠️ Falling back to mermaid.ink rendering...")
-        _render_with_mermaid_ink()
+        if _is_syntax_error(e.stderr):
+            # The render service runs the same parser; don't pay for a second failure.
+            raise MermaidRenderError(f"Mermaid syntax error: {e.stderr.strip()[:300]}")
+        print("⚠️ Falling back to the render service...")
+        _render_with_service(mermaid_code, output_png, options)
+
+
+def _is_syntax_error(message: str | None) -> bool:
+    """Mermaid's parser errors; every renderer would reject the source the same way."""
+    return bool(message) and re.search(r"(Parse|Lexical|Syntax) error", message) is not None
+
+
+def native_render_enabled() -> bool:
+    """MERMAID_NATIVE_RENDERER=0 sends every diagram to mmdc; PNG output also needs Pillow."""
+    return os.getenv("MERMAID_NATIVE_RENDERER", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _native_theme(options: dict) -> dict:
+    """Native renderer theme from the same mermaid-config.json mmdc gets."""
+    config = _profile_mermaid_config(options)
+    if config is None:
+        try:
+            config = json.loads(_MERMAID_CONFIG_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            config = {}
+    return native_mermaid.theme_from_config(config)
+
+
+def _render_mermaid_job(mermaid_code: str, output_png: Path, renderer: WarmMermaidRenderer | None, options: dict | None):
+    """
+    Pool job: the in-process renderer for sources submitted with its engine,
+    else the thread's warm renderer when present, else the one-shot path.
+    Returns native_mermaid.ENGINE when the native renderer produced the file,
+    None when mmdc or the render service did.
+    """
+    output_png.parent.mkdir(parents=True, exist_ok=True)
+    options = dict(options or render_profile_options())
+    if options.get("engine") == native_mermaid.ENGINE:
+        try:
+            native_mermaid.render(mermaid_code, output_png, options, theme=_native_theme(options))
+            print(f"✅ Mermaid diagram saved (native renderer): {output_png}")
+            return native_mermaid.ENGINE
+        except Exception as e:
+            print(f"⚠️ Native Mermaid render failed ({e}); falling back to mmdc")
+    if renderer is None:
+        _render_mermaid_oneshot(mermaid_code, output_png, options)
+        return
+
+    profile_config = _profile_mermaid_config(options)
+    if profile_config is not None:
+        options["mermaidConfig"] = profile_config
+    elif _MERMAID_CONFIG_PATH.exists():
+        options["config"] = str(_MERMAID_CONFIG_PATH.resolve())
+    if _MERMAID_CSS_PATH.exists():
+        options["css"] = str(_MERMAID_CSS_PATH.resolve())
+    try:
+        renderer.render(mermaid_code, output_png, options, timeout=_MERMAID_RENDER_TIMEOUT_SEC)
+        print(f"✅ Mermaid diagram saved (warm renderer): {output_png}")
+    except MermaidRenderError as e:
+        # The renderer is fine but the source is not; mmdc would fail the same way.
+        print(f"❌ Mermaid render error: {e}")
+        if _is_syntax_error(str(e)):
+            raise
+        print("⚠️ Falling back to the render service...")
+        _render_with_service(mermaid_code, output_png, options)
+
+
+_RENDER_POOL = None
+_RENDER_POOL_LOCK = threading.Lock()
+
+
+def get_render_pool() -> MermaidRenderPool:
+    """Process-wide Mermaid render pool, created on first use."""
+    global _RENDER_POOL
+    with _RENDER_POOL_LOCK:
+        if _RENDER_POOL is None:
+            _RENDER_POOL = MermaidRenderPool(_render_mermaid_job, **pool_settings_from_env())
+            atexit.register(_RENDER_POOL.shutdown)
+        return _RENDER_POOL
+
+
+_RENDER_CACHE = None
+
+
+def get_render_cache() -> RenderCache | None:
+    """Process-wide diagram render cache, or None when MERMAID_CACHE_ENABLED=0."""
+    global _RENDER_CACHE
+    if os.getenv("MERMAID_CACHE_ENABLED", "1").strip().lower() in ("0", "false", "no"):
+        return None
+    with _RENDER_POOL_LOCK:
+        if _RENDER_CACHE is None:
+            _RENDER_CACHE = RenderCache(
+                Path(os.getenv("MERMAID_CACHE_DIR", "backend/beta/.render_cache")),
+                max_bytes=int(float(os.getenv("MERMAID_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            )
+        return _RENDER_CACHE
+
+
+def _render_cache_options(options: dict) -> dict:
+    """Everything besides the source that changes the rendered image."""
+    options = {k: v for k, v in options.items() if k != "profile"}
+    for name, path in (("config", _MERMAID_CONFIG_PATH), ("css", _MERMAID_CSS_PATH)):
+        try:
+            options[name] = hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            options[name] = None
+    return options
+
+
+def submit_mermaid_render(
+    mermaid_code: str,
+    output_png: Path,
+    profile: str = DEFAULT_RENDER_PROFILE,
+    priority: str = "normal",
+    requester: str = "",
+) -> Future:
+    """
+    Queue a diagram on the shared render pool at the given render profile; the
+    future resolves to output_png. Identical source + options are served from
+    the render cache without rendering.
+
+    SVG profiles also write vector_sibling(output_png); output_png is then the
+    profile's raster fallback.
+
+    priority (RENDER_PRIORITIES) and requester (e.g. the project key) decide
+    the job's place in the pool's queue, shared with every other request.
+    """
+    output_png = Path(output_png)
+    options = render_profile_options(profile)
+    schedule = {"priority": priority, "requester": requester}
+    if options["format"] == "svg":
+        return _submit_vector_render(mermaid_code, output_png, options, schedule)
+    # A vector copy left by an earlier SVG-profile render would not match any more.
+    vector_sibling(output_png).unlink(missing_ok=True)
+    return _submit_render(mermaid_code, output_png, options, schedule)
+
+
+def _submit_vector_render(mermaid_code: str, output_png: Path, options: dict, schedule: dict | None = None) -> Future:
+    """SVG plus raster fallback; a failed SVG degrades to the PNG alone."""
+    svg_path = vector_sibling(output_png)
+    vector = _submit_render(mermaid_code, svg_path, options, schedule)
+    fallback = _submit_render(mermaid_code, output_png, render_profile_options(options["fallback"]), schedule)
+    done = Future()
+    pending = [2]
+    lock = threading.Lock()
+
+    def _finish(_):
+        with lock:
+            pending[0] -= 1
+            if pending[0]:
+                return
+        if fallback.exception() is not None:
+            svg_path.unlink(missing_ok=True)
+            done.set_exception(fallback.exception())
+            return
+        if vector.exception() is not None:
+            print(f"⚠️ SVG render failed ({vector.exception()}); keeping the PNG only")
+            svg_path.unlink(missing_ok=True)
+        done.set_result(output_png)
+
+    vector.add_done_callback(_finish)
+    fallback.add_done_callback(_finish)
+    return done
+
+
+def _submit_render(mermaid_code: str, output_png: Path, options: dict, schedule: dict | None = None) -> Future:
+    schedule = schedule or {}
+    if mermaid_prevalidation_enabled():
+        # Model output was counted when it was cleaned; renders only gate on the result.
+        checked, status, errors = check_mermaid(mermaid_code, record=False)
+        if status == "invalid":
+            # Nothing would render it; fail now instead of after mmdc and the service.
+            failed = Future()
+            failed.set_exception(MermaidRenderError(f"Invalid Mermaid: {'; '.join(errors[:3])}"))
+            return failed
+        mermaid_code = checked
+    native = native_render_enabled() and native_mermaid.supports(mermaid_code, options.get("format", "png"))
+    mmdc_options = options
+    if native:
+        # Also keys the cache, so native and mmdc renders never stand in for each other.
+        options = {**options, "engine": native_mermaid.ENGINE}
+    cache = get_render_cache()
+    if cache is None:
+        # The old file may be a hard link into the blob store; never render through it.
+        output_png.unlink(missing_ok=True)
+        return get_render_pool().submit(mermaid_code, output_png, options=options, warm=not native, **schedule)
+
+    key = RenderCache.make_key(mermaid_code, _render_cache_options(options))
+    # A failed native render falls back to mmdc; its output belongs under the mmdc key.
+    mmdc_key = RenderCache.make_key(mermaid_code, _render_cache_options(mmdc_options)) if native else key
+    if cache.fetch(key, output_png):
+        print(f"♻️ Mermaid diagram served from render cache: {output_png}")
+        done = Future()
+        done.set_result(output_png)
+        return done
+
+    # The old file may be a hard link into the cache or blob store; never render through it.
+    output_png.unlink(missing_ok=True)
+    return get_render_pool().submit(
+        mermaid_code,
+        output_png,
+        on_success=lambda path, engine: cache.store(key if engine == native_mermaid.ENGINE else mmdc_key, path),
+        options=options,
+        warm=not native,
+        **schedule,
+    )
+
+
+def render_mermaid_png(mermaid_code: str, output_png: Path, profile: str = DEFAULT_RENDER_PROFILE):
+    """
+    Renders Mermaid code into a PNG file through the shared render pool
+    (native renderer for the SRS template subset, warm renderer, then mmdc,
+    then the render service at MERMAID_RENDER_SERVICE_URL). With an SVG profile
+    (e.g. document-svg) the vector version is written next to it as .svg.
+    """
+    submit_mermaid_render(mermaid_code, output_png, profile).result()
@@ -0,0 +1,231 @@
+"""
+Layered (Sugiyama-style) graph layout, shared by the notebook ReactFlow
+diagrams (layered_layout below) and the native Mermaid renderer
+(native_mermaid._layered):
+
+- cycle removal by DFS;
+- longest-path ranks, one column per rank;
+- dummy vertices on edges that span several ranks;
+- barycentric ordering sweeps, keeping the order with the fewest crossings;
+- each node placed at the mean position of its neighbours without overlaps
+  (least squares, pav).
+
+The notebook layout fits a 1200x800 canvas when it can. Larger graphs grow
+past it instead of overlapping. The same input always gives the same
+positions.
+"""
+from collections import defaultdict
+
+CANVAS_WIDTH = 1200
+CANVAS_HEIGHT = 800
+# ReactFlow's default node box, with room for 2-4 word labels.
+NODE_WIDTH = 172
+NODE_HEIGHT = 40
+MARGIN = 40
+MIN_COLUMN_GAP = 60
+MIN_ROW_GAP = 30
+ORDERING_SWEEPS = 8
+PLACEMENT_SWEEPS = 6
+
+
+class Layering:
+    """Ranked, ordered layers: layers[r] lists nodes and dummy vertices ("~", a, b, r) in order."""
+
+    __slots__ = ("dag", "rank", "layers", "up", "down", "chains")
+
+
+def is_dummy(vertex) -> bool:
+    return isinstance(vertex, tuple)
+
+
+def _acyclic(node_ids: list, edges: list, roots: list) -> list:
+    """edges with DFS back edges reversed, so every edge points to a later rank."""
+    out = defaultdict(list)
+    for a, b in edges:
+        out[a].append(b)
+    state, back = {}, set()
+    for root in roots:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(out[root]))]
+        while stack:
+            node, successors = stack[-1]
+            nxt = next(successors, None)
+            if nxt is None:
+                state[node] = 2
+                stack.pop()
+            elif state.get(nxt) == 1:
+                back.add((node, nxt))
+            elif nxt not in state:
+                state[nxt] = 1
+                stack.append((nxt, iter(out[nxt])))
+    dag = []
+    for a, b in edges:
+        edge = (b, a) if (a, b) in back else (a, b)
+        if edge not in dag:
+            dag.append(edge)
+    return dag
+
+
+def _ranks(node_ids: list, dag: list) -> dict:
+    preds, succs = defaultdict(list), defaultdict(list)
+    for a, b in dag:
+        succs[a].append(b)
+        preds[b].append(a)
+    rank, waiting = {}, {n: len(preds[n]) for n in node_ids}
+    queue = [n for n in node_ids if not waiting[n]]
+    for node in queue:
+        rank[node] = max((rank[p] + 1 for p in preds[node]), default=0)
+        for s in succs[node]:
+            waiting[s] -= 1
+            if not waiting[s]:
+                queue.append(s)
+    return rank
+
+
+def _crossings(layers: list, down: dict) -> int:
+    total = 0
+    for r in range(len(layers) - 1):
+        pos = {v: i for i, v in enumerate(layers[r + 1])}
+        ends = [(i, pos[w]) for i, v in enumerate(layers[r]) for w in down[v]]
+        total += sum(1 for x, (a1, b1) in enumerate(ends) for a2, b2 in ends[x + 1:] if (a1 - a2) * (b1 - b2) < 0)
+    return total
+
+
+def _order(layers: list, up: dict, down: dict) -> list:
+    def sweep(r: int, neighbours: dict, ref: int):
+        ref_pos = {v: i for i, v in enumerate(layers[ref])}
+        own_pos = {v: i for i, v in enumerate(layers[r])}
+
+        def key(v):
+            ns = [ref_pos[n] for n in neighbours[v]]
+            return sum(ns) / len(ns) if ns else own_pos[v]
+
+        layers[r].sort(key=key)
+
+    for r in range(1, len(layers)):
+        sweep(r, up, r - 1)
+    best, best_crossings = [list(layer) for layer in layers], _crossings(layers, down)
+    for iteration in range(ORDERING_SWEEPS):
+        if not best_crossings:
+            break
+        if iteration % 2 == 0:
+            for r in range(len(layers) - 2, -1, -1):
+                sweep(r, down, r + 1)
+        else:
+            for r in range(1, len(layers)):
+                sweep(r, up, r - 1)
+        current = _crossings(layers, down)
+        if current < best_crossings:
+            best, best_crossings = [list(layer) for layer in layers], current
+    return best
+
+
+def layer_graph(node_ids: list, edges: list, roots: list = None) -> Layering:
+    """
+    Ranks and orders a graph. edges are distinct (source, target) pairs
+    between node_ids, without self loops. The DFS that breaks cycles starts
+    from roots (default: node_ids in order).
+    """
+    layering = Layering()
+    layering.dag = _acyclic(node_ids, edges, node_ids if roots is None else roots)
+    layering.rank = rank = _ranks(node_ids, layering.dag)
+    layers = [[] for _ in range(max(rank.values(), default=0) + 1)]
+    for node in node_ids:
+        layers[rank[node]].append(node)
+    up, down, chains = defaultdict(list), defaultdict(list), {}
+    for a, b in layering.dag:
+        chain = [a] + [("~", a, b, r) for r in range(rank[a] + 1, rank[b])] + [b]
+        for r, vertex in enumerate(chain[1:-1], rank[a] + 1):
+            layers[r].append(vertex)
+        for x, y in zip(chain, chain[1:]):
+            down[x].append(y)
+            up[y].append(x)
+        chains[(a, b)] = chain
+    layering.layers = _order(layers, up, down)
+    layering.up, layering.down, layering.chains = up, down, chains
+    return layering
+
+
+def pav(desired: list, seps: list) -> list:
+    """Closest positions to desired (least squares) with p[i+1] - p[i] >= seps[i]."""
+    offsets = [0.0]
+    for sep in seps:
+        offsets.append(offsets[-1] + sep)
+    blocks = []  # [first index, sum of (desired - offset), count]
+    for i, (want, offset) in enumerate(zip(desired, offsets)):
+        blocks.append([i, want - offset, 1])
+        while len(blocks) > 1 and blocks[-2][1] / blocks[-2][2] > blocks[-1][1] / blocks[-1][2]:
+            _, total, count = blocks.pop()
+            blocks[-1][1] += total
+            blocks[-1][2] += count
+    positions = []
+    for _, total, count in blocks:
+        positions.extend([total / count] * count)
+    return [base + offset for base, offset in zip(positions, offsets)]
+
+
+def place_in_layers(layering: Layering, seps: list) -> dict:
+    """
+    {vertex: position across the ranks}. seps[r][i] is the minimum distance
+    between layers[r][i] and layers[r][i + 1]; vertices are pulled towards the
+    mean of their neighbours, sweeping down and up.
+    """
+    layers, pos = layering.layers, {}
+    for layer, layer_seps in zip(layers, seps):
+        for v, p in zip(layer, pav([0.0] * len(layer), layer_seps)):
+            pos[v] = p
+    for iteration in range(PLACEMENT_SWEEPS):
+        if iteration % 2 == 0:
+            order, neighbours = range(1, len(layers)), layering.up
+        else:
+            order, neighbours = range(len(layers) - 2, -1, -1), layering.down
+        for r in order:
+            desired = [
+                sum(pos[n] for n in neighbours[v]) / len(neighbours[v]) if neighbours[v] else pos[v]
+                for v in layers[r]
+            ]
+            for v, p in zip(layers[r], pav(desired, seps[r])):
+                pos[v] = p
+    return pos
+
+
+def layered_layout(
+    node_ids: list,
+    edges: list,
+    width: int = CANVAS_WIDTH,
+    height: int = CANVAS_HEIGHT,
+    node_width: int = NODE_WIDTH,
+    node_height: int = NODE_HEIGHT,
+) -> dict:
+    """
+    {node id: (x, y)} top-left positions for a left-to-right layered layout.
+    edges are (source, target) pairs; unknown ends and self loops are ignored.
+    """
+    node_ids = list(dict.fromkeys(node_ids))
+    if not node_ids:
+        return {}
+    known = set(node_ids)
+    edges = [(a, b) for a, b in dict.fromkeys(edges) if a in known and b in known and a != b]
+    # Roots in input order: the model lists entry points (clients) first.
+    layering = layer_graph(node_ids, edges)
+    layers, rank = layering.layers, layering.rank
+
+    # Rows: the tallest column sets the spacing, fitted to the canvas down to MIN_ROW_GAP.
+    tallest = max(len(layer) for layer in layers)
+    row = max(node_height + MIN_ROW_GAP, (height - 2 * MARGIN) / tallest) if tallest > 1 else 0
+    row = min(row, node_height * 3)
+    y = place_in_layers(layering, [[row] * (len(layer) - 1) for layer in layers])
+
+    # Columns: spread across the canvas width, never closer than MIN_COLUMN_GAP.
+    columns = len(layers)
+    column = max(node_width + MIN_COLUMN_GAP, (width - 2 * MARGIN - node_width) / (columns - 1)) if columns > 1 else 0
+    column = min(column, node_width * 2)
+    used_width = (columns - 1) * column + node_width
+    left = max(MARGIN, (width - used_width) / 2)
+
+    top_y = min(y[n] for n in node_ids)
+    used_height = max(y[n] for n in node_ids) - top_y + node_height
+    top = max(MARGIN, (height - used_height) / 2)
+    return {n: (round(left + rank[n] * column), round(top + y[n] - top_y)) for n in node_ids}
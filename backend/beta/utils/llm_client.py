@@ -0,0 +1,82 @@
+"""
+Shared async LLM client.
+
+Every LiteLLM call runs through `litellm.acompletion` on one long-lived event
+loop owned by a daemon thread. Async endpoints await it without blocking the
+server loop, sync code (threadpool work, background builds) waits on the same
+calls from any thread, and because the loop never changes, LiteLLM's cached
+async HTTP clients keep their keep-alive connection pools across requests.
+Each call carries a hard per-call timeout.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, List, Optional
+
+import litellm
+
+DEFAULT_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "60"))
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _llm_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+
+def _on_llm_loop() -> bool:
+    try:
+        return asyncio.get_running_loop() is _LOOP
+    except RuntimeError:
+        return False
+
+
+def submit(coro: Coroutine) -> Future:
+    """Schedule a coroutine on the LLM loop. Cancelling the future cancels the call."""
+    return asyncio.run_coroutine_threadsafe(coro, _llm_loop())
+
+
+async def _call(model: str, messages: List[dict], timeout: float, kwargs: dict) -> Any:
+    return await asyncio.wait_for(
+        litellm.acompletion(model=model, messages=messages, timeout=timeout, **kwargs),
+        timeout=timeout,
+    )
+
+
+def submit_completion(model: str, messages: List[dict], timeout: Optional[float] = None, **kwargs) -> Future:
+    """Start a completion from any thread; returns a concurrent Future for the response."""
+    return submit(_call(model, messages, timeout or DEFAULT_TIMEOUT_SEC, kwargs))
+
+
+async def acompletion(model: str, messages: List[dict], timeout: Optional[float] = None, **kwargs) -> Any:
+    """Await a completion from any event loop without blocking it."""
+    coro = _call(model, messages, timeout or DEFAULT_TIMEOUT_SEC, kwargs)
+    if _on_llm_loop():
+        return await coro
+    return await asyncio.wrap_future(submit(coro))
+
+
+def completion(model: str, messages: List[dict], timeout: Optional[float] = None, **kwargs) -> Any:
+    """Blocking completion for sync callers; must not be used on an event loop thread."""
+    return submit_completion(model, messages, timeout=timeout, **kwargs).result()
+
+
+def response_text(response: Any) -> str:
+    return (response.choices[0].message.content or "").strip()
+
+
+def is_unsupported_params_error(exc: BaseException) -> bool:
+    """True when the provider rejected the request's parameters (e.g. response_format), not its content."""
+    if isinstance(exc, litellm.UnsupportedParamsError):
+        return True
+    return isinstance(exc, litellm.BadRequestError) and not isinstance(
+        exc, (litellm.ContextWindowExceededError, litellm.ContentPolicyViolationError)
+    )
@@ -0,0 +1,118 @@
+// Warm Mermaid renderer used by backend/beta/utils/mermaid_renderer.py.
+//
+// Launches one headless browser and keeps it alive, reading newline-delimited
+// JSON jobs on stdin and answering each with one JSON line on stdout:
+//   {"id": 1, "op": "render", "code": "...", "output": "/abs/out.png", "options": {...}}
+//   {"id": 2, "op": "ping"}
+//   {"id": 3, "op": "shutdown"}
+// Every reply echoes the id: {"id": 1, "ok": true} or {"id": 1, "ok": false, "error": "..."}.
+
+import { existsSync } from "node:fs";
+import { readFile, writeFile } from "node:fs/promises";
+import { createRequire } from "node:module";
+import path from "node:path";
+import { createInterface } from "node:readline";
+import { pathToFileURL } from "node:url";
+
+function findMermaidCli() {
+  const roots = (process.env.NODE_PATH || "").split(path.delimiter).filter(Boolean);
+  roots.push(path.join(process.cwd(), "node_modules"));
+  for (const root of roots) {
+    const entry = path.join(root, "@mermaid-js", "mermaid-cli", "src", "index.js");
+    if (existsSync(entry)) {
+      return entry;
+    }
+  }
+  throw new Error("@mermaid-js/mermaid-cli not found (checked NODE_PATH and ./node_modules)");
+}
+
+const cliEntry = findMermaidCli();
+const { renderMermaid } = await import(pathToFileURL(cliEntry).href);
+const puppeteerModule = await import(pathToFileURL(createRequire(cliEntry).resolve("puppeteer")).href);
+const puppeteer = puppeteerModule.default ?? puppeteerModule;
+
+const launchArgs = [];
+if (typeof process.getuid === "function" && process.getuid() === 0) {
+  launchArgs.push("--no-sandbox", "--disable-setuid-sandbox");
+}
+const browser = await puppeteer.launch({
+  headless: "new",
+  args: launchArgs,
+  executablePath: process.env.PUPPETEER_EXECUTABLE_PATH || undefined,
+});
+
+const fileCache = new Map();
+async function readCached(filePath) {
+  if (!filePath) {
+    return undefined;
+  }
+  if (!fileCache.has(filePath)) {
+    fileCache.set(filePath, await readFile(filePath, "utf-8"));
+  }
+  return fileCache.get(filePath);
+}
+
+function browserConnected() {
+  return typeof browser.connected === "boolean" ? browser.connected : browser.isConnected();
+}
+
+async function render(job) {
+  const options = job.options || {};
+  // A render profile may send its own (already merged) config instead of the file.
+  const configText = options.mermaidConfig ? null : await readCached(options.config);
+  const fileConfig = options.mermaidConfig || (configText ? JSON.parse(configText) : {});
+  const mermaidConfig = { theme: options.theme || "default", ...fileConfig };
+  const { data } = await renderMermaid(browser, job.code, options.format || "png", {
+    viewport: {
+      width: options.width || 800,
+      height: options.height || 600,
+      deviceScaleFactor: options.scale || 1,
+    },
+    backgroundColor: options.background || "white",
+    mermaidConfig,
+    myCSS: await readCached(options.css),
+  });
+  await writeFile(job.output, data);
+}
+
+function reply(message) {
+  process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+// Jobs are handled strictly one at a time; the Python side never pipelines.
+let chain = Promise.resolve();
+const lines = createInterface({ input: process.stdin });
+lines.on("line", (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  chain = chain.then(async () => {
+    let job;
+    try {
+      job = JSON.parse(line);
+    } catch (err) {
+      reply({ id: null, ok: false, error: `invalid job: ${err.message}` });
+      return;
+    }
+    try {
+      if (job.op === "ping") {
+        reply({ id: job.id, ok: browserConnected() });
+      } else if (job.op === "shutdown") {
+        reply({ id: job.id, ok: true });
+        await browser.close();
+        process.exit(0);
+      } else {
+        await render(job);
+        reply({ id: job.id, ok: true });
+      }
+    } catch (err) {
+      reply({ id: job.id, ok: false, error: String(err && err.message ? err.message : err) });
+    }
+  });
+});
+lines.on("close", async () => {
+  await browser.close().catch(() => {});
+  process.exit(0);
+});
+
+reply({ id: 0, ok: true, ready: true });
@@ -0,0 +1,439 @@
+"""
+Long-lived Mermaid render pool.
+
+Instead of spawning a fresh `mmdc` (and with it a fresh headless Chromium) per
+diagram, a fixed set of pool threads each own one warm Node renderer
+(mermaid_render_worker.mjs) and pull jobs from a shared queue. Renderers are
+health-checked after sitting idle and recycled after a fixed number of renders.
+When Node or mermaid-cli is unavailable the pool threads run the one-shot
+fallback instead, so callers always go through the same queue.
+
+The pool is the process-wide render concurrency limit: its size defaults to
+what the host's cores and memory can hold (pool_settings_from_env), and every
+request's diagrams wait in one FairRenderQueue, by priority class and then
+round-robin between requesters.
+"""
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Optional
+
+_WORKER_SCRIPT = Path(__file__).with_name("mermaid_render_worker.mjs")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)).strip())
+    except ValueError:
+        return default
+
+
+class RenderWorkerError(RuntimeError):
+    """The warm renderer process itself is broken (crashed, hung, not started)."""
+
+
+class MermaidRenderError(RuntimeError):
+    """The warm renderer is healthy but could not render this diagram source."""
+
+
+_NODE_PATH = None
+
+
+def _node_env() -> dict:
+    """Environment for the Node worker, with NODE_PATH pointing at global npm modules."""
+    global _NODE_PATH
+    if _NODE_PATH is None:
+        _NODE_PATH = ""
+        npm = shutil.which("npm") or shutil.which("npm.cmd")
+        if npm:
+            try:
+                result = subprocess.run([npm, "root", "-g"], capture_output=True, text=True, timeout=20)
+                _NODE_PATH = result.stdout.strip()
+            except Exception as e:
+                print(f"⚠️ Could not resolve global npm root: {e}")
+    env = dict(os.environ)
+    if _NODE_PATH:
+        existing = env.get("NODE_PATH")
+        env["NODE_PATH"] = os.pathsep.join(p for p in (_NODE_PATH, existing) if p)
+    return env
+
+
+class WarmMermaidRenderer:
+    """One Node process holding a warm browser; handles one request at a time."""
+
+    def __init__(self, node_path: str, startup_timeout: float = 60):
+        self.renders = 0
+        self.last_used = time.monotonic()
+        self._seq = 0
+        self._responses = queue.Queue()
+        self.proc = subprocess.Popen(
+            [node_path, str(_WORKER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            env=_node_env(),
+        )
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        try:
+            ready = self._await_reply(0, startup_timeout)
+        except RenderWorkerError:
+            self.close()
+            raise
+        if not ready.get("ok"):
+            self.close()
+            raise RenderWorkerError(f"renderer failed to start: {ready.get('error')}")
+
+    def _read_stdout(self):
+        for line in self.proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self._responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"⚠️ Mermaid renderer output ignored: {line[:200]}")
+        # EOF: the process exited.
+        self._responses.put(None)
+
+    def _await_reply(self, request_id: int, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RenderWorkerError(f"renderer did not answer within {timeout:.0f}s")
+            try:
+                message = self._responses.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if message is None:
+                raise RenderWorkerError("renderer process exited")
+            if message.get("id") == request_id:
+                return message
+
+    def _request(self, payload: dict, timeout: float) -> dict:
+        if not self.alive():
+            raise RenderWorkerError("renderer process is not running")
+        self._seq += 1
+        payload = dict(payload, id=self._seq)
+        try:
+            self.proc.stdin.write(json.dumps(payload) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RenderWorkerError(f"renderer stdin closed: {e}")
+        reply = self._await_reply(self._seq, timeout)
+        self.last_used = time.monotonic()
+        return reply
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def ping(self, timeout: float = 10) -> bool:
+        try:
+            return bool(self._request({"op": "ping"}, timeout).get("ok"))
+        except RenderWorkerError:
+            return False
+
+    def render(self, mermaid_code: str, output_path: Path, options: dict, timeout: float = 60):
+        reply = self._request(
+            {"op": "render", "code": mermaid_code, "output": str(Path(output_path).resolve()), "options": options},
+            timeout,
+        )
+        self.renders += 1
+        if not reply.get("ok"):
+            raise MermaidRenderError(reply.get("error") or "unknown render error")
+
+    def close(self):
+        if self.alive():
+            try:
+                self.proc.stdin.write(json.dumps({"op": "shutdown", "id": -1}) + "\n")
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=5)
+            except Exception:
+                self.proc.kill()
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+# Highest first. Interactive: quick/instant builds and Studio previews;
+# background: the enhanced build that runs after the quick file is returned.
+RENDER_PRIORITIES = ("interactive", "normal", "background")
+
+
+class FairRenderQueue:
+    """
+    Render job queue shared by all requests.
+
+    Jobs are taken by priority class, and within a class round-robin between
+    requesters (one project's 13 diagrams do not queue ahead of another
+    project's first one). A waiting job is promoted one class per aging_sec so
+    background builds still progress under constant interactive load.
+    """
+
+    def __init__(self, aging_sec: float = 30.0, wait_samples: int = 512):
+        self.aging_sec = aging_sec
+        self._cond = threading.Condition()
+        self._classes = [OrderedDict() for _ in RENDER_PRIORITIES]  # requester -> deque of (queued_at, item)
+        self._depth = [0] * len(RENDER_PRIORITIES)
+        self._closed = False
+        self.enqueued = [0] * len(RENDER_PRIORITIES)
+        self.promoted = 0
+        self._waits = [deque(maxlen=wait_samples) for _ in RENDER_PRIORITIES]  # seconds, recent dispatches
+
+    @staticmethod
+    def level(priority: str) -> int:
+        try:
+            return RENDER_PRIORITIES.index(priority)
+        except ValueError:
+            return RENDER_PRIORITIES.index("normal")
+
+    def put(self, item, priority: str = "normal", requester: str = ""):
+        level = self.level(priority)
+        with self._cond:
+            self._classes[level].setdefault(requester, deque()).append((time.monotonic(), item))
+            self._depth[level] += 1
+            self.enqueued[level] += 1
+            self._cond.notify()
+
+    def get(self):
+        """Next item, blocking; None once closed and drained."""
+        with self._cond:
+            while not any(self._depth):
+                if self._closed:
+                    return None
+                self._cond.wait()
+            now = time.monotonic()
+            best = None
+            for level, requesters in enumerate(self._classes):
+                if not requesters:
+                    continue
+                queued_at = next(iter(requesters.values()))[0][0]
+                rank = level - (int((now - queued_at) / self.aging_sec) if self.aging_sec > 0 else 0)
+                if best is None or rank < best[0]:
+                    best = (rank, level)
+            level = best[1]
+            if best[0] < level:
+                self.promoted += 1
+            requesters = self._classes[level]
+            requester, jobs = next(iter(requesters.items()))
+            queued_at, item = jobs.popleft()
+            del requesters[requester]
+            if jobs:
+                requesters[requester] = jobs  # back of the round-robin
+            self._depth[level] -= 1
+            self._waits[level].append(now - queued_at)
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            by_priority = {}
+            for level, name in enumerate(RENDER_PRIORITIES):
+                waits = sorted(self._waits[level])
+                oldest = min((jobs[0][0] for jobs in self._classes[level].values()), default=None)
+                by_priority[name] = {
+                    "depth": self._depth[level],
+                    "requesters": len(self._classes[level]),
+                    "enqueued": self.enqueued[level],
+                    "oldest_wait_ms": round((now - oldest) * 1000) if oldest is not None else 0,
+                    "wait_p50_ms": round(waits[len(waits) // 2] * 1000) if waits else 0,
+                    "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000) if waits else 0,
+                }
+            return {"depth": sum(self._depth), "promoted": self.promoted, "by_priority": by_priority}
+
+
+RenderJob = Callable[[str, Path, Optional[WarmMermaidRenderer], Optional[dict]], Optional[str]]
+
+
+class MermaidRenderPool:
+    """
+    Fixed set of render threads fed from one job queue.
+
+    `job` is called on a pool thread as job(mermaid_code, output_png, renderer,
+    options), where renderer is the thread's warm renderer or None when warm
+    rendering is unavailable and options are the render options given to submit(). A RenderWorkerError raised by the job retires that renderer and
+    the job is retried once with renderer=None. The job may return the name of
+    the engine that produced the file; it is handed to on_success.
+    """
+
+    def __init__(
+        self,
+        job: RenderJob,
+        size: int = 4,
+        recycle_after: int = 200,
+        health_check_after: float = 60,
+        warm: bool = True,
+        aging_sec: float = 30,
+    ):
+        self._job = job
+        self.size = max(1, size)
+        self.recycle_after = max(1, recycle_after)
+        self.health_check_after = health_check_after
+        self._node_path = (shutil.which("node") or shutil.which("node.exe")) if warm else None
+        self._warm_retry_at = 0.0
+        self._warm_lock = threading.Lock()
+        self._jobs = FairRenderQueue(aging_sec=aging_sec)
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+        for idx in range(self.size):
+            thread = threading.Thread(target=self._worker_loop, name=f"mermaid-render-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if warm and not self._node_path:
+            print("⚠️ node not found; Mermaid render pool will use one-shot rendering")
+
+    def submit(
+        self,
+        mermaid_code: str,
+        output_png: Path,
+        on_success: Optional[Callable[[Path, Optional[str]], None]] = None,
+        options: Optional[dict] = None,
+        warm: bool = True,
+        priority: str = "normal",
+        requester: str = "",
+    ) -> Future:
+        """
+        Queue a render. on_success(output_png, engine) runs on the pool thread
+        before the future resolves; engine is what the job returned. warm=False jobs get renderer=None, so renders that do not
+        need Node never start a warm renderer. priority is one of
+        RENDER_PRIORITIES; requester (e.g. the project key) is the unit of
+        fair sharing within a priority.
+        """
+        if self._closed:
+            raise RuntimeError("Mermaid render pool is shut down")
+        future = Future()
+        self._jobs.put((future, mermaid_code, Path(output_png), on_success, options, warm), priority, requester)
+        return future
+
+    def render(self, mermaid_code: str, output_png: Path, options: Optional[dict] = None):
+        return self.submit(mermaid_code, output_png, options=options).result()
+
+    def shutdown(self):
+        self._closed = True
+        self._jobs.close()
+
+    def stats(self) -> dict:
+        return {"workers": self.size, "running": self._running, **self._jobs.stats()}
+
+    def _warm_available(self) -> bool:
+        return bool(self._node_path) and time.monotonic() >= self._warm_retry_at
+
+    def _start_renderer(self) -> Optional[WarmMermaidRenderer]:
+        try:
+            return WarmMermaidRenderer(self._node_path)
+        except Exception as e:
+            # Back off so a missing mermaid-cli/puppeteer does not cost a failed start per job.
+            with self._warm_lock:
+                self._warm_retry_at = time.monotonic() + 300
+            print(f"⚠️ Warm Mermaid renderer unavailable ({e}); using one-shot rendering for 5 min")
+            return None
+
+    def _checked_renderer(self, renderer: Optional[WarmMermaidRenderer]) -> Optional[WarmMermaidRenderer]:
+        """Return a usable renderer for this thread, recycling or replacing it as needed."""
+        if renderer is not None:
+            retire = None
+            if not renderer.alive():
+                retire = "process exited"
+            elif renderer.renders >= self.recycle_after:
+                retire = f"recycled after {renderer.renders} renders"
+            elif time.monotonic() - renderer.last_used > self.health_check_after and not renderer.ping():
+                retire = "failed health check"
+            if retire is None:
+                return renderer
+            print(f"♻️ Replacing warm Mermaid renderer: {retire}")
+            renderer.close()
+        if not self._warm_available():
+            return None
+        return self._start_renderer()
+
+    def _worker_loop(self):
+        renderer = None
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            future, mermaid_code, output_png, on_success, options, warm = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._running_lock:
+                self._running += 1
+            try:
+                if warm:
+                    renderer = self._checked_renderer(renderer)
+                try:
+                    engine = self._job(mermaid_code, output_png, renderer if warm else None, options)
+                except RenderWorkerError as e:
+                    print(f"⚠️ Warm Mermaid renderer failed ({e}); retrying one-shot")
+                    if renderer is not None:
+                        renderer.close()
+                        renderer = None
+                    engine = self._job(mermaid_code, output_png, None, options)
+                if on_success is not None:
+                    try:
+                        on_success(output_png, engine)
+                    except Exception as e:
+                        print(f"⚠️ Post-render hook failed for {output_png}: {e}")
+                future.set_result(output_png)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._running_lock:
+                    self._running -= 1
+        if renderer is not None:
+            renderer.close()
+
+
+def _memory_limit_mb() -> Optional[float]:
+    """Memory this process may use: the cgroup limit when set, else physical RAM."""
+    try:
+        limit = Path("/sys/fs/cgroup/memory.max").read_text().strip()
+        if limit != "max":
+            return int(limit) / (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_render_workers() -> int:
+    """
+    One renderer per core, but no more than fit in MERMAID_RENDER_MEMORY_FRACTION
+    of memory at MERMAID_RENDER_WORKER_MB each (a warm headless Chromium).
+    """
+    workers = os.cpu_count() or 2
+    memory_mb = _memory_limit_mb()
+    if memory_mb:
+        per_worker_mb = max(1, _env_int("MERMAID_RENDER_WORKER_MB", 350))
+        fraction = float(os.getenv("MERMAID_RENDER_MEMORY_FRACTION", "0.5"))
+        workers = min(workers, int(memory_mb * fraction // per_worker_mb))
+    return max(1, workers)
+
+
+def pool_settings_from_env() -> dict:
+    return {
+        "size": _env_int("MERMAID_RENDER_WORKERS", default_render_workers()),
+        "recycle_after": _env_int("MERMAID_RENDER_RECYCLE_AFTER", 200),
+        "health_check_after": _env_int("MERMAID_RENDER_HEALTHCHECK_SEC", 60),
+        "warm": os.getenv("MERMAID_WARM_RENDERER", "1").strip().lower() not in ("0", "false", "no"),
+        "aging_sec": float(os.getenv("MERMAID_RENDER_AGING_SEC", "30")),
+    }
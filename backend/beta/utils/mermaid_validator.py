@@ -0,0 +1,464 @@
+"""
+Fast Mermaid checks for LLM-written diagrams, before anything is rendered.
+
+A broken interface diagram used to cost a failed mmdc/warm render and then a
+second failed request to the fallback render service. check_mermaid() reads
+the diagram types we ask the model for (flowchart/graph, erDiagram,
+sequenceDiagram, stateDiagram) line by line, in-process, and returns one of:
+
+- valid: the source is used as is.
+- repaired: common model mistakes are fixed mechanically. These include
+  unquoted parentheses in labels, a lowercase `end` used as a node id,
+  unbalanced subgraph/block ends, ER relationships without a label, and an
+  occasional stray prose line.
+- invalid: nothing renderable is left. The caller substitutes its default
+  diagram and no render is attempted.
+- unchecked: other diagram types, sources without any diagram header we
+  recognise, and flowcharts using link syntax the grammar does not cover.
+  They are passed through untouched.
+
+The grammar is deliberately a little narrower than Mermaid's. A source it
+does not understand gets normalized, which is harmless. It is only rejected
+when too much of it is unreadable to trust.
+"""
+import re
+import threading
+from collections import Counter
+
+# Model output with more unparseable statements than this is rejected, not patched.
+MAX_DROPPED_FRACTION = 1 / 3
+
+_DIRECTION = r"(?:TB|TD|BT|LR|RL)"
+_FLOW_HEADER_RE = re.compile(rf"^(flowchart(?:-elk)?|graph)(?![\w-])(?:\s+{_DIRECTION})?\s*;?\s*(.*)$")
+_STATE_HEADER_RE = re.compile(r"^stateDiagram(?:-v2)?\s*$")
+# Headers of the diagram types we pass through unchecked.
+_OTHER_HEADER_RE = re.compile(
+    r"^(?:classDiagram(?:-v2)?|journey|gantt|pie|mindmap|timeline|gitGraph|C4\w+|quadrantChart|"
+    r"requirementDiagram|xychart(?:-beta)?|sankey(?:-beta)?|block(?:-beta)?|packet(?:-beta)?|"
+    r"architecture(?:-beta)?|kanban|radar(?:-beta)?|treemap(?:-beta)?|zenuml)(?![\w-])"
+)
+
+# Flowchart
+_FLOW_ID_RE = re.compile(r"(?:[\w!#$'*+.`?\\/]|-(?![->.])|=(?!=))+")
+_FLOW_SHAPES = (
+    ("(((", ")))"), ("((", "))"), ("([", "])"), ("[[", "]]"), ("[(", ")]"), ("{{", "}}"),
+    ("[/", "/]"), ("[\\", "\\]"), ("[/", "\\]"), ("[\\", "/]"),
+    (">", "]"), ("[", "]"), ("(", ")"), ("{", "}"),
+)
+_FLOW_EDGE_ID = r"(?:[\w-]+@)?"  # `A e1@--> B`
+_FLOW_LINK_RE = re.compile(rf"\s*({_FLOW_EDGE_ID}(?:~{{3,}}|[<xo]?(?:-{{2,}}|={{2,}}|-\.+-)[>xo]?))(?![-=.~])\s*")
+_FLOW_TEXT_LINK_RE = re.compile(
+    rf"\s*({_FLOW_EDGE_ID}(?:--|==|-\.))\s+([^\s\-=.|>][^|>]*?)\s+(-{{2,}}>?|={{2,}}>?|\.-+>?)\s*"
+)
+# Looks like a link, but not one the grammar above knows.
+_FLOW_LINK_LIKE_RE = re.compile(rf"\s*{_FLOW_EDGE_ID}[<xo*]?[-=.~]{{2,}}")
+_FLOW_SPECIAL = set('[](){}"')
+_FLOW_KEYWORDS_RE = re.compile(
+    r"^(?:style|classDef|class|click|linkStyle|accTitle|accDescr)\b|^direction\s+" + _DIRECTION + r"$"
+)
+
+# erDiagram
+_ER_CARD = r"(?:\|o|\|\||\}o|\}\||o\||o\{|\|\{)"
+_ER_NAME = r'(?:[A-Za-z_][\w-]*|"[^"]+")'
+_ER_RELATION_RE = re.compile(
+    rf"^({_ER_NAME})\s*({_ER_CARD}(?:--|\.\.){_ER_CARD})\s*({_ER_NAME})\s*(?::\s*(.*))?$"
+)
+_ER_ENTITY_RE = re.compile(rf'^{_ER_NAME}(?:\s*\[\s*"[^"]*"\s*\])?\s*\{{\s*(\}})?$')
+_ER_ATTRIBUTE_RE = re.compile(r'^[A-Za-z_*][^\s"]*\s+[A-Za-z_*][^\s"]*(?:\s+(?:PK|FK|UK)(?:\s*,\s*(?:PK|FK|UK))*)?(?:\s+"[^"]*")?$')
+
+# sequenceDiagram
+_SEQ_ACTOR = r"[^+<>:\n,;\-]+(?:-(?![->x)])[^+<>:\n,;\-]+)*"
+_SEQ_ARROW = r"(?:<<-->>|<<->>|-->>|->>|-->|->|--x|-x|--\)|-\))"
+_SEQ_MESSAGE_RE = re.compile(rf"^({_SEQ_ACTOR})\s*({_SEQ_ARROW})\s*[+-]?\s*({_SEQ_ACTOR})\s*(:.*)?$")
+_SEQ_PARTICIPANT_RE = re.compile(r"^(?:create\s+)?(?:participant|actor)\s+\S.*$")
+_SEQ_NOTE_RE = re.compile(rf"^[Nn]ote\s+(?:left of|right of|over)\s+{_SEQ_ACTOR}(?:\s*,\s*{_SEQ_ACTOR})?\s*:.*$")
+_SEQ_OPEN_RE = re.compile(r"^(?:loop|alt|opt|par|par_over|critical|break|rect|box)\b")
+_SEQ_MIDDLE_RE = re.compile(r"^(?:else|and|option)\b")
+_SEQ_OTHER_RE = re.compile(r"^(?:activate|deactivate|destroy|autonumber|title|links?|accTitle|accDescr)\b")
+
+# stateDiagram
+_STATE_ID = r"(?:\[\*\]|[^\s:{}<>,;\[\]\-]+(?:-(?!-)[^\s:{}<>,;\[\]\-]+)*)"
+_STATE_TRANSITION_RE = re.compile(rf"^({_STATE_ID})\s*-->\s*({_STATE_ID})\s*(?::.*)?$")
+_STATE_LINE_RES = (
+    re.compile(rf"^state\s+(?:\"[^\"]*\"\s+as\s+)?{_STATE_ID}(?:\s*<<(?:choice|fork|join)>>)?\s*$"),
+    re.compile(rf"^{_STATE_ID}\s*:.*$"),
+    re.compile(rf"^[Nn]ote\s+(?:left|right)\s+of\s+{_STATE_ID}\s*:.*$"),
+    re.compile(r"^direction\s+" + _DIRECTION + r"$"),
+    re.compile(r"^(?:classDef|class|hide empty description|scale|accTitle|accDescr)\b"),
+    re.compile(rf"^{_STATE_ID}:::\w+$"),
+    re.compile(r"^--$"),
+    re.compile(rf"^{_STATE_ID}$"),
+)
+_STATE_BLOCK_RE = re.compile(rf"^state\s+(?:\"[^\"]*\"\s+as\s+)?{_STATE_ID}\s*\{{$")
+_STATE_NOTE_BLOCK_RE = re.compile(rf"^[Nn]ote\s+(?:left|right)\s+of\s+{_STATE_ID}$")
+
+_STATS = Counter()
+_STATS_LOCK = threading.Lock()
+
+
+class _Unparsed(ValueError):
+    pass
+
+
+class _Unsupported(ValueError):
+    """Syntax that is probably valid Mermaid the grammar does not cover; the source is left unchecked."""
+
+
+def _quote(text: str) -> str:
+    return '"' + text.strip().strip('"').replace('"', "#quot;") + '"'
+
+
+# ---------------------------------------------------------------- flowchart
+
+def _split_statements(line: str) -> list:
+    """Split on ';' outside quotes and brackets."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "[({":
+            depth += 1
+        elif not quoted and ch in "])}":
+            depth = max(0, depth - 1)
+        elif ch == ";" and not quoted and depth == 0:
+            parts.append(line[start:i])
+            start = i + 1
+    parts.append(line[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _flow_statement_follows(line: str, pos: int) -> bool:
+    rest = line[pos:].lstrip()
+    return (
+        not rest
+        or rest.startswith("&")
+        or rest.startswith(":::")
+        or _FLOW_LINK_RE.match(line, pos) is not None
+        or _FLOW_TEXT_LINK_RE.match(line, pos) is not None
+    )
+
+
+def _flow_vertex(line: str, pos: int, errors: list):
+    """(end position, normalized text) of one vertex starting at pos."""
+    match = _FLOW_ID_RE.match(line, pos)
+    if not match:
+        raise _Unparsed(f"expected a node id at: {line[pos:pos + 30]!r}")
+    node_id, pos = match.group(0), match.end()
+    if node_id == "end":
+        errors.append("lowercase 'end' used as a node id")
+        node_id = "End"
+    out = node_id
+    # Shape; a space before it (`A [x]`) is tolerated and dropped.
+    probe = pos + len(line[pos:]) - len(line[pos:].lstrip(" "))
+    if line.startswith("@{", probe):
+        end = line.find("}", probe)
+        if end < 0:
+            raise _Unparsed("unterminated @{ } node shape")
+        return end + 1, out + line[probe:end + 1]
+    for opener, closer in _FLOW_SHAPES:
+        if not line.startswith(opener, probe):
+            continue
+        if probe != pos:
+            errors.append("space between node id and shape")
+        start = probe + len(opener)
+        if line.startswith('"', start):
+            end = line.find('"', start + 1)
+            if end >= 0 and line.startswith(closer, end + 1) and _flow_statement_follows(line, end + 1 + len(closer)):
+                return end + 1 + len(closer), out + line[probe:end + 1 + len(closer)]
+        # Unquoted label: the closer that is followed by something a statement can continue with.
+        end = line.find(closer, start)
+        while end >= 0 and not _flow_statement_follows(line, end + len(closer)):
+            end = line.find(closer, end + 1)
+        if end < 0:
+            raise _Unparsed(f"unterminated node label: {line[probe:probe + 30]!r}")
+        label = line[start:end]
+        if not label.strip():
+            errors.append("empty node label")
+            label = node_id
+        elif _FLOW_SPECIAL & set(label):
+            errors.append(f"unquoted special characters in label {label[:30]!r}")
+            label = _quote(label)
+        return end + len(closer), f"{out}{opener}{label}{closer}"
+    return pos, out
+
+
+def _flow_vertex_group(line: str, pos: int, errors: list):
+    parts = []
+    while True:
+        pos, text = _flow_vertex(line, pos, errors)
+        match = re.compile(r":::[\w-]+").match(line, pos)
+        if match:
+            text += match.group(0)
+            pos = match.end()
+        parts.append(text)
+        match = re.compile(r"\s*&\s*").match(line, pos)
+        if not match:
+            return pos, " & ".join(parts)
+        pos = match.end()
+
+
+def _flow_link(line: str, pos: int, errors: list):
+    match = _FLOW_TEXT_LINK_RE.match(line, pos)
+    if match:
+        text = match.group(2)
+        if _FLOW_SPECIAL & set(text) and not (text.startswith('"') and text.endswith('"')):
+            errors.append(f"unquoted special characters in link text {text[:30]!r}")
+            text = _quote(text)
+        return match.end(), f" {match.group(1)} {text} {match.group(3)} "
+    match = _FLOW_LINK_RE.match(line, pos)
+    if not match:
+        if _FLOW_LINK_LIKE_RE.match(line, pos):
+            raise _Unsupported(f"unrecognised link syntax at: {line[pos:pos + 30]!r}")
+        raise _Unparsed(f"expected a link at: {line[pos:pos + 30]!r}")
+    link, pos = match.group(1), match.end()
+    label = re.compile(r"\|([^|]*)\|\s*").match(line, pos)
+    if not label:
+        return pos, f" {link} "
+    text = label.group(1).strip()
+    quoted = len(text) >= 2 and text[0] == text[-1] == '"' and '"' not in text[1:-1]
+    if not text:
+        errors.append("empty link label")
+        return label.end(), f" {link} "
+    if not quoted and _FLOW_SPECIAL & set(text):
+        errors.append(f"unquoted special characters in link label {text[:30]!r}")
+        text = _quote(text)
+    return label.end(), f" {link}|{text}| "
+
+
+def _flow_statement(line: str, errors: list) -> str:
+    pos, out = _flow_vertex_group(line, 0, errors)
+    while pos < len(line):
+        pos, link = _flow_link(line, pos, errors)
+        if pos >= len(line):
+            raise _Unparsed("link without a target node")
+        pos, target = _flow_vertex_group(line, pos, errors)
+        out += link + target
+    return out
+
+
+def _check_flowchart(header: str, body: list):
+    errors, out, bad, statements = [], [header], 0, 0
+    depth = 0
+    for raw in body:
+        for line in _split_statements(raw):
+            statements += 1
+            if line == "end":
+                if depth == 0:
+                    errors.append("'end' without a subgraph")
+                    continue
+                depth -= 1
+                out.append(line)
+                continue
+            if line.startswith("subgraph ") or line == "subgraph":
+                depth += 1
+                title = line[len("subgraph"):].strip()
+                match = re.fullmatch(r"([\w-]+)\s*\[(.*)\]", title)
+                if match and _FLOW_SPECIAL & set(match.group(2)) and not match.group(2).startswith('"'):
+                    errors.append("unquoted special characters in subgraph title")
+                    line = f"subgraph {match.group(1)}[{_quote(match.group(2))}]"
+                out.append(line)
+                continue
+            if _FLOW_KEYWORDS_RE.match(line):
+                out.append(line)
+                continue
+            try:
+                out.append(_flow_statement(line, errors))
+            except _Unparsed as e:
+                errors.append(str(e))
+                bad += 1
+    if depth:
+        errors.append(f"{depth} subgraph(s) without 'end'")
+        out.extend(["end"] * depth)
+    return out, errors, bad, statements
+
+
+# ---------------------------------------------------------------- erDiagram
+
+def _check_er(header: str, body: list):
+    errors, out, bad, statements = [], [header], 0, 0
+    in_entity = False
+    for line in body:
+        statements += 1
+        if in_entity:
+            if line == "}":
+                in_entity = False
+                out.append(line)
+            elif _ER_ATTRIBUTE_RE.match(line):
+                out.append(line)
+            else:
+                errors.append(f"unreadable attribute: {line[:40]!r}")
+                bad += 1
+            continue
+        match = _ER_ENTITY_RE.match(line)
+        if match:
+            in_entity = not match.group(1)
+            out.append(line)
+            continue
+        if re.match(r"^direction\s+" + _DIRECTION + "$", line):
+            out.append(line)
+            continue
+        match = _ER_RELATION_RE.match(line)
+        if not match:
+            errors.append(f"unreadable statement: {line[:40]!r}")
+            bad += 1
+            continue
+        left, card, right, label = match.groups()
+        if label is None or not label.strip():
+            errors.append("relationship without a label")
+            label = '"relates to"'
+        elif not re.fullmatch(r'[\w-]+|"[^"]*"', label.strip()):
+            errors.append(f"unquoted relationship label {label[:30]!r}")
+            label = _quote(label)
+        out.append(f"{left} {card} {right} : {label.strip()}")
+    if in_entity:
+        errors.append("entity block without '}'")
+        out.append("}")
+    return out, errors, bad, statements
+
+
+# ---------------------------------------------------------------- sequenceDiagram
+
+def _check_sequence(header: str, body: list):
+    errors, out, bad, statements = [], [header], 0, 0
+    depth = 0
+    for line in body:
+        statements += 1
+        if line == "end":
+            if depth == 0:
+                errors.append("'end' without a block")
+                continue
+            depth -= 1
+        elif _SEQ_OPEN_RE.match(line):
+            depth += 1
+        elif _SEQ_MIDDLE_RE.match(line):
+            if depth == 0:
+                errors.append(f"{line.split()[0]!r} outside a block")
+                bad += 1
+                continue
+        elif not (_SEQ_PARTICIPANT_RE.match(line) or _SEQ_NOTE_RE.match(line) or _SEQ_OTHER_RE.match(line)):
+            match = _SEQ_MESSAGE_RE.match(line)
+            if not match or not (match.group(4) or "").strip(":").strip():
+                errors.append(f"unreadable message: {line[:40]!r}")
+                bad += 1
+                continue
+        out.append(line)
+    if depth:
+        errors.append(f"{depth} block(s) without 'end'")
+        out.extend(["end"] * depth)
+    return out, errors, bad, statements
+
+
+# ---------------------------------------------------------------- stateDiagram
+
+def _check_state(header: str, body: list):
+    errors, out, bad, statements = [], [header], 0, 0
+    depth, in_note = 0, False
+    for line in body:
+        statements += 1
+        if in_note:
+            out.append(line)
+            in_note = line.lower() != "end note"
+            continue
+        if line == "}":
+            if depth == 0:
+                errors.append("'}' without a composite state")
+                continue
+            depth -= 1
+        elif _STATE_BLOCK_RE.match(line):
+            depth += 1
+        elif _STATE_NOTE_BLOCK_RE.match(line):
+            in_note = True
+        elif not (_STATE_TRANSITION_RE.match(line) or any(regex.match(line) for regex in _STATE_LINE_RES)):
+            errors.append(f"unreadable statement: {line[:40]!r}")
+            bad += 1
+            continue
+        out.append(line)
+    if in_note:
+        errors.append("note without 'end note'")
+        out.append("end note")
+    if depth:
+        errors.append(f"{depth} composite state(s) without '}}'")
+        out.extend(["}"] * depth)
+    return out, errors, bad, statements
+
+
+# ---------------------------------------------------------------- entry points
+
+def _lines(mermaid_code: str) -> list:
+    lines, frontmatter = [], False
+    for index, raw in enumerate(mermaid_code.replace("\r\n", "\n").split("\n")):
+        line = raw.strip()
+        if line == "---" and (index == 0 or frontmatter):
+            frontmatter = not frontmatter
+            continue
+        if frontmatter or not line or line.startswith("%%"):
+            continue
+        lines.append(line)
+    return lines
+
+
+def _analyze(mermaid_code: str):
+    """(kind, repaired source or None, errors); kind None means not a checked type."""
+    lines = _lines(mermaid_code or "")
+    # Prose before the header ("Here is the diagram:") is dropped.
+    for index, line in enumerate(lines):
+        flow = _FLOW_HEADER_RE.match(line)
+        if flow:
+            header = line[:len(line) - len(flow.group(2))].rstrip().rstrip(";").rstrip()
+            body = ([flow.group(2)] if flow.group(2) else []) + lines[index + 1:]
+            kind, check = "flowchart", lambda: _check_flowchart(header, body)
+        elif line == "erDiagram":
+            kind, check = "er", lambda: _check_er(line, lines[index + 1:])
+        elif line == "sequenceDiagram":
+            kind, check = "sequence", lambda: _check_sequence(line, lines[index + 1:])
+        elif _STATE_HEADER_RE.match(line):
+            kind, check = "state", lambda: _check_state(line, lines[index + 1:])
+        elif _OTHER_HEADER_RE.match(line):
+            return None, None, [f"{line.split()[0]} is not checked"]
+        else:
+            continue
+        try:
+            out, errors, bad, statements = check()
+        except _Unsupported as e:
+            return None, None, [str(e)]
+        if index:
+            errors.insert(0, "text before the diagram header")
+        if statements == 0 or len(out) <= 1:
+            return kind, None, errors + ["diagram has no statements"]
+        if bad > statements * MAX_DROPPED_FRACTION:
+            return kind, None, errors
+        return kind, "\n".join([out[0]] + ["    " + line for line in out[1:]]), errors
+    return None, None, ["no flowchart, erDiagram, sequenceDiagram or stateDiagram header"]
+
+
+def check_mermaid(mermaid_code: str, record: bool = True):
+    """
+    (code, status, errors): status is valid, repaired, invalid (code None) or
+    unchecked (no flowchart, erDiagram, sequenceDiagram or stateDiagram
+    header, or link syntax the grammar does not know; code unchanged). Only
+    a checked diagram is ever rejected. record=False leaves validation_stats()
+    alone, for sources that were already counted or are not model output.
+    """
+    kind, repaired, errors = _analyze(mermaid_code)
+    if kind is None:
+        status, code = "unchecked", mermaid_code
+    elif repaired is None:
+        status, code = "invalid", None
+    elif not errors:
+        status, code = "valid", mermaid_code
+    else:
+        status, code = "repaired", repaired
+    if record:
+        with _STATS_LOCK:
+            _STATS[status] += 1
+    return code, status, errors
+
+
+def is_valid_mermaid(mermaid_code: str) -> bool:
+    _, _, errors = _analyze(mermaid_code)
+    return not errors
+
+
+def validation_stats() -> dict:
+    with _STATS_LOCK:
+        return {status: _STATS[status] for status in ("valid", "repaired", "invalid", "unchecked")}
@@ -0,0 +1,1419 @@
+"""
+In-process renderer for the Mermaid subset our SRS diagrams use.
+
+srs_diagrams.py (and most interface diagrams the model writes) only emit
+flowcharts/graphs with plain node shapes, labelled edges and subgraphs, one
+erDiagram, one sequenceDiagram and one stateDiagram-v2. For those, this module
+parses the source, runs a layered (Sugiyama-style) layout and draws SVG, or
+PNG through Pillow, without Node or a browser.
+
+Parsing is strict: any statement outside the subset makes parse() return None
+and the caller falls back to mmdc. Output only depends on the source, render
+options and theme, so SVGs can be compared byte for byte
+(backend/beta/check_native_diagrams.py). Text is measured with Arial/Helvetica
+advance widths rather than a font file, for the same reason.
+"""
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from backend.beta.utils.graph_layout import is_dummy, layer_graph, pav, place_in_layers
+
+try:
+    from PIL import Image, ImageColor, ImageDraw, ImageFont
+except ImportError:  # Pillow not installed: SVG output only
+    Image = None
+
+# Part of the render cache key; bump whenever the drawing changes.
+ENGINE = "native-1"
+
+DEFAULT_THEME = {
+    "font_family": "Arial, Helvetica, sans-serif",
+    "font_size": 16.0,
+    "label_size": 14.0,
+    "er_font_size": 14.0,
+    "node_fill": "#ECECFF",
+    "node_stroke": "#9370DB",
+    "text": "#333333",
+    "line": "#333333",
+    "cluster_fill": "#FFFFDE",
+    "cluster_stroke": "#AAAA33",
+    "label_fill": "#FFFFFF",
+    "note_fill": "#FFF5AD",
+    "note_stroke": "#AAAA33",
+    "node_spacing": 50.0,
+    "rank_spacing": 50.0,
+}
+
+_LINE_HEIGHT = 1.25
+_WRAP_WIDTH = 200.0
+_MARGIN = 12.0
+_GROUP_PAD = 16.0
+_ARROW = 10.0
+
+# Helvetica/Arial advance widths (1/1000 em) for printable ASCII.
+_ADVANCE = dict(zip(
+    " !\"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~",
+    (278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278)
+    + (556,) * 10
+    + (278, 278, 584, 584, 584, 556, 1015)
+    + (667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833,
+       722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611)
+    + (278, 278, 278, 469, 556, 333)
+    + (556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833,
+       556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500)
+    + (334, 260, 334, 584),
+))
+
+
+class UnsupportedDiagram(ValueError):
+    """The source uses Mermaid syntax outside the natively rendered subset."""
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    width = sum(_ADVANCE.get(ch, 600) for ch in text) * size / 1000
+    return width * 1.07 if bold else width
+
+
+def _text_block(lines, size: float):
+    return max((text_width(line, size) for line in lines), default=0.0), len(lines) * size * _LINE_HEIGHT
+
+
+def _wrap(text: str, size: float, max_width: float = _WRAP_WIDTH) -> list:
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and text_width(candidate, size) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_ENTITY_RE = re.compile(r"#\w+;")
+
+
+def _clean_label(text: str) -> str:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        text = text[1:-1]
+    text = _BR_RE.sub("\n", text)
+    if "<" in text or "`" in text or "fa:" in text or _ENTITY_RE.search(text):
+        raise UnsupportedDiagram(f"label markup not supported: {text[:40]}")
+    return "\n".join(part.strip() for part in text.split("\n"))
+
+
+# ---------------------------------------------------------------- model
+
+class _Element:
+    """A node or a subgraph (the root container is the subgraph with id "")."""
+
+    __slots__ = ("id", "kind", "parent", "label", "shape", "explicit", "items", "direction", "style",
+                 "attrs", "lines", "w", "h", "x", "y", "offset", "origin", "layout")
+
+    def __init__(self, element_id: str, kind: str, parent: Optional[str], label: str = "", shape: str = "rect"):
+        self.id = element_id
+        self.kind = kind
+        self.parent = parent
+        self.label = label
+        self.shape = shape
+        self.explicit = False
+        self.items = []  # child element ids, in order of appearance (groups only)
+        self.direction = None
+        self.style = {}
+        self.attrs = []  # ER attribute rows
+        self.lines = []
+        self.w = self.h = self.x = self.y = 0.0  # size and centre
+        self.offset = self.origin = (0.0, 0.0)
+        self.layout = None
+
+
+class _Edge:
+    __slots__ = ("src", "dst", "label", "line", "head", "tail", "markers", "lift", "points", "label_at", "label_size")
+
+    def __init__(self, src, dst, label="", line="solid", head=True, tail=False, markers=None):
+        self.src = src
+        self.dst = dst
+        self.label = label
+        self.line = line
+        self.head = head
+        self.tail = tail
+        self.markers = markers  # ER cardinality ((many, optional) at src, at dst)
+        self.lift = None
+        self.points = []
+        self.label_at = None
+        self.label_size = (0.0, 0.0)
+
+
+class _Graph:
+    def __init__(self, kind: str, direction: str):
+        self.kind = kind
+        self.root = _Element("", "group", None)
+        self.root.direction = direction
+        self.elements = {"": self.root}
+        self.edges = []
+        self.styles = {}
+
+    def add(self, element_id: str, kind: str, parent: _Element, **kwargs) -> _Element:
+        element = _Element(element_id, kind, parent.id, **kwargs)
+        self.elements[element_id] = element
+        parent.items.append(element_id)
+        return element
+
+    def remove(self, element_id: str):
+        element = self.elements.pop(element_id)
+        self.elements[element.parent].items.remove(element_id)
+
+    def mention(self, element_id: str, group: _Element, label=None, shape=None) -> _Element:
+        element = self.elements.get(element_id)
+        if element is None:
+            element = self.add(element_id, "node", group, label=element_id)
+        elif element.kind == "group":
+            if shape:
+                raise UnsupportedDiagram(f"{element_id} is both a node and a subgraph")
+            return element
+        elif group.id and element.parent == "":
+            # Like Mermaid: a subgraph owns the nodes mentioned inside it.
+            self.root.items.remove(element_id)
+            group.items.append(element_id)
+            element.parent = group.id
+        if shape:
+            element.label, element.shape, element.explicit = label, shape, True
+        return element
+
+    def chain(self, element_id: str) -> list:
+        """element_id followed by its ancestors, ending with the root ("")."""
+        chain = [element_id]
+        while chain[-1] != "":
+            chain.append(self.elements[chain[-1]].parent)
+        return chain
+
+    def lift(self, a: str, b: str):
+        """(container, item holding a, item holding b) for the lowest container holding both."""
+        chain_a, index_b = self.chain(a), {x: i for i, x in enumerate(self.chain(b))}
+        for i in range(1, len(chain_a)):
+            j = index_b.get(chain_a[i])
+            if j:
+                return chain_a[i], chain_a[i - 1], self.chain(b)[j - 1]
+        raise UnsupportedDiagram(f"cannot connect {a} and {b}")
+
+    def direction_of(self, group: _Element) -> str:
+        if group.id == "":
+            return group.direction
+        inherited = self.direction_of(self.elements[group.parent])
+        if group.direction is None:
+            return inherited
+        # Mermaid ignores a subgraph's direction once its nodes link outside it.
+        for edge in self.edges:
+            inside = [group.id in self.chain(end)[1:] for end in (edge.src, edge.dst)]
+            if inside[0] != inside[1]:
+                return inherited
+        return group.direction
+
+
+class _Sequence:
+    kind = "sequence"
+
+    def __init__(self):
+        self.participants = []
+        self.labels = {}
+        self.events = []
+
+    def mention(self, participant: str, label: Optional[str] = None):
+        if participant not in self.labels:
+            self.participants.append(participant)
+            self.labels[participant] = participant
+        if label is not None:
+            self.labels[participant] = label
+
+
+# ---------------------------------------------------------------- parsing
+
+_DIRECTIONS = {"TB": "TB", "TD": "TB", "BT": "BT", "LR": "LR", "RL": "RL"}
+_FLOW_HEADER_RE = re.compile(r"^(?:flowchart|graph)(?:\s+(TB|TD|BT|LR|RL))?$")
+_SUBGRAPH_RE = re.compile(r'^subgraph\s+([A-Za-z0-9_]+)\s*(?:\[\s*(".*"|[^\]"]*)\s*\])?$')
+_DIRECTION_RE = re.compile(r"^direction\s+(TB|TD|BT|LR|RL)$")
+_STYLE_RE = re.compile(r"^style\s+([A-Za-z0-9_]+)\s+(.+)$")
+_NODE_ID_RE = re.compile(r"\s*([A-Za-z0-9_]+)")
+_LINK_RE = re.compile(r"\s*(<?)(-{2,}|={2,}|-\.+-)(>?)\s*(?:\|([^|]*)\|)?\s*")
+_SHAPES = (
+    ("([", "])", "stadium"),
+    ("[(", ")]", "cylinder"),
+    ("((", "))", "circle"),
+    ("[[", "]]", "subroutine"),
+    ("{{", "}}", "hexagon"),
+    ("[", "]", "rect"),
+    ("(", ")", "round"),
+    ("{", "}", "diamond"),
+)
+_STYLE_KEYS = ("fill", "stroke", "stroke-width", "stroke-dasharray", "color")
+
+_ER_RELATION_RE = re.compile(
+    r"^([A-Za-z0-9_-]+)\s+(\|o|\|\||\}o|\}\|)(--|\.\.)(o\||\|\||o\{|\|\{)\s+([A-Za-z0-9_-]+)\s*:\s*(.+)$"
+)
+_ER_ENTITY_RE = re.compile(r"^([A-Za-z0-9_-]+)\s*\{$")
+_ER_ATTRIBUTE_RE = re.compile(
+    r'^([A-Za-z][\w()\[\],-]*)\s+([A-Za-z_*][\w-]*)((?:\s+(?:PK|FK|UK)(?:\s*,\s*(?:PK|FK|UK))*)?)(?:\s+"([^"]*)")?$'
+)
+_ER_MARKERS = {
+    "|o": (False, True), "o|": (False, True),
+    "||": (False, False),
+    "}o": (True, True), "o{": (True, True),
+    "}|": (True, False), "|{": (True, False),
+}
+
+_STATE_TRANSITION_RE = re.compile(r"^(\[\*\]|[A-Za-z0-9_]+)\s*-->\s*(\[\*\]|[A-Za-z0-9_]+)\s*(?::\s*(.*))?$")
+_STATE_LABEL_RE = re.compile(r"^([A-Za-z0-9_]+)\s*:\s*(.+)$")
+
+_SEQ_PARTICIPANT_RE = re.compile(r"^(?:participant|actor)\s+([A-Za-z0-9_]+)(?:\s+as\s+(.+))?$")
+_SEQ_MESSAGE_RE = re.compile(r"^([A-Za-z0-9_]+)\s*(-->>|->>|-->|->|--x|-x|--\)|-\))\s*([A-Za-z0-9_]+)\s*(?::(.*))?$")
+_SEQ_NOTE_RE = re.compile(
+    r"^[Nn]ote\s+(left of|right of|over)\s+([A-Za-z0-9_]+)(?:\s*,\s*([A-Za-z0-9_]+))?\s*:\s*(.*)$"
+)
+_SEQ_BLOCK_RE = re.compile(r"^(alt|opt|loop|else)(?:\s+(.*))?$")
+
+
+def _statements(mermaid_code: str) -> list:
+    lines = []
+    for raw in mermaid_code.replace("\r\n", "\n").split("\n"):
+        line = raw.strip()
+        if not line or line.startswith("%%"):
+            continue
+        lines.append(line.rstrip(";").rstrip())
+    return lines
+
+
+def _parse_style(spec: str) -> dict:
+    style = {}
+    for part in spec.split(","):
+        key, _, value = part.partition(":")
+        key, value = key.strip(), value.strip()
+        if key not in _STYLE_KEYS or not value:
+            continue
+        if key == "stroke-width":
+            try:
+                style[key] = float(value.rstrip("px"))
+            except ValueError:
+                continue
+        elif key == "stroke-dasharray":
+            style[key] = " ".join(value.replace(",", " ").split())
+        elif re.fullmatch(r"#[0-9A-Fa-f]{3,8}|[A-Za-z]+", value):
+            style[key] = value
+    return style
+
+
+def _parse_node_ref(line: str, pos: int, graph: _Graph, group: _Element):
+    match = _NODE_ID_RE.match(line, pos)
+    if not match:
+        raise UnsupportedDiagram(f"unsupported statement: {line}")
+    node_id, pos = match.group(1), match.end()
+    for opener, closer, shape in _SHAPES:
+        if not line.startswith(opener, pos):
+            continue
+        start = pos + len(opener)
+        if line.startswith('"', start):
+            end = line.find('"', start + 1)
+            if end < 0 or not line.startswith(closer, end + 1):
+                raise UnsupportedDiagram(f"unsupported node: {line}")
+            label, pos = line[start + 1:end], end + 1 + len(closer)
+        else:
+            end = line.find(closer, start)
+            if end < 0:
+                raise UnsupportedDiagram(f"unsupported node: {line}")
+            label, pos = line[start:end], end + len(closer)
+        return pos, graph.mention(node_id, group, _clean_label(label), shape)
+    return pos, graph.mention(node_id, group)
+
+
+def _parse_statement(line: str, graph: _Graph, group: _Element):
+    pos, src = _parse_node_ref(line, 0, graph, group)
+    while pos < len(line):
+        match = _LINK_RE.match(line, pos)
+        if not match:
+            raise UnsupportedDiagram(f"unsupported statement: {line}")
+        tail, body, head, label = match.groups()
+        if not head and (tail or len(body) < 3):
+            raise UnsupportedDiagram(f"unsupported link: {line}")
+        pos, dst = _parse_node_ref(line, match.end(), graph, group)
+        if dst is src:
+            raise UnsupportedDiagram("self-loops are not supported")
+        kind = "thick" if body[0] == "=" else "dotted" if "." in body else "solid"
+        graph.edges.append(_Edge(src.id, dst.id, _clean_label(label or ""), kind, bool(head), bool(tail)))
+        src = dst
+
+
+def _parse_flowchart(header: str, lines: list) -> _Graph:
+    graph = _Graph("flowchart", _DIRECTIONS[_FLOW_HEADER_RE.match(header).group(1) or "TB"])
+    stack = [graph.root]
+    for line in lines:
+        if line == "end":
+            if len(stack) == 1:
+                raise UnsupportedDiagram("'end' outside a subgraph")
+            stack.pop()
+            continue
+        match = _SUBGRAPH_RE.match(line)
+        if match:
+            group_id = match.group(1)
+            existing = graph.elements.get(group_id)
+            if existing is not None:
+                if existing.kind == "group" or existing.explicit:
+                    raise UnsupportedDiagram(f"duplicate id {group_id}")
+                graph.remove(group_id)
+            title = _clean_label(match.group(2)) if match.group(2) is not None else group_id
+            stack.append(graph.add(group_id, "group", stack[-1], label=title))
+            continue
+        match = _DIRECTION_RE.match(line)
+        if match:
+            stack[-1].direction = _DIRECTIONS[match.group(1)]
+            continue
+        match = _STYLE_RE.match(line)
+        if match:
+            graph.styles[match.group(1)] = _parse_style(match.group(2))
+            continue
+        _parse_statement(line, graph, stack[-1])
+    if len(stack) != 1:
+        raise UnsupportedDiagram("unterminated subgraph")
+    for edge in graph.edges:
+        if edge.src in graph.chain(edge.dst) or edge.dst in graph.chain(edge.src):
+            raise UnsupportedDiagram("edges between a subgraph and its own nodes are not supported")
+    for element_id, style in graph.styles.items():
+        if element_id in graph.elements:
+            graph.elements[element_id].style = style
+    return graph
+
+
+def _parse_er(lines: list) -> _Graph:
+    graph = _Graph("er", "TB")
+    entity = None
+    for line in lines:
+        if entity is not None:
+            if line == "}":
+                entity = None
+                continue
+            match = _ER_ATTRIBUTE_RE.match(line)
+            if not match:
+                raise UnsupportedDiagram(f"unsupported attribute: {line}")
+            keys = ", ".join(k.strip() for k in match.group(3).split(",") if k.strip())
+            entity.attrs.append((match.group(1), match.group(2), keys, match.group(4) or ""))
+            continue
+        match = _ER_ENTITY_RE.match(line)
+        if match:
+            entity = graph.mention(match.group(1), graph.root, match.group(1), "entity")
+            continue
+        match = _ER_RELATION_RE.match(line)
+        if not match:
+            raise UnsupportedDiagram(f"unsupported statement: {line}")
+        src, left, body, right, dst, label = match.groups()
+        if src == dst:
+            raise UnsupportedDiagram("self-relationships are not supported")
+        for name in (src, dst):
+            graph.mention(name, graph.root, name, "entity")
+        graph.edges.append(_Edge(
+            src, dst, _clean_label(label), "solid" if body == "--" else "dotted",
+            head=False, markers=(_ER_MARKERS[left], _ER_MARKERS[right]),
+        ))
+    if entity is not None:
+        raise UnsupportedDiagram("unterminated entity")
+    return graph
+
+
+def _parse_state(lines: list) -> _Graph:
+    graph = _Graph("state", "TB")
+    for line in lines:
+        match = _DIRECTION_RE.match(line)
+        if match:
+            graph.root.direction = _DIRECTIONS[match.group(1)]
+            continue
+        match = _STATE_TRANSITION_RE.match(line)
+        if match:
+            src, dst, label = match.groups()
+            src = "[*]start" if src == "[*]" else src
+            dst = "[*]end" if dst == "[*]" else dst
+            if src == dst:
+                raise UnsupportedDiagram("self-transitions are not supported")
+            for name in (src, dst):
+                if name not in graph.elements:
+                    shape = {"[*]start": "start", "[*]end": "end"}.get(name, "state")
+                    graph.add(name, "node", graph.root, label=name, shape=shape)
+            graph.edges.append(_Edge(src, dst, _clean_label(label or "")))
+            continue
+        match = _STATE_LABEL_RE.match(line)
+        if match:
+            graph.mention(match.group(1), graph.root)
+            graph.elements[match.group(1)].shape = "state"
+            graph.elements[match.group(1)].label = _clean_label(match.group(2))
+            continue
+        raise UnsupportedDiagram(f"unsupported statement: {line}")
+    for element in graph.elements.values():
+        if element.kind == "node" and element.shape == "rect":
+            element.shape = "state"
+    return graph
+
+
+def _parse_sequence(lines: list) -> _Sequence:
+    diagram = _Sequence()
+    depth = 0
+    for line in lines:
+        match = _SEQ_PARTICIPANT_RE.match(line)
+        if match:
+            diagram.mention(match.group(1), _clean_label(match.group(2)) if match.group(2) else None)
+            continue
+        match = _SEQ_MESSAGE_RE.match(line)
+        if match:
+            src, arrow, dst, text = match.groups()
+            diagram.mention(src)
+            diagram.mention(dst)
+            head = ">>" if arrow.endswith(">>") else "x" if arrow.endswith("x") else ")" if arrow.endswith(")") else ""
+            diagram.events.append(("message", src, dst, _clean_label(text or ""), arrow.startswith("--"), head))
+            continue
+        match = _SEQ_NOTE_RE.match(line)
+        if match:
+            placement, first, second, text = match.groups()
+            targets = [first] + ([second] if second else [])
+            if second and placement != "over":
+                raise UnsupportedDiagram(f"unsupported note: {line}")
+            for name in targets:
+                diagram.mention(name)
+            diagram.events.append(("note", placement, targets, _clean_label(text)))
+            continue
+        match = _SEQ_BLOCK_RE.match(line)
+        if match:
+            kind, text = match.group(1), _clean_label(match.group(2) or "")
+            if kind == "else":
+                if not depth:
+                    raise UnsupportedDiagram("'else' outside a block")
+                diagram.events.append(("else", text))
+            else:
+                depth += 1
+                diagram.events.append(("block", kind, text))
+            continue
+        if line == "end":
+            if not depth:
+                raise UnsupportedDiagram("'end' outside a block")
+            depth -= 1
+            diagram.events.append(("end",))
+            continue
+        raise UnsupportedDiagram(f"unsupported statement: {line}")
+    if depth:
+        raise UnsupportedDiagram("unterminated block")
+    if not diagram.participants:
+        raise UnsupportedDiagram("empty sequence diagram")
+    return diagram
+
+
+def _parse(mermaid_code: str):
+    lines = _statements(mermaid_code or "")
+    if not lines:
+        raise UnsupportedDiagram("empty diagram")
+    header, body = lines[0], lines[1:]
+    if _FLOW_HEADER_RE.match(header):
+        return _parse_flowchart(header, body)
+    if header == "erDiagram":
+        return _parse_er(body)
+    if header == "stateDiagram-v2":
+        return _parse_state(body)
+    if header == "sequenceDiagram":
+        return _parse_sequence(body)
+    raise UnsupportedDiagram(f"unsupported diagram type: {header[:40]}")
+
+
+def parse(mermaid_code: str):
+    """Parsed diagram, or None when the source is outside the native subset."""
+    try:
+        return _parse(mermaid_code)
+    except UnsupportedDiagram:
+        return None
+
+
+def supports(mermaid_code: str, fmt: str = "png") -> bool:
+    if fmt not in ("png", "svg") or (fmt == "png" and Image is None):
+        return False
+    return parse(mermaid_code) is not None
+
+
+# ---------------------------------------------------------------- layout
+
+def _measure(graph: _Graph, theme: dict):
+    size = theme["font_size"]
+    for element in graph.elements.values():
+        if element.kind != "node":
+            continue
+        shape = element.shape
+        if shape in ("start", "end"):
+            element.w = element.h = 14.0 if shape == "start" else 18.0
+            continue
+        if shape == "entity":
+            _measure_entity(element, theme)
+            continue
+        element.lines = _wrap(element.label, size)
+        tw, th = _text_block(element.lines, size)
+        if shape == "diamond":
+            half_h = th / 2 + 14
+            element.w = 2 * ((tw / 2) / (1 - th / (2 * half_h)) + 10)
+            element.h = 2 * half_h
+        elif shape == "circle":
+            element.w = element.h = max(tw, th) + 24
+        elif shape == "cylinder":
+            element.w, element.h = tw + 30, th + 36
+        elif shape == "stadium":
+            element.w, element.h = tw + 30 + th, th + 20
+        elif shape == "hexagon":
+            element.w, element.h = tw + 30 + th, th + 20
+        elif shape == "subroutine":
+            element.w, element.h = tw + 46, th + 20
+        elif shape == "state":
+            element.w, element.h = tw + 30, th + 16
+        else:
+            element.w, element.h = tw + 30, th + 20
+        element.w = max(element.w, 50.0)
+    for edge in graph.edges:
+        if edge.label:
+            tw, th = _text_block(edge.label.split("\n"), theme["label_size"])
+            edge.label_size = (tw + 8, th + 4)
+
+
+def _measure_entity(element: _Element, theme: dict):
+    size = theme["er_font_size"]
+    header_w = text_width(element.label, size, bold=True) + 30
+    columns = [0.0, 0.0, 0.0, 0.0]
+    for row in element.attrs:
+        for i, value in enumerate(row):
+            if value:
+                columns[i] = max(columns[i], text_width(value, size) + 16)
+    element.lines = columns
+    row_h = size * 1.8
+    element.w = max(header_w, sum(columns), 90.0)
+    element.h = size * _LINE_HEIGHT + 16 + row_h * len(element.attrs)
+
+
+class _Layout:
+    __slots__ = ("horizontal", "rank", "dag", "dummies", "gap_mid", "centers", "w", "h")
+
+
+def _layered(items: list, pairs: list, sizes: dict, direction: str, theme: dict) -> _Layout:
+    """
+    Layered layout of one container: cycle removal (DFS), longest-path ranks,
+    dummy vertices on long edges, barycentric ordering sweeps and
+    least-squares coordinate assignment. pairs are (a, b, label main size).
+    """
+    horizontal = direction in ("LR", "RL")
+    out = {item: [] for item in items}
+    for a, b, _ in pairs:
+        if b not in out[a]:
+            out[a].append(b)
+    edges = [(a, b) for a in items for b in out[a]]
+    targets = {b for _, b in edges}
+    roots = [i for i in items if i not in targets] + [a for a, _, _ in pairs] + list(items)
+    layering = layer_graph(items, edges, roots)
+    rank, layers = layering.rank, layering.layers
+
+    def cross_size(v) -> float:
+        return 0.0 if is_dummy(v) else sizes[v][1 if horizontal else 0]
+
+    def main_size(v) -> float:
+        return 0.0 if is_dummy(v) else sizes[v][0 if horizontal else 1]
+
+    spacing = theme["node_spacing"]
+    seps = [
+        [(cross_size(a) + cross_size(b)) / 2 + (spacing if not (is_dummy(a) or is_dummy(b)) else spacing / 3)
+         for a, b in zip(layer, layer[1:])]
+        for layer in layers
+    ]
+    pos = place_in_layers(layering, seps)
+    low = min(pos[v] - cross_size(v) / 2 for v in pos)
+    high = max(pos[v] + cross_size(v) / 2 for v in pos)
+
+    label_gap = defaultdict(float)
+    for a, b, label_main in pairs:
+        if label_main:
+            r = min(rank[a], rank[b])
+            label_gap[r] = max(label_gap[r], label_main + 12)
+    rank_sizes = [max((main_size(v) for v in layer), default=0.0) for layer in layers]
+    main_centers, gap_mid, cursor = [], [], 0.0
+    for r, size in enumerate(rank_sizes):
+        main_centers.append(cursor + size / 2)
+        cursor += size
+        if r < len(layers) - 1:
+            gap = theme["rank_spacing"] + label_gap[r]
+            gap_mid.append(cursor + gap / 2)
+            cursor += gap
+    flip = direction in ("BT", "RL")
+
+    def point(v, r):
+        main = main_centers[r]
+        main = cursor - main if flip else main
+        cross = pos[v] - low
+        return (main, cross) if horizontal else (cross, main)
+
+    layout = _Layout()
+    layout.horizontal = horizontal
+    layout.rank = rank
+    layout.dag = set(layering.dag)
+    layout.centers = {item: point(item, rank[item]) for item in items}
+    layout.dummies = {pair: [point(v, v[3]) for v in chain[1:-1]] for pair, chain in layering.chains.items()}
+    layout.gap_mid = [cursor - m if flip else m for m in gap_mid]
+    extent = (cursor, high - low) if horizontal else (high - low, cursor)
+    layout.w, layout.h = extent if items else (0.0, 0.0)
+    return layout
+
+
+def _arrange(graph: _Graph, container: _Element, lifted: dict, theme: dict):
+    for item in container.items:
+        if graph.elements[item].kind == "group":
+            _arrange(graph, graph.elements[item], lifted, theme)
+    direction = graph.direction_of(container)
+    horizontal = direction in ("LR", "RL")
+    pairs = [
+        (a, b, edge.label_size[0 if horizontal else 1] if edge.label else 0.0)
+        for a, b, edge in lifted.get(container.id, ())
+    ]
+    sizes = {item: (graph.elements[item].w, graph.elements[item].h) for item in container.items}
+    layout = _layered(container.items, pairs, sizes, direction, theme)
+    container.layout = layout
+    if container.id == "":
+        container.w, container.h = layout.w + 2 * _MARGIN, layout.h + 2 * _MARGIN
+        container.offset = (_MARGIN, _MARGIN)
+        return
+    title_h = theme["font_size"] * _LINE_HEIGHT + 8 if container.label else 0.0
+    title_w = text_width(container.label, theme["font_size"]) + 2 * _GROUP_PAD
+    container.w = max(layout.w + 2 * _GROUP_PAD, title_w, 80.0)
+    container.h = layout.h + 2 * _GROUP_PAD + title_h
+    container.offset = ((container.w - layout.w) / 2, _GROUP_PAD + title_h)
+
+
+def _place(graph: _Graph, container: _Element, left: float, top: float):
+    ox, oy = left + container.offset[0], top + container.offset[1]
+    container.origin = (ox, oy)
+    for item in container.items:
+        element = graph.elements[item]
+        cx, cy = container.layout.centers[item]
+        element.x, element.y = ox + cx, oy + cy
+        if element.kind == "group":
+            _place(graph, element, element.x - element.w / 2, element.y - element.h / 2)
+
+
+def _contains(element: _Element, x: float, y: float) -> bool:
+    dx, dy = abs(x - element.x), abs(y - element.y)
+    if element.shape == "diamond" and element.kind == "node":
+        return dx / (element.w / 2) + dy / (element.h / 2) <= 1
+    if element.shape in ("circle", "start", "end") and element.kind == "node":
+        return dx * dx + dy * dy <= (element.w / 2) ** 2
+    return dx <= element.w / 2 and dy <= element.h / 2
+
+
+def _boundary(element: _Element, inside: tuple, outside: tuple) -> tuple:
+    if not _contains(element, *inside):
+        return inside
+    for _ in range(24):
+        mid = ((inside[0] + outside[0]) / 2, (inside[1] + outside[1]) / 2)
+        if _contains(element, *mid):
+            inside = mid
+        else:
+            outside = mid
+    return outside
+
+
+def _route(graph: _Graph, theme: dict):
+    ports = defaultdict(list)
+    for index, edge in enumerate(graph.edges):
+        container_id, a, b = edge.lift
+        container = graph.elements[container_id]
+        layout, (ox, oy) = container.layout, container.origin
+        if (a, b) in layout.dag:
+            interior = layout.dummies[(a, b)]
+        else:
+            interior = list(reversed(layout.dummies[(b, a)]))
+        interior = [(ox + x, oy + y) for x, y in interior]
+        src, dst = graph.elements[edge.src], graph.elements[edge.dst]
+        edge.points = [None] + interior + [None]
+        axis = 0 if layout.horizontal else 1
+        for end, element, neighbour in ((0, src, interior[0] if interior else (dst.x, dst.y)),
+                                        (-1, dst, interior[-1] if interior else (src.x, src.y))):
+            side = 1 if neighbour[axis] >= (element.x, element.y)[axis] else -1
+            ports[(element.id, layout.horizontal, side)].append((neighbour[1 - axis], index, end))
+
+    for (element_id, horizontal, side), requests in ports.items():
+        element = graph.elements[element_id]
+        requests.sort()
+        count = len(requests)
+        cross = element.h if horizontal else element.w
+        step = min(cross * 0.7 / (count - 1), 22.0) if count > 1 else 0.0
+        for k, (_, index, end) in enumerate(requests):
+            offset = (k - (count - 1) / 2) * step
+            if horizontal:
+                inside = (element.x, element.y + offset)
+                outside = (element.x + side * (element.w / 2 + 4), element.y + offset)
+            else:
+                inside = (element.x + offset, element.y)
+                outside = (element.x + offset, element.y + side * (element.h / 2 + 4))
+            graph.edges[index].points[end] = _boundary(element, inside, outside)
+
+    labels = defaultdict(list)
+    for edge in graph.edges:
+        if not edge.label:
+            continue
+        container_id, a, b = edge.lift
+        container = graph.elements[container_id]
+        layout = container.layout
+        r = min(layout.rank[a], layout.rank[b])
+        axis = 0 if layout.horizontal else 1
+        gap = layout.gap_mid[r] + container.origin[axis]
+        edge.label_at = _point_at_main(edge.points, axis, gap)
+        labels[(container_id, r)].append(edge)
+    for (container_id, _), edges in labels.items():
+        axis = 1 if graph.elements[container_id].layout.horizontal else 0
+        edges.sort(key=lambda e: e.label_at[axis])
+        sizes = [e.label_size[axis] for e in edges]
+        seps = [(s1 + s2) / 2 + 4 for s1, s2 in zip(sizes, sizes[1:])]
+        for edge, cross in zip(edges, pav([e.label_at[axis] for e in edges], seps)):
+            at = list(edge.label_at)
+            at[axis] = cross
+            edge.label_at = tuple(at)
+
+
+def _point_at_main(points: list, axis: int, main: float) -> tuple:
+    for p, q in zip(points, points[1:]):
+        if (p[axis] - main) * (q[axis] - main) <= 0 and p[axis] != q[axis]:
+            t = (main - p[axis]) / (q[axis] - p[axis])
+            return p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t
+    p, q = points[len(points) // 2 - 1], points[len(points) // 2]
+    return (p[0] + q[0]) / 2, (p[1] + q[1]) / 2
+
+
+def _layout_graph(graph: _Graph, theme: dict):
+    _measure(graph, theme)
+    lifted = defaultdict(list)
+    for edge in graph.edges:
+        edge.lift = graph.lift(edge.src, edge.dst)
+        lifted[edge.lift[0]].append((edge.lift[1], edge.lift[2], edge))
+    _arrange(graph, graph.root, lifted, theme)
+    _place(graph, graph.root, 0.0, 0.0)
+    _route(graph, theme)
+
+
+# ---------------------------------------------------------------- drawing
+#
+# Scenes are lists of primitives in diagram units:
+#   ("rect", x, y, w, h, rx, fill, stroke, stroke_width, dash)
+#   ("circle", cx, cy, r, fill, stroke, stroke_width)
+#   ("polygon", points, fill, stroke, stroke_width)
+#   ("line", points, stroke, stroke_width, dash)
+#   ("cylinder", x, y, w, h, ry, fill, stroke, stroke_width)
+#   ("text", x, y, text, size, color, anchor, bold)     # y is the line centre
+
+def _rounded(points: list, radius: float = 18.0, steps: int = 6) -> list:
+    """Polyline with its bends replaced by quadratic curves."""
+    if len(points) < 3:
+        return list(points)
+    out = [points[0]]
+    for p0, p1, p2 in zip(points, points[1:], points[2:]):
+        d1, d2 = math.dist(p0, p1), math.dist(p1, p2)
+        r = min(radius, d1 / 2, d2 / 2)
+        if r < 1:
+            out.append(p1)
+            continue
+        a = (p1[0] + (p0[0] - p1[0]) * r / d1, p1[1] + (p0[1] - p1[1]) * r / d1)
+        b = (p1[0] + (p2[0] - p1[0]) * r / d2, p1[1] + (p2[1] - p1[1]) * r / d2)
+        for s in range(steps + 1):
+            t = s / steps
+            out.append((
+                (1 - t) ** 2 * a[0] + 2 * (1 - t) * t * p1[0] + t * t * b[0],
+                (1 - t) ** 2 * a[1] + 2 * (1 - t) * t * p1[1] + t * t * b[1],
+            ))
+    out.append(points[-1])
+    return out
+
+
+def _unit(p: tuple, q: tuple) -> tuple:
+    length = math.dist(p, q) or 1.0
+    return (q[0] - p[0]) / length, (q[1] - p[1]) / length
+
+
+def _arrowhead(tip: tuple, toward_tip: tuple, color: str) -> tuple:
+    ux, uy = toward_tip
+    bx, by = tip[0] - ux * _ARROW, tip[1] - uy * _ARROW
+    half = _ARROW * 0.45
+    return ("polygon", [tip, (bx - uy * half, by + ux * half), (bx + uy * half, by - ux * half)], color, color, 1.0)
+
+
+def _text_lines(scene: list, lines: list, cx: float, cy: float, size: float, color: str, bold: bool = False):
+    line_h = size * _LINE_HEIGHT
+    top = cy - line_h * len(lines) / 2
+    for i, line in enumerate(lines):
+        if line:
+            scene.append(("text", cx, top + line_h * (i + 0.5), line, size, color, "middle", bold))
+
+
+def _edge_scene(scene: list, labels: list, edge: _Edge, theme: dict):
+    color = theme["line"]
+    width = 3.5 if edge.line == "thick" else 2.0
+    dash = "4 4" if edge.line == "dotted" else None
+    points = list(edge.points)
+    if edge.head:
+        u = _unit(points[-2], points[-1])
+        scene.append(_arrowhead(points[-1], u, color))
+        points[-1] = (points[-1][0] - u[0] * _ARROW * 0.7, points[-1][1] - u[1] * _ARROW * 0.7)
+    if edge.tail:
+        u = _unit(points[1], points[0])
+        scene.append(_arrowhead(points[0], u, color))
+        points[0] = (points[0][0] - u[0] * _ARROW * 0.7, points[0][1] - u[1] * _ARROW * 0.7)
+    scene.insert(0, ("line", _rounded(points), color, width, dash))
+    if edge.markers:
+        for (many, optional), tip, nxt in ((edge.markers[0], edge.points[0], edge.points[1]),
+                                           (edge.markers[1], edge.points[-1], edge.points[-2])):
+            _er_marker(scene, tip, _unit(tip, nxt), many, optional, color)
+    if edge.label:
+        w, h = edge.label_size
+        x, y = edge.label_at
+        labels.append(("rect", x - w / 2, y - h / 2, w, h, 2.0, theme["label_fill"], None, 0.0, None))
+        _text_lines(labels, edge.label.split("\n"), x, y, theme["label_size"], theme["text"])
+
+
+def _er_marker(scene: list, tip: tuple, u: tuple, many: bool, optional: bool, color: str):
+    nx, ny = -u[1], u[0]
+
+    def at(distance, spread=0.0):
+        return tip[0] + u[0] * distance + nx * spread, tip[1] + u[1] * distance + ny * spread
+
+    if many:
+        for spread in (-8.0, 8.0):
+            scene.append(("line", [at(0, spread), at(14)], color, 1.5, None))
+    ticks = [18.0] if many else [8.0] if optional else [8.0, 14.0]
+    for distance in ticks:
+        scene.append(("line", [at(distance, -7), at(distance, 7)], color, 1.5, None))
+    if optional:
+        cx, cy = at(24.0 if many else 17.0)
+        scene.append(("circle", cx, cy, 4.5, "#FFFFFF", color, 1.5))
+
+
+def _node_scene(scene: list, element: _Element, theme: dict):
+    style = element.style
+    fill = style.get("fill", theme["node_fill"])
+    stroke = style.get("stroke", theme["node_stroke"])
+    width = style.get("stroke-width", 2.0)
+    dash = style.get("stroke-dasharray")
+    color = style.get("color", theme["text"])
+    x, y, w, h = element.x - element.w / 2, element.y - element.h / 2, element.w, element.h
+    shape = element.shape
+    if shape == "start":
+        scene.append(("circle", element.x, element.y, w / 2, theme["line"], theme["line"], 1.0))
+        return
+    if shape == "end":
+        scene.append(("circle", element.x, element.y, w / 2, "#FFFFFF", theme["line"], 1.5))
+        scene.append(("circle", element.x, element.y, w / 2 - 4, theme["line"], theme["line"], 1.0))
+        return
+    if shape == "entity":
+        _entity_scene(scene, element, theme)
+        return
+    text_y = element.y
+    if shape == "diamond":
+        scene.append(("polygon", [(element.x, y), (x + w, element.y), (element.x, y + h), (x, element.y)],
+                      fill, stroke, width))
+    elif shape == "hexagon":
+        inset = h / 2
+        scene.append(("polygon", [(x + inset, y), (x + w - inset, y), (x + w, element.y), (x + w - inset, y + h),
+                                  (x + inset, y + h), (x, element.y)], fill, stroke, width))
+    elif shape == "circle":
+        scene.append(("circle", element.x, element.y, w / 2, fill, stroke, width))
+    elif shape == "cylinder":
+        scene.append(("cylinder", x, y, w, h, 8.0, fill, stroke, width))
+        text_y += 4
+    else:
+        radius = {"round": 8.0, "state": 10.0, "stadium": h / 2}.get(shape, 0.0)
+        scene.append(("rect", x, y, w, h, radius, fill, stroke, width, dash))
+        if shape == "subroutine":
+            for edge_x in (x + 8, x + w - 8):
+                scene.append(("line", [(edge_x, y), (edge_x, y + h)], stroke, width, None))
+    _text_lines(scene, element.lines, element.x, text_y, theme["font_size"], color)
+
+
+def _entity_scene(scene: list, element: _Element, theme: dict):
+    size = theme["er_font_size"]
+    x, y, w = element.x - element.w / 2, element.y - element.h / 2, element.w
+    header_h = size * _LINE_HEIGHT + 16
+    row_h = size * 1.8
+    scene.append(("rect", x, y, w, element.h, 0.0, "#FFFFFF", theme["node_stroke"], 1.5, None))
+    scene.append(("rect", x, y, w, header_h, 0.0, theme["node_fill"], theme["node_stroke"], 1.5, None))
+    scene.append(("text", element.x, y + header_h / 2, element.label, size, theme["text"], "middle", True))
+    columns = list(element.lines)
+    columns[-1] += w - sum(columns)  # the last used column takes the slack
+    for i, row in enumerate(element.attrs):
+        top = y + header_h + i * row_h
+        if i % 2:
+            scene.append(("rect", x, top, w, row_h, 0.0, theme["cluster_fill"], None, 0.0, None))
+        left = x
+        for column, value in zip(columns, row):
+            if value:
+                scene.append(("text", left + 8, top + row_h / 2, value, size, theme["text"], "start", False))
+            left += column
+    scene.append(("rect", x, y, w, element.h, 0.0, None, theme["node_stroke"], 1.5, None))
+
+
+def _graph_scene(graph: _Graph, theme: dict):
+    _layout_graph(graph, theme)
+    scene, labels, nodes = [], [], []
+
+    def groups(container):
+        for item in container.items:
+            element = graph.elements[item]
+            if element.kind != "group":
+                continue
+            style = element.style
+            x, y = element.x - element.w / 2, element.y - element.h / 2
+            scene.append(("rect", x, y, element.w, element.h, 8.0, style.get("fill", theme["cluster_fill"]),
+                          style.get("stroke", theme["cluster_stroke"]), style.get("stroke-width", 1.8),
+                          style.get("stroke-dasharray")))
+            if element.label:
+                scene.append(("text", element.x, y + 4 + theme["font_size"] * _LINE_HEIGHT / 2, element.label,
+                              theme["font_size"], style.get("color", theme["text"]), "middle", False))
+            groups(element)
+
+    groups(graph.root)
+    edges = []
+    for edge in graph.edges:
+        _edge_scene(edges, labels, edge, theme)
+    for element in graph.elements.values():
+        if element.kind == "node":
+            _node_scene(nodes, element, theme)
+    return scene + edges + nodes + labels, graph.root.w, graph.root.h
+
+
+def _sequence_scene(diagram: _Sequence, theme: dict):
+    size = theme["font_size"]
+    line_h = size * _LINE_HEIGHT
+    names = diagram.participants
+    index = {name: i for i, name in enumerate(names)}
+    box_lines = [_wrap(diagram.labels[name], size) for name in names]
+    widths = [max(_text_block(lines, size)[0] + 28, 110.0) for lines in box_lines]
+    box_h = max(_text_block(lines, size)[1] for lines in box_lines) + 20
+    gaps = [(a + b) / 2 + 40 for a, b in zip(widths, widths[1:])]
+    left_extra = right_extra = 0.0
+
+    needs = []
+    for event in diagram.events:
+        if event[0] == "message":
+            _, src, dst, text, _, _ = event
+            label_w = max((text_width(line, size) for line in text.split("\n")), default=0.0)
+            i, j = sorted((index[src], index[dst]))
+            needs.append((j - i, i, j, label_w + (56 if i == j else 30)))
+        elif event[0] == "note" and event[1] != "over":
+            i = index[event[2][0]]
+            note_w = _text_block(event[3].split("\n"), size)[0] + 20 + 24
+            if event[1] == "right of":
+                needs.append((1, i, i + 1, note_w))
+            else:
+                needs.append((1, i - 1, i, note_w))
+    for span, i, j, need in sorted(needs):
+        if i < 0:
+            left_extra = max(left_extra, need)
+            continue
+        if j >= len(names) or (span == 0 and i == len(names) - 1):
+            right_extra = max(right_extra, need)
+            continue
+        j = max(j, i + 1)
+        have = sum(gaps[i:j])
+        if have < need:
+            for k in range(i, j):
+                gaps[k] += (need - have) / (j - i)
+
+    xs = [_MARGIN + max(widths[0] / 2, left_extra)]
+    for gap in gaps:
+        xs.append(xs[-1] + gap)
+    width = xs[-1] + max(widths[-1] / 2, right_extra) + _MARGIN
+
+    scene, frames, notes, messages = [], [], [], []
+    top = _MARGIN
+    cursor = top + box_h + 24
+    open_frames = []
+
+    def touch(*columns):
+        for frame in open_frames:
+            frame["low"] = min([frame["low"], *columns])
+            frame["high"] = max([frame["high"], *columns])
+
+    for event in diagram.events:
+        kind = event[0]
+        if kind == "message":
+            _, src, dst, text, dashed, head = event
+            i, j = index[src], index[dst]
+            touch(i, j)
+            lines = text.split("\n") if text else []
+            label_h = line_h * len(lines)
+            y = cursor + label_h + 6
+            color = theme["line"]
+            dash = "4 4" if dashed else None
+            if i == j:
+                x = xs[i]
+                for n, line in enumerate(lines):
+                    messages.append(("text", x + 8, cursor + line_h * (n + 0.5), line, size, theme["text"], "start",
+                                     False))
+                loop = [(x, y), (x + 34, y), (x + 34, y + 22), (x, y + 22)]
+                messages.append(("line", _rounded(loop[:-1] + [(x + (_ARROW * 0.7 if head else 0), y + 22)], 8),
+                                 color, 1.8, dash))
+                tip, u = (x, y + 22), (-1.0, 0.0)
+                cursor = y + 22 + 20
+            else:
+                _text_lines(messages, lines, (xs[i] + xs[j]) / 2, cursor + label_h / 2, size, theme["text"])
+                tip, u = (xs[j], y), (1.0 if j > i else -1.0, 0.0)
+                end_x = xs[j] - u[0] * (_ARROW * 0.7 if head == ">>" else 0)
+                messages.append(("line", [(xs[i], y), (end_x, y)], color, 1.8, dash))
+                cursor = y + 20
+            if head == ">>":
+                messages.append(_arrowhead(tip, u, color))
+            elif head == "x":
+                for sign in (-1, 1):
+                    messages.append(("line", [(tip[0] - u[0] * 9 - 5, tip[1] - 5 * sign),
+                                              (tip[0] - u[0] * 9 + 5, tip[1] + 5 * sign)], color, 1.8, None))
+            elif head == ")":
+                for sign in (-1, 1):
+                    messages.append(("line", [(tip[0] - u[0] * _ARROW, tip[1] + sign * _ARROW * 0.45), tip],
+                                     color, 1.8, None))
+        elif kind == "note":
+            _, placement, targets, text = event
+            columns = [index[t] for t in targets]
+            touch(*columns)
+            lines = text.split("\n")
+            tw, th = _text_block(lines, size)
+            w, h = tw + 20, th + 14
+            if placement == "over":
+                low, high = min(xs[c] for c in columns), max(xs[c] for c in columns)
+                w = max(w, high - low + 60)
+                x = (low + high) / 2 - w / 2
+            elif placement == "right of":
+                x = xs[columns[0]] + 12
+            else:
+                x = xs[columns[0]] - 12 - w
+            notes.append(("rect", x, cursor, w, h, 0.0, theme["note_fill"], theme["note_stroke"], 1.2, None))
+            _text_lines(notes, lines, x + w / 2, cursor + h / 2, size, theme["text"])
+            cursor += h + 14
+        elif kind == "block":
+            frame = {"kind": event[1], "text": event[2], "top": cursor, "low": len(names), "high": -1,
+                     "depth": len(open_frames), "separators": []}
+            open_frames.append(frame)
+            cursor += line_h + 18
+        elif kind == "else":
+            open_frames[-1]["separators"].append((cursor, event[1]))
+            cursor += line_h + 14
+        else:
+            frame = open_frames.pop()
+            frame["bottom"] = cursor
+            if frame["high"] < 0:
+                frame["low"], frame["high"] = 0, len(names) - 1
+            touch(frame["low"], frame["high"])
+            frames.append(frame)
+            cursor += 14
+
+    bottom = cursor + 6
+    height = bottom + box_h + _MARGIN
+    for x in xs:
+        scene.append(("line", [(x, top + box_h), (x, bottom)], theme["line"], 1.0, "3 3"))
+    for frame in frames:
+        inset = frame["depth"] * 6
+        left = xs[frame["low"]] - widths[frame["low"]] / 2 - 6 + inset
+        right = xs[frame["high"]] + widths[frame["high"]] / 2 + 6 - inset
+        y0, y1 = frame["top"], frame["bottom"]
+        scene.append(("rect", left, y0, right - left, y1 - y0, 0.0, None, theme["cluster_stroke"], 1.5, None))
+        tab_w, tab_h = text_width(frame["kind"], size, bold=True) + 18, line_h + 8
+        scene.append(("polygon", [(left, y0), (left + tab_w, y0), (left + tab_w, y0 + tab_h - 6),
+                                  (left + tab_w - 6, y0 + tab_h), (left, y0 + tab_h)],
+                      theme["cluster_fill"], theme["cluster_stroke"], 1.5))
+        scene.append(("text", left + tab_w / 2, y0 + tab_h / 2, frame["kind"], size, theme["text"], "middle", True))
+        if frame["text"]:
+            scene.append(("text", (left + tab_w + right) / 2, y0 + tab_h / 2, f"[{frame['text']}]", size,
+                          theme["text"], "middle", False))
+        for sep_y, text in frame["separators"]:
+            scene.append(("line", [(left, sep_y), (right, sep_y)], theme["cluster_stroke"], 1.5, "4 4"))
+            if text:
+                scene.append(("text", (left + right) / 2, sep_y + line_h / 2 + 4, f"[{text}]", size, theme["text"],
+                              "middle", False))
+    for i, (x, lines) in enumerate(zip(xs, box_lines)):
+        for y in (top, bottom):
+            scene.append(("rect", x - widths[i] / 2, y, widths[i], box_h, 3.0, theme["node_fill"],
+                          theme["node_stroke"], 1.8, None))
+            _text_lines(scene, lines, x, y + box_h / 2, size, theme["text"])
+    return scene + notes + messages, width, height
+
+
+def _scene(diagram, theme: dict):
+    if diagram.kind == "sequence":
+        return _sequence_scene(diagram, theme)
+    return _graph_scene(diagram, theme)
+
+
+# ---------------------------------------------------------------- output
+
+def _n(value: float) -> str:
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _points(points) -> str:
+    return " ".join(f"{_n(x)},{_n(y)}" for x, y in points)
+
+
+def _paint(fill, stroke, width, dash=None) -> str:
+    attrs = f' fill="{escape(fill)}"' if fill else ' fill="none"'
+    if stroke:
+        attrs += f' stroke="{escape(stroke)}" stroke-width="{_n(width)}"'
+        if dash:
+            attrs += f' stroke-dasharray="{escape(dash)}"'
+    return attrs
+
+
+def _svg(scene: list, width: float, height: float, fit: float, theme: dict, background: str) -> str:
+    font = quoteattr(theme["font_family"])
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_n(width * fit)}" height="{_n(height * fit)}" '
+        f'viewBox="0 0 {_n(width)} {_n(height)}">'
+    ]
+    if background and background not in ("transparent", "none"):
+        out.append(f'<rect x="0" y="0" width="{_n(width)}" height="{_n(height)}" fill="{escape(background)}"/>')
+    for item in scene:
+        kind = item[0]
+        if kind == "rect":
+            _, x, y, w, h, rx, fill, stroke, sw, dash = item
+            radius = f' rx="{_n(rx)}"' if rx else ""
+            out.append(f'<rect x="{_n(x)}" y="{_n(y)}" width="{_n(w)}" height="{_n(h)}"{radius}'
+                       f'{_paint(fill, stroke, sw, dash)}/>')
+        elif kind == "circle":
+            _, cx, cy, r, fill, stroke, sw = item
+            out.append(f'<circle cx="{_n(cx)}" cy="{_n(cy)}" r="{_n(r)}"{_paint(fill, stroke, sw)}/>')
+        elif kind == "polygon":
+            _, points, fill, stroke, sw = item
+            out.append(f'<polygon points="{_points(points)}"{_paint(fill, stroke, sw)} stroke-linejoin="round"/>')
+        elif kind == "line":
+            _, points, stroke, sw, dash = item
+            out.append(f'<polyline points="{_points(points)}"{_paint(None, stroke, sw, dash)} '
+                       f'stroke-linejoin="round" stroke-linecap="round"/>')
+        elif kind == "cylinder":
+            _, x, y, w, h, ry, fill, stroke, sw = item
+            body = h - 2 * ry
+            out.append(
+                f'<path d="M {_n(x)},{_n(y + ry)} a {_n(w / 2)},{_n(ry)} 0 0,0 {_n(w)},0 '
+                f'a {_n(w / 2)},{_n(ry)} 0 0,0 {_n(-w)},0 l 0,{_n(body)} '
+                f'a {_n(w / 2)},{_n(ry)} 0 0,0 {_n(w)},0 l 0,{_n(-body)}"{_paint(fill, stroke, sw)}/>'
+            )
+        else:
+            _, x, y, text, size, color, anchor, bold = item
+            weight = ' font-weight="bold"' if bold else ""
+            out.append(f'<text x="{_n(x)}" y="{_n(y + size * 0.35)}" font-family={font} font-size="{_n(size)}"'
+                       f' fill="{escape(color)}" text-anchor="{anchor}"{weight}>{escape(text)}</text>')
+    out.append("</svg>")
+    return "\n".join(out) + "\n"
+
+
+_FONT_FILES = {
+    False: ("arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"),
+    True: ("arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"),
+}
+
+
+@lru_cache(maxsize=64)
+def _font(size: int, bold: bool):
+    for name in _FONT_FILES[bold]:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def _rgb(color):
+    if not color:
+        return None
+    try:
+        return ImageColor.getrgb(color)
+    except ValueError:
+        return None
+
+
+class _Painter:
+    """Draws scene primitives on a Pillow image at k pixels per diagram unit."""
+
+    def __init__(self, image, k: float):
+        self.draw = ImageDraw.Draw(image)
+        self.k = k
+
+    def _xy(self, points):
+        return [(x * self.k, y * self.k) for x, y in points]
+
+    def _width(self, width: float) -> int:
+        return max(1, round(width * self.k))
+
+    def _dashed(self, points, color, width, dash):
+        pattern = [float(v) * self.k for v in dash.split()] or [4 * self.k]
+        if len(pattern) % 2:
+            pattern *= 2
+        index, left, drawing = 0, pattern[0], True
+        for p, q in zip(points, points[1:]):
+            length, done = math.dist(p, q), 0.0
+            while done < length:
+                step = min(left, length - done)
+                if drawing:
+                    t0, t1 = done / length, (done + step) / length
+                    self.draw.line([(p[0] + (q[0] - p[0]) * t0, p[1] + (q[1] - p[1]) * t0),
+                                    (p[0] + (q[0] - p[0]) * t1, p[1] + (q[1] - p[1]) * t1)], fill=color, width=width)
+                done += step
+                left -= step
+                if left <= 1e-9:
+                    index = (index + 1) % len(pattern)
+                    left, drawing = pattern[index], not drawing
+
+    def paint(self, item):
+        kind, k = item[0], self.k
+        if kind == "rect":
+            _, x, y, w, h, rx, fill, stroke, sw, dash = item
+            box = [x * k, y * k, (x + w) * k, (y + h) * k]
+            stroke, fill = _rgb(stroke), _rgb(fill)
+            if dash and stroke:
+                self.draw.rounded_rectangle(box, radius=rx * k, fill=fill)
+                corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]
+                self._dashed(self._xy(corners), stroke, self._width(sw), dash)
+            else:
+                self.draw.rounded_rectangle(box, radius=rx * k, fill=fill, outline=stroke,
+                                            width=self._width(sw) if stroke else 0)
+        elif kind == "circle":
+            _, cx, cy, r, fill, stroke, sw = item
+            self.draw.ellipse([(cx - r) * k, (cy - r) * k, (cx + r) * k, (cy + r) * k], fill=_rgb(fill),
+                              outline=_rgb(stroke), width=self._width(sw))
+        elif kind == "polygon":
+            _, points, fill, stroke, sw = item
+            self.draw.polygon(self._xy(points), fill=_rgb(fill), outline=_rgb(stroke), width=self._width(sw))
+        elif kind == "line":
+            _, points, stroke, sw, dash = item
+            stroke = _rgb(stroke)
+            if stroke is None:
+                return
+            if dash:
+                self._dashed(self._xy(points), stroke, self._width(sw), dash)
+            else:
+                self.draw.line(self._xy(points), fill=stroke, width=self._width(sw), joint="curve")
+        elif kind == "cylinder":
+            _, x, y, w, h, ry, fill, stroke, sw = item
+            fill, stroke, width = _rgb(fill), _rgb(stroke), self._width(sw)
+            self.draw.ellipse([x * k, (y + h - 2 * ry) * k, (x + w) * k, (y + h) * k], fill=fill, outline=stroke,
+                              width=width)
+            self.draw.rectangle([x * k, (y + ry) * k, (x + w) * k, (y + h - ry) * k], fill=fill)
+            for side in (x, x + w):
+                self.draw.line([(side * k, (y + ry) * k), (side * k, (y + h - ry) * k)], fill=stroke, width=width)
+            self.draw.ellipse([x * k, y * k, (x + w) * k, (y + 2 * ry) * k], fill=fill, outline=stroke, width=width)
+        else:
+            _, x, y, text, size, color, anchor, bold = item
+            font = _font(max(1, round(size * k)), bold)
+            budget = text_width(text, size, bold) * k * 1.05
+            actual = font.getlength(text)
+            if actual > budget > 0:
+                font = _font(max(1, int(size * k * budget / actual)), bold)
+            try:
+                self.draw.text((x * k, y * k), text, fill=_rgb(color), font=font,
+                               anchor="mm" if anchor == "middle" else "lm")
+            except ValueError:  # bitmap fonts have no anchors
+                left, top, right, bottom = self.draw.textbbox((0, 0), text, font=font)
+                dx = (right - left) / 2 if anchor == "middle" else 0
+                self.draw.text((x * k - dx, y * k - (bottom - top) / 2), text, fill=_rgb(color), font=font)
+
+
+def _png(scene: list, width: float, height: float, factor: float, background: str) -> bytes:
+    if Image is None:
+        raise RuntimeError("Pillow is required for native PNG rendering")
+    out_w, out_h = max(1, round(width * factor)), max(1, round(height * factor))
+    # Draw at 2x and downsample for anti-aliasing, unless the image is already huge.
+    supersample = 2 if out_w * out_h <= 8_000_000 else 1
+    transparent = background in (None, "", "transparent", "none")
+    size = (out_w * supersample, out_h * supersample)
+    if transparent:
+        image = Image.new("RGBA", size, (255, 255, 255, 0))
+    else:
+        image = Image.new("RGB", size, _rgb(background) or (255, 255, 255))
+    painter = _Painter(image, factor * supersample)
+    for item in scene:
+        painter.paint(item)
+    if supersample > 1:
+        image = image.resize((out_w, out_h), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def theme_from_config(config: Optional[dict]) -> dict:
+    """Renderer theme from a mermaid-config.json style dict (themeVariables, flowchart, er)."""
+    theme = dict(DEFAULT_THEME)
+    if not config:
+        return theme
+    variables = config.get("themeVariables") or {}
+    for key, name in (
+        ("primaryColor", "node_fill"),
+        ("primaryBorderColor", "node_stroke"),
+        ("primaryTextColor", "text"),
+        ("lineColor", "line"),
+        ("clusterBkg", "cluster_fill"),
+        ("clusterBorder", "cluster_stroke"),
+        ("tertiaryColor", "note_fill"),
+    ):
+        if isinstance(variables.get(key), str):
+            theme[name] = variables[key]
+    if isinstance(variables.get("fontFamily"), str):
+        theme["font_family"] = f"{variables['fontFamily']}, Helvetica, sans-serif"
+    for source, key, name in (
+        (variables, "fontSize", "font_size"),
+        (config.get("flowchart") or {}, "nodeSpacing", "node_spacing"),
+        (config.get("flowchart") or {}, "rankSpacing", "rank_spacing"),
+        (config.get("er") or {}, "fontSize", "er_font_size"),
+    ):
+        try:
+            theme[name] = float(str(source[key]).rstrip("px"))
+        except (KeyError, ValueError):
+            pass
+    theme["label_size"] = min(theme["label_size"], theme["font_size"])
+    return theme
+
+
+def _fit(width: float, options: dict) -> float:
+    max_width = options.get("width")
+    return min(1.0, max_width / width) if max_width and width > 0 else 1.0
+
+
+def render_svg(mermaid_code: str, options: Optional[dict] = None, theme: Optional[dict] = None) -> str:
+    options = options or {}
+    theme = theme or DEFAULT_THEME
+    scene, width, height = _scene(_parse(mermaid_code), theme)
+    return _svg(scene, width, height, _fit(width, options), theme, options.get("background", "white"))
+
+
+def render_png(mermaid_code: str, options: Optional[dict] = None, theme: Optional[dict] = None) -> bytes:
+    options = options or {}
+    theme = theme or DEFAULT_THEME
+    scene, width, height = _scene(_parse(mermaid_code), theme)
+    factor = _fit(width, options) * float(options.get("scale", 1))
+    return _png(scene, width, height, factor, options.get("background", "white"))
+
+
+def render(mermaid_code: str, output_path: Path, options: Optional[dict] = None, theme: Optional[dict] = None) -> Path:
+    """
+    Render to output_path as options["format"] (png or svg; default from the
+    suffix), fitted to options["width"] and multiplied by options["scale"] like
+    mmdc. Raises UnsupportedDiagram for sources outside the subset.
+    """
+    options = options or {}
+    output_path = Path(output_path)
+    fmt = options.get("format") or output_path.suffix.lstrip(".").lower() or "png"
+    if fmt == "svg":
+        output_path.write_text(render_svg(mermaid_code, options, theme), encoding="utf-8")
+    elif fmt == "png":
+        output_path.write_bytes(render_png(mermaid_code, options, theme))
+    else:
+        raise UnsupportedDiagram(f"unsupported output format: {fmt}")
+    return output_path
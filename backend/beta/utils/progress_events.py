@@ -0,0 +1,99 @@
+"""
+In-process pub/sub for SRS progress updates.
+
+`_set_progress` publishes every snapshot here (from request handlers, the
+threadpool or background tasks); SSE/WebSocket streams subscribe per project.
+Each subscription keeps only the latest snapshot, so a burst of updates
+between two reads collapses into one message instead of queueing up.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Optional
+
+
+class ProgressSubscription:
+    """One stream's view of a project: the newest unseen snapshot plus a wake-up event."""
+
+    def __init__(self, broker: "ProgressBroker", project_key: str, loop: asyncio.AbstractEventLoop):
+        self.project_key = project_key
+        self._broker = broker
+        self._loop = loop
+        self._event = asyncio.Event()
+        self._latest: Optional[dict] = None
+
+    def _offer(self, snapshot: dict):
+        # Runs on the subscriber's loop; overwriting is what coalesces bursts.
+        self._latest = snapshot
+        self._event.set()
+
+    def offer(self, snapshot: dict):
+        try:
+            self._loop.call_soon_threadsafe(self._offer, snapshot)
+        except RuntimeError:
+            # Loop already closed; the stream is gone.
+            self.close()
+
+    async def next(self, timeout: float, coalesce: float = 0.0) -> Optional[dict]:
+        """
+        Newest snapshot since the last call, or None if nothing arrived within
+        timeout. After the first update, waits `coalesce` seconds so a burst of
+        stage changes is delivered as its final state.
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        if coalesce > 0:
+            await asyncio.sleep(coalesce)
+        self._event.clear()
+        snapshot, self._latest = self._latest, None
+        return snapshot
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class ProgressBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self.published = 0
+
+    def subscribe(self, project_key: str) -> ProgressSubscription:
+        subscription = ProgressSubscription(self, project_key, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[project_key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ProgressSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.project_key)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.project_key]
+
+    def publish(self, project_key: str, snapshot: dict):
+        """Thread-safe; a no-op when nobody is watching the project."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(project_key, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription.offer(snapshot)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "projects": len(self._subscribers),
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+                "published": self.published,
+            }
+
+
+_BROKER = ProgressBroker()
+
+
+def get_progress_broker() -> ProgressBroker:
+    return _BROKER
@@ -0,0 +1,151 @@
+"""
+Content-addressed cache for rendered diagrams.
+
+Entries are keyed by a hash of the Mermaid source plus everything that affects
+the rendered pixels (size, theme, config and CSS), stored as flat files under a
+cache directory and evicted least-recently-used once the total size exceeds a
+byte budget. Each entry keeps the extension of the file it was rendered to
+(.png, .svg). A hit hard-links (or copies, where links are unsupported) the
+cached image to the requested output path.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Extensions of cached renders; anything else in the directory is ignored.
+CACHED_SUFFIXES = (".png", ".svg")
+
+
+class RenderCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (size in bytes, suffix), least recently used first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def make_key(source: str, options: dict) -> str:
+        payload = json.dumps({"source": source, "options": options}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.root / f"{key}{suffix}"
+
+    def _load(self):
+        """Rebuild the LRU order from disk; mtime is bumped on every hit."""
+        found = []
+        for path in self.root.iterdir():
+            if path.suffix not in CACHED_SUFFIXES:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, path.stem, stat.st_size, path.suffix))
+        for _, key, size, suffix in sorted(found):
+            self._total_bytes -= self._entries.pop(key, (0, ""))[0]
+            self._entries[key] = (size, suffix)
+            self._total_bytes += size
+        self._evict_locked()
+
+    def fetch(self, key: str, output_path: Path) -> bool:
+        """Materialize a cached render at output_path. Returns False on a miss."""
+        output_path = Path(output_path)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False
+            cached = self._path(key, self._entries[key][1])
+            try:
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                if output_path.exists() or output_path.is_symlink():
+                    output_path.unlink()
+                try:
+                    os.link(cached, output_path)
+                except OSError:
+                    shutil.copyfile(cached, output_path)
+                os.utime(cached)
+            except OSError as e:
+                print(f"⚠️ Render cache entry unusable ({key[:12]}): {e}")
+                self._drop_locked(key)
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def store(self, key: str, rendered_path: Path):
+        """Copy a fresh render into the cache (never linked, so the output stays independent)."""
+        rendered_path = Path(rendered_path)
+        suffix = rendered_path.suffix.lower()
+        if suffix not in CACHED_SUFFIXES:
+            return
+        try:
+            size = rendered_path.stat().st_size
+        except OSError:
+            return
+        if size == 0 or size > self.max_bytes:
+            return
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(rendered_path, tmp_name)
+            os.chmod(tmp_name, 0o644)
+            with self._lock:
+                old = self._entries.get(key)
+                if old is not None and old[1] != suffix:
+                    self._drop_locked(key)
+                os.replace(tmp_name, self._path(key, suffix))
+                self._total_bytes -= self._entries.pop(key, (0, ""))[0]
+                self._entries[key] = (size, suffix)
+                self._total_bytes += size
+                self.stores += 1
+                self._evict_locked()
+        except OSError as e:
+            print(f"⚠️ Could not store render in cache: {e}")
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+    def _drop_locked(self, key: str):
+        size, suffix = self._entries.pop(key, (0, None))
+        self._total_bytes -= size
+        if suffix is None:
+            return
+        try:
+            self._path(key, suffix).unlink()
+        except OSError:
+            pass
+
+    def _evict_locked(self):
+        while self._entries and self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop_locked(oldest)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
@@ -10,16 +10,110 @@ from docx import Document
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
 from docx.enum.style import WD_STYLE_TYPE
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml import OxmlElement, parse_xml
+from docx.shared import Emu
+from docx.table import Table
+from datetime import datetime
+from io import BytesIO
+import hashlib
 from pathlib import Path
 from typing import Dict, Any, List, Optional
+from xml.sax.saxutils import escape
+from backend.beta.utils.docx_images import get_docx_image_assets
+import re
+import threading
+
+# Tokens baked into the cached skeleton and filled in per document.
+_SKELETON_PLACEHOLDERS = {
+    "project_name": "{{PROJECT_NAME}}",
+    "authors": "{{AUTHORS}}",
+    "organization": "{{ORGANIZATION}}",
+    "document_id": "{{DOCUMENT_ID}}",
+    "date_created": "{{DATE_CREATED}}",
+}
+_PLACEHOLDER_RE = re.compile(r"\{\{(PROJECT_NAME|AUTHORS|ORGANIZATION|DOCUMENT_ID|DATE_CREATED)\}\}")
+_SKELETON_BYTES: Optional[bytes] = None
+_SKELETON_LOCK = threading.Lock()
+
+
+def _skeleton_bytes() -> bytes:
+    """
+    The front matter every SRS shares (page setup, styles, title page, TOC,
+    header/footer, update-fields flag), built once per process with
+    placeholders instead of project values and kept as .docx bytes.
+    """
+    global _SKELETON_BYTES
+    with _SKELETON_LOCK:
+        if _SKELETON_BYTES is None:
+            generator = SRSDocumentGenerator(
+                _SKELETON_PLACEHOLDERS["project_name"],
+                [_SKELETON_PLACEHOLDERS["authors"]],
+                _SKELETON_PLACEHOLDERS["organization"],
+            )
+            generator._add_title_page(
+                document_id=_SKELETON_PLACEHOLDERS["document_id"],
+                date_created=_SKELETON_PLACEHOLDERS["date_created"],
+            )
+            generator._add_table_of_contents()
+            generator._add_header_footer()
+            generator._set_update_fields_on_open()
+            buffer = BytesIO()
+            generator.doc.save(buffer)
+            _SKELETON_BYTES = buffer.getvalue()
+        return _SKELETON_BYTES
+
+
+_SVG_BLIP_NS = "http://schemas.microsoft.com/office/drawing/2016/SVG/main"
+_SVG_BLIP_EXT_URI = "{96DAC541-7B7A-43D3-8B79-37D633B846F1}"
+
+# Characters XML 1.0 cannot carry (control chars other than tab/newline/CR).
+_XML_ILLEGAL_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_RUN_BREAK_RE = re.compile(r"([\t\r\n])")
+
+
+def _attr(value: str) -> str:
+    return escape(value, {'"': "&quot;"})
+
+
+def _run_xml(text: str, rpr: str = "") -> str:
+    """A w:r for text, split the way python-docx's run.text does (tabs, line breaks)."""
+    parts = [rpr]
+    for piece in _RUN_BREAK_RE.split(_XML_ILLEGAL_RE.sub("", text)):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            parts.append("<w:br/>")
+        elif piece:
+            space = ' xml:space="preserve"' if len(piece.strip()) < len(piece) else ""
+            parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    return f"<w:r>{''.join(parts)}</w:r>"
+
+
+def _rpr_xml(bold: bool = False, font: str = None, size: float = None) -> str:
+    props = []
+    if font:
+        font = _attr(font)
+        props.append(f'<w:rFonts w:ascii="{font}" w:hAnsi="{font}"/>')
+    if bold:
+        props.append("<w:b/>")
+    if size:
+        props.append(f'<w:sz w:val="{int(round(size * 2))}"/>')
+    return f"<w:rPr>{''.join(props)}</w:rPr>" if props else ""
 
 
 class SRSDocumentGenerator:
     """Generate SRS documents from JSON data with proper formatting and TOC."""
     
-    def __init__(self, project_name: str, authors: List[str] = None, organization: str = "Organization Name"):
+    def __init__(
+        self,
+        project_name: str,
+        authors: List[str] = None,
+        organization: str = "Organization Name",
+        from_skeleton: bool = False,
+    ):
         """
         Initialize the SRS document generator.
         
@@ -27,14 +121,69 @@ class SRSDocumentGenerator:
             project_name: Name of the project for headers
             authors: List of document author names (default: ["Author Name"])
             organization: Organization name (default: "Organization Name")
+            from_skeleton: Start from the cached skeleton, which already has the
+                styles, title page, TOC and header/footer (front_matter_ready)
         """
         self.project_name = str(project_name or "Project")
         self.authors = [str(a) for a in (authors or ["Author Name"])]
         self.organization = str(organization or "Organization Name")
-        self.doc = Document()
         self.image_paths = {}  # set before adding sections; may include system_context, system_architecture, use_case, user_workflow, security_flow, data_erd
-        self._setup_document()
-        self._setup_styles()
+        self.front_matter_ready = from_skeleton
+        self._svg_rids = {}  # SVG content hash -> relationship id, one part per distinct SVG
+        self._style_ids = {}  # (style name, type) -> style id, see _style_id
+        if from_skeleton:
+            self.doc = Document(BytesIO(_skeleton_bytes()))
+            self._fill_skeleton_placeholders()
+        else:
+            self.doc = Document()
+            self._setup_document()
+            self._setup_styles()
+
+    def _style_id(self, name: str, style_type=WD_STYLE_TYPE.PARAGRAPH):
+        """
+        Style id for a style name, resolved once per document. python-docx
+        rescans the whole styles part for every name lookup, and the styles
+        are fixed once the skeleton (or _setup_styles) is in place.
+        """
+        key = (name, style_type)
+        if key not in self._style_ids:
+            self._style_ids[key] = self.doc.part.get_style_id(name, style_type)
+        return self._style_ids[key]
+
+    def _set_style(self, paragraph, name: str):
+        paragraph._p.style = self._style_id(name)
+
+    def _paragraph(self, text: str = "", style: str = None, container=None):
+        """Add a paragraph to the body (or a table cell) with a cached style lookup."""
+        paragraph = (container if container is not None else self.doc).add_paragraph(text)
+        if style:
+            self._set_style(paragraph, style)
+        return paragraph
+
+    def _heading(self, text: str, level: int = 1):
+        """Same as Document.add_heading, with a cached style lookup."""
+        return self._paragraph(text, "Title" if level == 0 else f"Heading {level}")
+
+    def _document_id(self) -> str:
+        return f"SRS-{self.project_name[:20].upper().replace(' ', '-')}-001"
+
+    def _fill_skeleton_placeholders(self):
+        """Replace skeleton tokens in the body and header/footer parts with this project's values."""
+        values = {
+            "PROJECT_NAME": self.project_name,
+            "AUTHORS": ", ".join(self.authors),
+            "ORGANIZATION": self.organization,
+            "DOCUMENT_ID": self._document_id(),
+            "DATE_CREATED": datetime.now().strftime("%m/%d/%Y"),
+        }
+        roots = [self.doc.element.body]
+        for rel in self.doc.part.rels.values():
+            if rel.reltype in (RT.HEADER, RT.FOOTER):
+                roots.append(rel.target_part.element)
+        for root in roots:
+            for text in root.iter(qn('w:t')):
+                if text.text and "{{" in text.text:
+                    text.text = _PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], text.text)
 
     def _apply_section_layout(self, section):
         """Apply consistent page geometry to a single section."""
@@ -150,6 +299,94 @@ class SRSDocumentGenerator:
         except KeyError:
             pass
 
+    def _add_table(
+        self,
+        rows: List[List[Any]],
+        header: List[str] = None,
+        style: str = "Table Grid",
+        autofit: bool = None,
+        bold_first_column: bool = False,
+        font: str = None,
+        font_size: float = None,
+    ) -> Table:
+        """
+        Append a table built as one w:tbl element.
+
+        Same XML as add_table() followed by add_row()/cell.text, but generated
+        in a single pass: python-docx re-walks the whole table on every
+        add_row().cells, which is quadratic in the row count.
+        """
+        rows = ([list(header)] if header else []) + [list(r) for r in rows]
+        cols = max((len(r) for r in rows), default=1)
+        section = self.doc.sections[-1]
+        block_width = (section.page_width or Inches(8.5)) - (section.left_margin or Inches(1)) - (section.right_margin or Inches(1))
+        col_twips = Emu(block_width // cols).twips
+
+        tbl_pr = []
+        style_id = self._style_id(style, WD_STYLE_TYPE.TABLE) if style else None
+        if style_id:
+            tbl_pr.append(f'<w:tblStyle w:val="{_attr(style_id)}"/>')
+        tbl_pr.append('<w:tblW w:type="auto" w:w="0"/>')
+        if autofit is not None:
+            tbl_pr.append(f'<w:tblLayout w:type="{"autofit" if autofit else "fixed"}"/>')
+        tbl_pr.append(
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+            'w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+        )
+
+        cell_rpr = _rpr_xml(font=font, size=font_size)
+        first_rpr = _rpr_xml(bold=bold_first_column, font=font, size=font_size)
+        tc_pr = f'<w:tcPr><w:tcW w:type="dxa" w:w="{col_twips}"/></w:tcPr>'
+        xml = [f"<w:tbl {nsdecls('w')}><w:tblPr>{''.join(tbl_pr)}</w:tblPr><w:tblGrid>"]
+        xml.append(f'<w:gridCol w:w="{col_twips}"/>' * cols)
+        xml.append("</w:tblGrid>")
+        for row in rows:
+            xml.append("<w:tr>")
+            for c in range(cols):
+                if c >= len(row):
+                    xml.append(f"<w:tc>{tc_pr}<w:p/></w:tc>")
+                    continue
+                value = "" if row[c] is None else str(row[c])
+                run = _run_xml(value, first_rpr if c == 0 else cell_rpr)
+                xml.append(f"<w:tc>{tc_pr}<w:p>{run}</w:p></w:tc>")
+            xml.append("</w:tr>")
+        xml.append("</w:tbl>")
+
+        tbl = parse_xml("".join(xml))
+        self.doc.element.body._insert_tbl(tbl)
+        return Table(tbl, self.doc._body)
+
+    def _add_picture(self, run, path, width: float):
+        """
+        Embed a right-sized copy; repeated placements share one media part.
+        When an SVG-profile render left a vector copy next to the PNG, the
+        picture shows the SVG and keeps the PNG as fallback for older readers.
+        """
+        shape = run.add_picture(get_docx_image_assets().stream(path), width=Inches(width))
+        svg_path = Path(path).with_suffix(".svg")
+        if svg_path.is_file():
+            try:
+                self._attach_svg(shape, svg_path)
+            except Exception as e:
+                print(f"⚠️ Could not embed SVG {svg_path}; keeping PNG: {e}")
+
+    def _attach_svg(self, shape, svg_path: Path):
+        """Add the SVG as an asvg:svgBlip extension on the picture's PNG blip."""
+        blob = svg_path.read_bytes()
+        digest = hashlib.sha256(blob).hexdigest()
+        rid = self._svg_rids.get(digest)
+        if rid is None:
+            part = self.doc.part
+            svg_part = Part(part.package.next_partname("/word/media/image%d.svg"), "image/svg+xml", blob, part.package)
+            rid = part.relate_to(svg_part, RT.IMAGE)
+            self._svg_rids[digest] = rid
+        blip = shape._inline.xpath(".//a:blip")[0]
+        blip.append(parse_xml(
+            f'<a:extLst {nsdecls("a", "r")} xmlns:asvg="{_SVG_BLIP_NS}">'
+            f'<a:ext uri="{_SVG_BLIP_EXT_URI}"><asvg:svgBlip r:embed="{rid}"/></a:ext>'
+            f'</a:extLst>'
+        ))
+
     def _add_figure(self, path: Path, caption: str, width: float = 5.8):
         """Insert a centered figure with a consistent caption style and border."""
         try:
@@ -161,33 +398,30 @@ class SRSDocumentGenerator:
             cell = table.cell(0, 0)
             paragraph = cell.paragraphs[0]
             paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run = paragraph.add_run()
-            run.add_picture(str(path), width=Inches(width))
+            self._add_picture(paragraph.add_run(), path, width)
 
             # Add caption below
             caption_para = self.doc.add_paragraph()
-            caption_para.style = 'Caption'
+            self._set_style(caption_para, 'Caption')
             run = caption_para.add_run(caption)
             run.font.name = 'Arial'
             run.font.size = Pt(10)
             run.italic = True
         except Exception as e:
             print(f"⚠️ Could not add figure {path}: {e}")
-            self.doc.add_paragraph(f"[Image: {caption} could not be generated]", style="Caption")
+            self._paragraph(f"[Image: {caption} could not be generated]", "Caption")
         
     def _add_visual_grid(self, items, columns: int = 2, image_width: float = 2.8):
         """Insert a compact grid of figures with captions."""
         if not items:
             return
         rows = (len(items) + columns - 1) // columns
-        table = self.doc.add_table(rows=rows, cols=columns)
-        table.style = 'Table Grid'
-        table.autofit = True
+        table = self._add_table([[""] * columns for _ in range(rows)], autofit=True)
+        cells = table._cells
         idx = 0
         for r in range(rows):
             for c in range(columns):
-                cell = table.cell(r, c)
-                cell.text = ""
+                cell = cells[r * columns + c]
                 if idx >= len(items):
                     continue
                 path, caption = items[idx]
@@ -195,16 +429,15 @@ class SRSDocumentGenerator:
                 para.alignment = WD_ALIGN_PARAGRAPH.CENTER
                 if path and Path(path).exists():
                     try:
-                        run = para.add_run()
-                        run.add_picture(str(path), width=Inches(image_width))
+                        self._add_picture(para.add_run(), path, image_width)
                         cap = cell.add_paragraph(caption)
-                        cap.style = "Caption"
+                        self._set_style(cap, "Caption")
                     except Exception as e:
                         print(f"⚠️ Could not add grid figure {path}: {e}")
-                        cell.add_paragraph(f"[Image missing: {caption}]", style="Caption")
+                        self._paragraph(f"[Image missing: {caption}]", "Caption", cell)
                 else:
                     placeholder = cell.add_paragraph(caption)
-                    placeholder.style = "Caption"
+                    self._set_style(placeholder, "Caption")
                 idx += 1
 
     def _add_header_footer(self):
@@ -311,10 +544,8 @@ class SRSDocumentGenerator:
         run._r.append(text)
         run._r.append(fld_char_end)
         
-    def _add_title_page(self):
+    def _add_title_page(self, document_id: str = None, date_created: str = None):
         """Add title page for the SRS document."""
-        from datetime import datetime
-
         self.doc.add_paragraph()
         self._add_horizontal_rule()
 
@@ -386,35 +617,21 @@ class SRSDocumentGenerator:
         version.paragraph_format.space_after = Pt(12)
         
         # Date created
+        today_date = date_created or datetime.now().strftime("%m/%d/%Y")
         date_created = self.doc.add_paragraph()
         date_created.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        today_date = datetime.now().strftime("%m/%d/%Y")
         run = date_created.add_run(f"Date Created: {today_date}")
         run.font.name = 'Arial'
         run.font.size = Pt(12)
         date_created.paragraph_format.space_after = Pt(26)
 
         # Document control table for enterprise formatting
-        control_table = self.doc.add_table(rows=3, cols=2)
-        control_table.style = 'Table Grid'
-        control_table.autofit = True
         control_rows = [
-            ("Document ID", f"SRS-{self.project_name[:20].upper().replace(' ', '-')}-001"),
+            ("Document ID", document_id or self._document_id()),
             ("Document Status", "Draft"),
             ("Prepared For", self.organization),
         ]
-        for i, (k, v) in enumerate(control_rows):
-            c0 = control_table.cell(i, 0)
-            c1 = control_table.cell(i, 1)
-            c0.text = k
-            c1.text = v
-            if c0.paragraphs and c0.paragraphs[0].runs:
-                c0.paragraphs[0].runs[0].bold = True
-                c0.paragraphs[0].runs[0].font.name = 'Arial'
-                c0.paragraphs[0].runs[0].font.size = Pt(10)
-            if c1.paragraphs and c1.paragraphs[0].runs:
-                c1.paragraphs[0].runs[0].font.name = 'Arial'
-                c1.paragraphs[0].runs[0].font.size = Pt(10)
+        self._add_table(control_rows, autofit=True, bold_first_column=True, font='Arial', font_size=10)
 
         self._add_horizontal_rule()
         
@@ -424,7 +641,7 @@ class SRSDocumentGenerator:
     def _add_table_of_contents(self):
         """Add Table of Contents after the title page."""
         toc_heading = self.doc.add_paragraph()
-        toc_heading.style = 'TOC Heading'
+        self._set_style(toc_heading, 'TOC Heading')
         run = toc_heading.add_run("Table of Contents")
         run.font.name = 'Arial'
         run.font.size = Pt(16)
@@ -473,57 +690,57 @@ class SRSDocumentGenerator:
             intro_data: Dictionary containing introduction section data
         """
         # Section title
-        self.doc.add_heading(intro_data.get('title', '1. Introduction'), level=1)
+        self._heading(intro_data.get('title', '1. Introduction'), 1)
         
         # 1.1 Purpose
         purpose = intro_data.get('purpose', {})
-        self.doc.add_heading(purpose.get('title', '1.1 Purpose'), level=2)
+        self._heading(purpose.get('title', '1.1 Purpose'), 2)
         self.doc.add_paragraph(purpose.get('description', ''))
         
         # 1.2 Scope of the System
         scope = intro_data.get('project_scope', {})
-        self.doc.add_heading('1.2 Scope of the System', level=2)
+        self._heading('1.2 Scope of the System', 2)
         scope_desc = scope.get('description') or "The system provides a centralized platform for core business operations with secure access, reporting, and monitoring. Features outside the specified requirements are excluded from this version."
         self.doc.add_paragraph(scope_desc)
         included = scope.get('included', [])
         if included:
-            self.doc.add_paragraph("Included in scope:", style='Heading 3')
+            self._paragraph("Included in scope:", 'Heading 3')
             for item in included:
-                self.doc.add_paragraph(item, style='List Bullet')
+                self._paragraph(item, 'List Bullet')
         excluded = scope.get('excluded', [])
         if excluded:
-            self.doc.add_paragraph("Excluded from scope:", style='Heading 3')
+            self._paragraph("Excluded from scope:", 'Heading 3')
             for item in excluded:
-                self.doc.add_paragraph(item, style='List Bullet')
+                self._paragraph(item, 'List Bullet')
         
         # 1.3 Definitions, Acronyms, and Abbreviations
-        self.doc.add_heading('1.3 Definitions, Acronyms, and Abbreviations', level=2)
+        self._heading('1.3 Definitions, Acronyms, and Abbreviations', 2)
         for term, defn in [("SRS", "Software Requirements Specification"), ("RBAC", "Role-Based Access Control"), ("CRUD", "Create, Read, Update, Delete"), ("UI", "User Interface"), ("API", "Application Programming Interface")]:
-            self.doc.add_paragraph(f"{term} – {defn}", style='List Bullet')
+            self._paragraph(f"{term} – {defn}", 'List Bullet')
         
         # 1.4 Document Conventions (optional)
         conventions = intro_data.get('document_conventions', {})
-        self.doc.add_heading('1.4 Document Conventions', level=2)
+        self._heading('1.4 Document Conventions', 2)
         # Always add IEEE 830-1998 style convention
-        self.doc.add_paragraph("IEEE 830-1998 style", style='List Bullet')
+        self._paragraph("IEEE 830-1998 style", 'List Bullet')
         # Add any additional conventions if provided
         if conventions.get('conventions'):
             for conv in conventions.get('conventions', []):
                 if conv and "IEEE" not in conv:  # Avoid duplicate
-                    self.doc.add_paragraph(conv, style='List Bullet')
+                    self._paragraph(conv, 'List Bullet')
         
         # 1.5 References (optional)
         references = intro_data.get('references', {})
         if references.get('references'):
-            self.doc.add_heading(references.get('title', '1.5 References'), level=2)
+            self._heading(references.get('title', '1.5 References'), 2)
             for ref in references.get('references', []):
                 ref_id = ref.get('id', '')
                 ref_desc = ref.get('description', '')
-                self.doc.add_paragraph(f"{ref_id}: {ref_desc}", style='List Bullet')
+                self._paragraph(f"{ref_id}: {ref_desc}", 'List Bullet')
 
         # 1.6 Live Prototype (New)
         if intro_data.get('live_link'):
-            self.doc.add_heading('1.6 Live Prototype', level=2)
+            self._heading('1.6 Live Prototype', 2)
             p = self.doc.add_paragraph("You can interact with the generated prototype of this system here: ")
             self.add_hyperlink(p, "Click here to view Live Project Prototype", intro_data.get('live_link'))
 
@@ -561,15 +778,9 @@ class SRSDocumentGenerator:
         """
         Add Feasibility & Cost Estimation (COCOMO) section.
         """
-        self.doc.add_heading('2. Feasibility & Cost Estimation', level=1)
+        self._heading('2. Feasibility & Cost Estimation', 1)
         self.doc.add_paragraph("The following cost and effort estimates are based on the COCOMO II model.")
 
-        table = self.doc.add_table(rows=1, cols=2)
-        table.style = 'Table Grid'
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'Metric'
-        hdr_cells[1].text = 'Estimated Value'
-
         # Mock Data (In real app, calculate this based on function points)
         metrics = [
              ("Estimated Lines of Code (KLOC)", "5.2 KLOC"),
@@ -577,11 +788,7 @@ class SRSDocumentGenerator:
              ("Development Cost", "$45,000"),
              ("Required Schedule", "6 Months")
         ]
-        
-        for metric, value in metrics:
-            row_cells = table.add_row().cells
-            row_cells[0].text = metric
-            row_cells[1].text = value
+        self._add_table(metrics, header=['Metric', 'Estimated Value'])
     
     def add_overall_description_section(self, desc_data: Dict[str, Any]):
         """
@@ -591,11 +798,11 @@ class SRSDocumentGenerator:
             desc_data: Dictionary containing overall description section data
         """
         # Section title
-        self.doc.add_heading(desc_data.get('title', '2. Overall Description'), level=1)
+        self._heading(desc_data.get('title', '2. Overall Description'), 1)
         
         # 2.1 Product Perspective
         perspective = desc_data.get('product_perspective', {})
-        self.doc.add_heading(perspective.get('title', '2.1 Product Perspective'), level=2)
+        self._heading(perspective.get('title', '2.1 Product Perspective'), 2)
         self.doc.add_paragraph(perspective.get('description', ''))
         path = self.image_paths.get('system_context')
         if path and Path(path).exists():
@@ -604,65 +811,65 @@ class SRSDocumentGenerator:
                 "Figure 1: System Context Diagram",
             )
         else:
-            self.doc.add_paragraph("Note: The System Context Diagram illustrating interactions between the system and external entities can be added above.", style='Heading 3')
+            self._paragraph("Note: The System Context Diagram illustrating interactions between the system and external entities can be added above.", 'Heading 3')
         
         # 2.2 Product Features
         features = desc_data.get('product_features', {})
-        self.doc.add_heading(features.get('title', '2.2 Product Features'), level=2)
+        self._heading(features.get('title', '2.2 Product Features'), 2)
         feature_list = features.get('features', [])
         for feature in feature_list:
-            self.doc.add_paragraph(feature, style='List Bullet')
+            self._paragraph(feature, 'List Bullet')
         
         # 2.3 User Classes and Characteristics
         user_classes = desc_data.get('user_classes_and_characteristics', {})
-        self.doc.add_heading(user_classes.get('title', '2.3 User Classes and Characteristics'), level=2)
+        self._heading(user_classes.get('title', '2.3 User Classes and Characteristics'), 2)
         classes = user_classes.get('user_classes', [])
         for user_class in classes:
             user_type = user_class.get('user_class', '')
             if isinstance(user_class, dict) and user_class.get('characteristics'):
                     user_type += f": {user_class.get('characteristics')}"
-            self.doc.add_paragraph(user_type, style='List Bullet')
+            self._paragraph(user_type, 'List Bullet')
         
         # 2.4 Operating Environment
         environment = desc_data.get('operating_environment', {})
-        self.doc.add_heading(environment.get('title', '2.4 Operating Environment'), level=2)
+        self._heading(environment.get('title', '2.4 Operating Environment'), 2)
         env_list = environment.get('environments', [])
         for env in env_list:
-            self.doc.add_paragraph(env, style='List Bullet')
+            self._paragraph(env, 'List Bullet')
         
         # 2.5 Design and Implementation Constraints
         constraints = desc_data.get('design_and_implementation_constraints', {})
-        self.doc.add_heading(constraints.get('title', '2.5 Design and Implementation Constraints'), level=2)
+        self._heading(constraints.get('title', '2.5 Design and Implementation Constraints'), 2)
         constraint_list = constraints.get('constraints', [])
         for constraint in constraint_list:
-            self.doc.add_paragraph(constraint, style='List Bullet')
+            self._paragraph(constraint, 'List Bullet')
         
         # 2.6 User Documentation
         documentation = desc_data.get('user_documentation', {})
-        self.doc.add_heading(documentation.get('title', '2.6 User Documentation'), level=2)
+        self._heading(documentation.get('title', '2.6 User Documentation'), 2)
         doc_list = documentation.get('documents', [])
         for doc in doc_list:
-            self.doc.add_paragraph(doc, style='List Bullet')
+            self._paragraph(doc, 'List Bullet')
         
         # 2.7 Assumptions and Dependencies
         assumptions = desc_data.get('assumptions_and_dependencies', {})
-        self.doc.add_heading(assumptions.get('title', '2.7 Assumptions and Dependencies'), level=2)
+        self._heading(assumptions.get('title', '2.7 Assumptions and Dependencies'), 2)
         
         assumption_list = assumptions.get('assumptions', [])
         if assumption_list:
-            self.doc.add_paragraph("Assumptions:", style='Heading 3')
+            self._paragraph("Assumptions:", 'Heading 3')
             for assumption in assumption_list:
-                self.doc.add_paragraph(assumption, style='List Bullet')
+                self._paragraph(assumption, 'List Bullet')
         
         dependency_list = assumptions.get('dependencies', [])
         if dependency_list:
-            self.doc.add_paragraph("Dependencies:", style='Heading 3')
+            self._paragraph("Dependencies:", 'Heading 3')
             for dependency in dependency_list:
-                self.doc.add_paragraph(dependency, style='List Bullet')
+                self._paragraph(dependency, 'List Bullet')
     
     def add_system_architecture_section(self, desc_data: Dict[str, Any] = None):
         """Section 3: System Architecture with architecture diagram."""
-        self.doc.add_heading('3. System Architecture', level=1)
+        self._heading('3. System Architecture', 1)
         self.doc.add_paragraph(
             "The system follows a layered architecture consisting of: Presentation Layer (Web UI), "
             "Application Layer (Backend services), Data Layer (Database), and External Integration Layer (APIs, third-party services)."
@@ -674,13 +881,13 @@ class SRSDocumentGenerator:
                 "Figure 2: System Architecture Diagram",
             )
         else:
-            self.doc.add_paragraph("Note: The System Architecture Diagram can be included above.", style='Heading 3')
+            self._paragraph("Note: The System Architecture Diagram can be included above.", 'Heading 3')
     
     def add_system_features_section(self, features_data: Dict[str, Any]):
         """
         Add Functional Requirements section (4) with Use Case diagram.
         """
-        self.doc.add_heading('4. Functional Requirements', level=1)
+        self._heading('4. Functional Requirements', 1)
         path = self.image_paths.get('use_case')
         if path and Path(path).exists():
             self._add_figure(
@@ -690,7 +897,7 @@ class SRSDocumentGenerator:
         features = features_data.get('features', [])
         for idx, feature in enumerate(features, 1):
             feature_name = feature.get('feature_name', f'Feature {idx}')
-            self.doc.add_heading(f"4.{idx} {feature_name}", level=2)
+            self._heading(f"4.{idx} {feature_name}", 2)
             
             # Description (if provided)
             description = feature.get('description', '')
@@ -698,12 +905,12 @@ class SRSDocumentGenerator:
                 self.doc.add_paragraph(f"Description: {description}")
             
             # Simplified functional requirements format: "Support: {feature_name}"
-            self.doc.add_paragraph("Functional Requirements:", style='Heading 3')
-            self.doc.add_paragraph(f"Support: {feature_name}", style='List Bullet')
+            self._paragraph("Functional Requirements:", 'Heading 3')
+            self._paragraph(f"Support: {feature_name}", 'List Bullet')
     
     def add_user_workflow_section(self):
         """Section 5: User Workflow with workflow diagram."""
-        self.doc.add_heading('5. User Workflow', level=1)
+        self._heading('5. User Workflow', 1)
         self.doc.add_paragraph(
             "The typical user workflow includes: User logs into the system; System validates credentials; "
             "User accesses role-based dashboard; User performs permitted actions; System processes and stores data; User views results or reports."
@@ -715,11 +922,11 @@ class SRSDocumentGenerator:
                 "Figure 4: User Workflow Diagram",
             )
         else:
-            self.doc.add_paragraph("Note: The User Flow / Workflow Diagram can be included above.", style='Heading 3')
+            self._paragraph("Note: The User Flow / Workflow Diagram can be included above.", 'Heading 3')
 
     def add_visual_overview_section(self):
         """A compact, diagram-heavy overview similar to enterprise SRS samples."""
-        self.doc.add_heading("Visual Overview", level=1)
+        self._heading("Visual Overview", 1)
         items = [
             (self.image_paths.get("system_context"), "Figure A1: System Context"),
             (self.image_paths.get("system_architecture"), "Figure A2: System Architecture"),
@@ -732,10 +939,10 @@ class SRSDocumentGenerator:
 
     def add_system_modeling_section(self):
         """Add System Modeling section with Sequence and State diagrams."""
-        self.doc.add_heading('System Modeling & Design', level=1)
+        self._heading('System Modeling & Design', 1)
         
         # Sequence Diagram
-        self.doc.add_heading('Core Sequence Diagram', level=2)
+        self._heading('Core Sequence Diagram', 2)
         self.doc.add_paragraph(
             "The following sequence diagram illustrates the typical interaction flow between the user, "
             "frontend, backend API, and data layer for a primary system action."
@@ -745,7 +952,7 @@ class SRSDocumentGenerator:
             self._add_figure(Path(path), "Figure: System Sequence Diagram", width=6.0)
             
         # State Diagram
-        self.doc.add_heading('Entity State Diagram', level=2)
+        self._heading('Entity State Diagram', 2)
         self.doc.add_paragraph(
             "The state diagram below depicts the lifecycle of key system entities (e.g., Orders, Tickets, or User Sessions) "
             "as they transition through various statuses."
@@ -756,13 +963,13 @@ class SRSDocumentGenerator:
 
     def add_ui_prototyping_section(self):
         """Add UI Prototyping section."""
-        self.doc.add_heading('User Interface Prototyping', level=1)
+        self._heading('User Interface Prototyping', 1)
         self.doc.add_paragraph(
             "This section provides a visual reference for the intended user interface layout and key components."
         )
         
         # Wireframe Diagram
-        self.doc.add_heading('High-Level Wireframe', level=2)
+        self._heading('High-Level Wireframe', 2)
         path = self.image_paths.get('ui_local_diagram')
         if path and Path(path).exists():
             self._add_figure(Path(path), "Figure: Main Dashboard Wireframe", width=6.0)
@@ -784,11 +991,11 @@ class SRSDocumentGenerator:
             image_paths: Dictionary with paths to interface diagrams
         """
         # Section title
-        self.doc.add_heading('9. External Interface Requirements', level=1)
+        self._heading('9. External Interface Requirements', 1)
         
         # 9.1 User Interfaces
         user_interfaces = interfaces_data.get('user_interfaces', {})
-        self.doc.add_heading(user_interfaces.get('title', '9.1 User Interface'), level=2)
+        self._heading(user_interfaces.get('title', '9.1 User Interface'), 2)
         self.doc.add_paragraph(user_interfaces.get('description', ''))
         
         # Add user interface diagram
@@ -801,7 +1008,7 @@ class SRSDocumentGenerator:
         
         # 9.2 Hardware / Software / Communication (grouped)
         hardware_interfaces = interfaces_data.get('hardware_interfaces', {})
-        self.doc.add_heading(hardware_interfaces.get('title', '9.2 Application Programming Interfaces (APIs)'), level=2)
+        self._heading(hardware_interfaces.get('title', '9.2 Application Programming Interfaces (APIs)'), 2)
         self.doc.add_paragraph(hardware_interfaces.get('description', ''))
         
         # Add hardware interface diagram
@@ -830,55 +1037,55 @@ class SRSDocumentGenerator:
             nfr_data: Dictionary containing NFR section data
         """
         # Section title
-        self.doc.add_heading('6. Non-Functional Requirements', level=1)
+        self._heading('6. Non-Functional Requirements', 1)
         
         # Performance Requirements
         performance = nfr_data.get('performance_requirements', {})
-        self.doc.add_heading(f"6.1 {performance.get('title', 'Performance Requirements')}", level=2)
+        self._heading(f"6.1 {performance.get('title', 'Performance Requirements')}", 2)
         perf_reqs = performance.get('requirements', [])
         for req in perf_reqs:
             desc = req.get('description', '')
             rationale = req.get('rationale', '')
-            para = self.doc.add_paragraph(desc, style='List Bullet')
+            para = self._paragraph(desc, 'List Bullet')
             if rationale:
                 para.add_run(f"\nRationale: {rationale}").italic = True
         
         # Safety Requirements
         safety = nfr_data.get('safety_requirements', {})
-        self.doc.add_heading(f"6.2 {safety.get('title', 'Safety Requirements')}", level=2)
+        self._heading(f"6.2 {safety.get('title', 'Safety Requirements')}", 2)
         safety_reqs = safety.get('requirements', [])
         for req in safety_reqs:
             desc = req.get('description', '')
             rationale = req.get('rationale', '')
-            para = self.doc.add_paragraph(desc, style='List Bullet')
+            para = self._paragraph(desc, 'List Bullet')
             if rationale:
                 para.add_run(f"\nRationale: {rationale}").italic = True
         
         # Security Requirements (brief; full section 7 follows)
         security = nfr_data.get('security_requirements', {})
-        self.doc.add_heading(f"6.3 {security.get('title', 'Security Requirements')}", level=2)
+        self._heading(f"6.3 {security.get('title', 'Security Requirements')}", 2)
         security_reqs = security.get('requirements', [])
         for req in security_reqs:
             desc = req.get('description', '')
             rationale = req.get('rationale', '')
-            para = self.doc.add_paragraph(desc, style='List Bullet')
+            para = self._paragraph(desc, 'List Bullet')
             if rationale:
                 para.add_run(f"\nRationale: {rationale}").italic = True
         
         # Quality Attributes
         quality = nfr_data.get('quality_attributes', {})
-        self.doc.add_heading(f"6.4 {quality.get('title', 'Quality Attributes')}", level=2)
+        self._heading(f"6.4 {quality.get('title', 'Quality Attributes')}", 2)
         quality_reqs = quality.get('requirements', [])
         for req in quality_reqs:
             desc = req.get('description', '')
             rationale = req.get('rationale', '')
-            para = self.doc.add_paragraph(desc, style='List Bullet')
+            para = self._paragraph(desc, 'List Bullet')
             if rationale:
                 para.add_run(f"\nRationale: {rationale}").italic = True
     
     def add_security_requirements_section(self):
         """Section 7: Security Requirements with Security Flow diagram."""
-        self.doc.add_heading('7. Security Requirements', level=1)
+        self._heading('7. Security Requirements', 1)
         self.doc.add_paragraph(
             "The system shall: Enforce secure authentication mechanisms; Use encrypted communication channels; "
             "Protect sensitive data from unauthorized access; Log security-related events."
@@ -890,11 +1097,11 @@ class SRSDocumentGenerator:
                 "Figure 5: Security Flow Diagram",
             )
         else:
-            self.doc.add_paragraph("Note: The Security Flow Diagram can be included above.", style='Heading 3')
+            self._paragraph("Note: The Security Flow Diagram can be included above.", 'Heading 3')
     
     def add_data_requirements_section(self):
         """Section 8: Data Requirements with ERD."""
-        self.doc.add_heading('8. Data Requirements', level=1)
+        self._heading('8. Data Requirements', 1)
         self.doc.add_paragraph("The system shall manage structured data entities and their relationships efficiently.")
         path = self.image_paths.get('data_erd')
         if path and Path(path).exists():
@@ -903,34 +1110,34 @@ class SRSDocumentGenerator:
                 "Figure 6: Entity Relationship Diagram",
             )
         else:
-            self.doc.add_paragraph("Note: The Entity Relationship Diagram can be included above.", style='Heading 3')
+            self._paragraph("Note: The Entity Relationship Diagram can be included above.", 'Heading 3')
     
     def add_glossary_section(self, glossary_data: Dict[str, Any]):
         """Optional: Glossary (definitions are in 1.3). Kept for backward compatibility."""
         sections = glossary_data.get('sections', [])
         if not sections:
             return
-        self.doc.add_heading("Definitions (additional)", level=2)
+        self._heading("Definitions (additional)", 2)
         for section in sections:
             terms = section.get('terms', [])
             for term_data in terms:
                 term = term_data.get('term', '')
                 definition = term_data.get('definition', '')
-                self.doc.add_paragraph(f"{term} – {definition}", style='List Bullet')
+                self._paragraph(f"{term} – {definition}", 'List Bullet')
     
     def add_assumptions_section(self, assumptions_data: Dict[str, Any]):
         """
         Add Assumptions and Dependencies (Section 10).
         """
         # Section title
-        self.doc.add_heading('10. Assumptions and Dependencies', level=1)
+        self._heading('10. Assumptions and Dependencies', 1)
         
         assumptions = assumptions_data.get('assumptions', [])
         for idx, assumption in enumerate(assumptions, 1):
             description = assumption.get('description', '')
             impact = assumption.get('impact', '')
             
-            self.doc.add_paragraph(f"Assumption {idx}:", style='Heading 3')
+            self._paragraph(f"Assumption {idx}:", 'Heading 3')
             self.doc.add_paragraph(description)
             
             if impact:
@@ -943,110 +1150,79 @@ class SRSDocumentGenerator:
         Add High-Quality Appendices: User Tables, Use Cases, System Models, UI, Risks.
         """
         self.doc.add_section()
-        self.doc.add_heading('Appendices', level=1)
+        self._heading('Appendices', 1)
         self.doc.add_paragraph("The following appendices provide detailed specifications, models, and analysis for the proposed system.")
 
         # Appendix A: Detailed User Personas
-        self.doc.add_heading('Appendix A: Detailed User Personas', level=2)
+        self._heading('Appendix A: Detailed User Personas', 2)
         user_classes = sections.get('overall_description_section', {}).get('user_classes_and_characteristics', {}).get('user_classes', [])
         if user_classes:
-            table = self.doc.add_table(rows=1, cols=4)
-            table.style = 'Table Grid'
-            hdr = table.rows[0].cells
-            hdr[0].text = "User Class"
-            hdr[1].text = "Description"
-            hdr[2].text = "Responsibilities"
-            hdr[3].text = "Skills/Requirements"
-            for c in user_classes:
-                row = table.add_row().cells
-                row[0].text = str(c.get('user_class', ''))
-                row[1].text = str(c.get('characteristics', ''))
-                row[2].text = str(c.get('responsibilities', 'N/A'))
-                row[3].text = str(c.get('skills', 'N/A'))
+            self._add_table(
+                [
+                    (c.get('user_class', ''), c.get('characteristics', ''), c.get('responsibilities', 'N/A'), c.get('skills', 'N/A'))
+                    for c in user_classes
+                ],
+                header=["User Class", "Description", "Responsibilities", "Skills/Requirements"],
+            )
         
         # Appendix B: Use Case Specifications
-        self.doc.add_heading('Appendix B: Use Case Specifications', level=2)
+        self._heading('Appendix B: Use Case Specifications', 2)
         features = sections.get('system_features_section', {}).get('features', [])
         for feature in features:
             feature_name = feature.get('feature_name', 'Feature')
             structured = feature.get('structured_requirements', {})
             
-            self.doc.add_heading(feature_name, level=3)
+            self._heading(feature_name, 3)
             
-            table = self.doc.add_table(rows=0, cols=2)
-            table.style = 'Table Grid'
-            table.autofit = True
-            
-            row = table.add_row().cells
-            row[0].text = "Description"
-            row[1].text = feature.get('description', '')
-
+            rows = [("Description", feature.get('description', ''))]
             if structured:
                 if structured.get('inputs'):
-                    row = table.add_row().cells
-                    row[0].text = "Inputs"
-                    row[1].text = structured.get('inputs', '')
-                
-                row = table.add_row().cells
-                row[0].text = "Functional Specs"
+                    rows.append(("Inputs", structured.get('inputs', '')))
+
                 reqs = feature.get('functional_requirements', [])
                 req_text = "\n".join(f"• {r.get('description', '')}" for r in reqs if r.get('description'))
-                row[1].text = req_text or structured.get('acceptance_criteria', '')
+                rows.append(("Functional Specs", req_text or structured.get('acceptance_criteria', '')))
 
                 if structured.get('outputs'):
-                    row = table.add_row().cells
-                    row[0].text = "Outputs"
-                    row[1].text = structured.get('outputs', '')
+                    rows.append(("Outputs", structured.get('outputs', '')))
 
                 if structured.get('acceptance_criteria'):
-                    row = table.add_row().cells
-                    row[0].text = "Acceptance Criteria"
-                    row[1].text = structured.get('acceptance_criteria', '')
+                    rows.append(("Acceptance Criteria", structured.get('acceptance_criteria', '')))
             else:
-                 row = table.add_row().cells
-                 row[0].text = "Requirements"
-                 reqs = feature.get('functional_requirements', [])
-                 row[1].text = "\n".join(f"• {r.get('description', '')}" for r in reqs)
+                reqs = feature.get('functional_requirements', [])
+                rows.append(("Requirements", "\n".join(f"• {r.get('description', '')}" for r in reqs)))
+            self._add_table(rows, autofit=True)
 
             self.doc.add_paragraph()
 
         # Appendix C: System Models (Sequence & State)
-        self.doc.add_heading('Appendix C: System Models', level=2)
+        self._heading('Appendix C: System Models', 2)
         self.add_system_modeling_section() # Reuse existing logic, it adds headings we might want to adjust, but acceptable for now.
 
         # Appendix D: UI Prototypes
-        self.doc.add_heading('Appendix D: UI Prototypes', level=2)
+        self._heading('Appendix D: UI Prototypes', 2)
         self.add_ui_prototyping_section()
 
         # Appendix E: Risk Analysis
-        self.doc.add_heading('Appendix E: Risk Analysis', level=2)
+        self._heading('Appendix E: Risk Analysis', 2)
         risks = sections.get('risk_analysis', [])
         if risks:
-            table = self.doc.add_table(rows=1, cols=4)
-            table.style = 'Table Grid'
-            hdr = table.rows[0].cells
-            hdr[0].text = "Risk"
-            hdr[1].text = "Probability"
-            hdr[2].text = "Impact"
-            hdr[3].text = "Mitigation"
-            for r in risks:
-                row = table.add_row().cells
-                row[0].text = str(r.get('risk', ''))
-                row[1].text = str(r.get('probability', ''))
-                row[2].text = str(r.get('impact', ''))
-                row[3].text = str(r.get('mitigation', ''))
+            self._add_table(
+                [(r.get('risk', ''), r.get('probability', ''), r.get('impact', ''), r.get('mitigation', '')) for r in risks],
+                header=["Risk", "Probability", "Impact", "Mitigation"],
+            )
         else:
              self.doc.add_paragraph("No specific risks identified.")
 
     def add_future_enhancements_section(self):
         """Section 11: Future Enhancements."""
-        self.doc.add_heading('11. Future Enhancements', level=1)
+        self._heading('11. Future Enhancements', 1)
         for item in [
             "Mobile application support",
             "Advanced analytics and insights",
             "Integration with additional third-party services",
         ]:
-            self.doc.add_paragraph(item, style='List Bullet')
+            self._paragraph(item, 'List Bullet')
     
     def save(self, output_path: str):
         """
@@ -1072,20 +1248,20 @@ def generate_srs_document(
     authors: List[str] = None,
     organization: str = "Organization Name",
     sections: Dict[str, Any] = None,
-    mode: str = "quick"
+    mode: str = "quick",
+    use_skeleton: bool = True,
 ) -> str:
     """
     Generate a complete SRS document.
+
+    With use_skeleton (the default) the title page, TOC and header/footer come
+    prebuilt from the cached skeleton instead of being rebuilt per document.
     """
-    # Create generator instance
-    generator = SRSDocumentGenerator(project_name, authors, organization)
+    generator = SRSDocumentGenerator(project_name, authors, organization, from_skeleton=use_skeleton)
     generator.image_paths = image_paths
-    
-    # Add title page
-    generator._add_title_page()
-    
-    # Add Table of Contents
-    generator._add_table_of_contents()
+    if not generator.front_matter_ready:
+        generator._add_title_page()
+        generator._add_table_of_contents()
 
     # Add a diagram-heavy visual overview to match enterprise SRS samples
     generator.add_visual_overview_section()
@@ -1108,10 +1284,11 @@ def generate_srs_document(
     if mode in ["full", "enhanced"] and sections:
         generator.add_detailed_appendices(sections)
     
-    # Add header and footer (must be after all content is added)
+    # Sections added after the skeleton link to its header/footer.
     generator._apply_layout_to_all_sections()
-    generator._add_header_footer()
-    generator._set_update_fields_on_open()
+    if not generator.front_matter_ready:
+        generator._add_header_footer()
+        generator._set_update_fields_on_open()
     
     # Save the document
     generator.save(output_path)
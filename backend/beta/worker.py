@@ -0,0 +1,138 @@
+"""
+SRS generation worker.
+
+Runs N worker processes that claim jobs from the durable job queue
+(services/job_queue.py) and execute them with the handlers registered in
+main.JOB_HANDLERS. Start it next to the API with JOB_QUEUE_ENABLED=1:
+
+    python -m backend.beta.worker --processes 4
+
+Each process heartbeats its job's lease while the job runs, so a crashed or
+killed worker's job becomes visible again after JOB_LEASE_SEC and is retried.
+SIGTERM/SIGINT let running jobs finish before the processes exit.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from backend.beta.services.job_queue import get_job_queue
+
+
+def _heartbeat_loop(queue, job_id: str, worker_id: str, lease_sec: float, done: threading.Event):
+    while not done.wait(max(1.0, lease_sec / 3)):
+        if not queue.heartbeat(job_id, worker_id, lease_sec):
+            print(f"⚠️ Lost lease on job {job_id}; another worker may run it again")
+            return
+
+
+def _run_job(queue, handlers: dict, job: dict, worker_id: str, lease_sec: float):
+    handler = handlers.get(job["kind"])
+    if handler is None:
+        queue.fail(job["id"], worker_id, f"No handler for job kind '{job['kind']}'")
+        return
+    print(f"🧵 [{worker_id}] Running {job['kind']} job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+    done = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop, args=(queue, job["id"], worker_id, lease_sec, done), daemon=True
+    )
+    heartbeat.start()
+    started = time.monotonic()
+    try:
+        result = handler(job["payload"])
+    except Exception as e:
+        traceback.print_exc()
+        retry_delay = min(60, 5 * 2 ** (job["attempts"] - 1))
+        queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}", retry_delay_sec=retry_delay)
+        print(f"❌ [{worker_id}] Job {job['id']} failed: {e}")
+    else:
+        queue.complete(job["id"], worker_id, result)
+        print(f"✅ [{worker_id}] Job {job['id']} done in {time.monotonic() - started:.1f}s")
+    finally:
+        done.set()
+        heartbeat.join(timeout=5)
+
+
+def _worker_process(index: int, poll_sec: float):
+    # Workers always talk to the queue (progress is shared through it too).
+    os.environ["JOB_QUEUE_ENABLED"] = "1"
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    # Imported here so each spawned process loads the app (and its models) once.
+    from backend.beta.main import JOB_HANDLERS
+
+    queue = get_job_queue()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    print(f"🚀 Worker {worker_id} ready")
+    while not stopping.is_set():
+        try:
+            job = queue.claim(worker_id)
+        except Exception as e:
+            print(f"⚠️ [{worker_id}] Claim failed: {e}")
+            job = None
+        if job is None:
+            stopping.wait(poll_sec)
+            continue
+        _run_job(queue, JOB_HANDLERS, job, worker_id, queue.lease_sec)
+    print(f"👋 Worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run DocuVerse SRS generation workers.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.getenv("JOB_WORKER_PROCESSES", "2")),
+        help="Number of worker processes (default: JOB_WORKER_PROCESSES or 2).",
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=float(os.getenv("JOB_POLL_SEC", "0.5")),
+        help="Seconds to sleep when the queue is empty.",
+    )
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    def _start(index: int):
+        proc = ctx.Process(target=_worker_process, args=(index, args.poll), name=f"srs-worker-{index}")
+        proc.start()
+        return proc
+
+    procs = [_start(i) for i in range(max(1, args.processes))]
+    print(f"🧵 Started {len(procs)} SRS worker process(es)")
+    while not stopping.is_set():
+        for i, proc in enumerate(procs):
+            if not proc.is_alive():
+                print(f"⚠️ Worker process {proc.name} exited ({proc.exitcode}); restarting")
+                procs[i] = _start(i)
+        stopping.wait(2)
+
+    print("⏳ Stopping workers (running jobs will finish)...")
+    for proc in procs:
+        if proc.is_alive():
+            proc.terminate()
+    for proc in procs:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()